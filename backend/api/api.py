@@ -3,28 +3,53 @@ FastAPI Backend - Standard API for Chatbot
 Provides REST endpoints for all frontend interfaces
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
 import uvicorn
+import json
+import asyncio
 import os
 import sys
+import time
 
 # Add backend to path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core import ChatbotBackend
+from metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUESTS_IN_FLIGHT, HTTP_REQUEST_SECONDS
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv("config/.env")
 
+# The chatbot backend, created when the app starts (importing this module opens no
+# database); tests and the benchmark assign their own before sending requests
+chatbot_backend: Optional[ChatbotBackend] = None
+
+def get_backend() -> ChatbotBackend:
+    """The backend serving requests, created on first use if the lifespan did not run"""
+    global chatbot_backend
+    if chatbot_backend is None:
+        chatbot_backend = ChatbotBackend()
+    return chatbot_backend
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the backend on startup and release its database connections on shutdown"""
+    get_backend()
+    yield
+    if chatbot_backend is not None:
+        await chatbot_backend.aclose()
+
 app = FastAPI(
     title="AI Chatbot API",
     description="Standard API for AI Chatbot with LangGraph backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -36,13 +61,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize chatbot backend
-chatbot_backend = ChatbotBackend()
+class MetricsMiddleware:
+    """Counts requests in flight and times them until the last byte is sent,
+    so streamed replies are measured in full"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = "500"
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+        
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The route template, not the raw path, so session IDs do not become labels
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route, status=status)
+
+app.add_middleware(MetricsMiddleware)
 
 # Pydantic models
 class MessageRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    user: Optional[str] = None
 
 class MessageResponse(BaseModel):
     response: str
@@ -51,6 +105,7 @@ class MessageResponse(BaseModel):
 class SessionRequest(BaseModel):
     session_id: Optional[str] = None
     system_prompt: Optional[str] = None
+    user: Optional[str] = None
 
 class SessionResponse(BaseModel):
     session_id: str
@@ -60,6 +115,19 @@ class ChatHistory(BaseModel):
     session_id: str
     messages: List[Dict[str, Any]]
 
+class SessionSummary(BaseModel):
+    session_id: str
+    owner: str
+    title: str
+    created_at: str
+    last_activity: str
+    message_count: int
+    last_preview: str
+
+class SessionList(BaseModel):
+    sessions: List[SessionSummary]
+    next_cursor: Optional[str] = None
+
 class SessionInfo(BaseModel):
     session_id: str
     exists: bool
@@ -77,10 +145,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /chat": "Send a chat message",
+            "POST /chat/stream": "Send a chat message and stream the reply as server-sent events",
             "POST /session/create": "Create a new session",
             "GET /session/{session_id}": "Get session info",
+            "DELETE /session/{session_id}": "Delete a session",
             "GET /history/{session_id}": "Get chat history",
-            "GET /health": "Health check"
+            "GET /sessions": "List sessions, newest first (?user=&after=&limit=)",
+            "GET /health": "Health check",
+            "GET /metrics": "Prometheus metrics"
         }
     }
 
@@ -89,6 +161,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "backend": "ready"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/chat", response_model=MessageResponse)
 async def send_message(request: MessageRequest):
     """Send a message to the chatbot"""
@@ -97,13 +174,34 @@ async def send_message(request: MessageRequest):
         session_id = request.session_id or f"api_{os.urandom(8).hex()}"
         
         # Send message and get response
-        response = chatbot_backend.send_message(session_id, request.message)
+        response = await get_backend().asend_message(session_id, request.message, owner=request.user)
         
         return MessageResponse(response=response, session_id=session_id)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+@app.post("/chat/stream")
+async def stream_message(request: MessageRequest):
+    """Send a message to the chatbot and stream the reply as server-sent events.
+
+    Emits "session" first, then "token", "tool_start" and "tool_end" events as the
+    turn runs, and finishes with a "message" (or "error") event carrying the reply.
+    """
+    session_id = request.session_id or f"api_{os.urandom(8).hex()}"
+
+    async def event_stream():
+        yield f"event: session\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        async for event in get_backend().astream_message(session_id, request.message, owner=request.user):
+            event_type = event.pop("type")
+            yield f"event: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/session/create", response_model=SessionResponse)
 async def create_session(request: SessionRequest):
     """Create a new chat session"""
@@ -112,7 +210,7 @@ async def create_session(request: SessionRequest):
         session_id = request.session_id or f"api_{os.urandom(8).hex()}"
         
         # Initialize session
-        created = chatbot_backend.initialize_session(session_id, request.system_prompt)
+        created = await get_backend().ainitialize_session(session_id, request.system_prompt, owner=request.user)
         
         return SessionResponse(session_id=session_id, created=created)
     
@@ -123,7 +221,7 @@ async def create_session(request: SessionRequest):
 async def get_session_info(session_id: str):
     """Get information about a session"""
     try:
-        info = chatbot_backend.get_session_info(session_id)
+        info = await get_backend().aget_session_info(session_id)
         return SessionInfo(**info)
     
     except Exception as e:
@@ -133,7 +231,7 @@ async def get_session_info(session_id: str):
 async def get_chat_history(session_id: str):
     """Get chat history for a session"""
     try:
-        messages = chatbot_backend.get_chat_history(session_id)
+        messages = await get_backend().aget_chat_history(session_id)
         return ChatHistory(session_id=session_id, messages=messages)
     
     except Exception as e:
@@ -141,15 +239,30 @@ async def get_chat_history(session_id: str):
 
 @app.delete("/session/{session_id}")
 async def delete_session(session_id: str):
-    """Delete a chat session (placeholder - implement based on your needs)"""
-    # This would require implementing session deletion in the backend
-    return {"message": f"Session {session_id} deletion requested", "note": "Implement session deletion in backend"}
-
-@app.get("/sessions")
-async def list_sessions():
-    """List all sessions (placeholder - implement based on your needs)"""
-    # This would require implementing session listing in the backend
-    return {"message": "Session listing requested", "note": "Implement session listing in backend"}
+    """Delete a chat session and all of its checkpoints"""
+    deleted = await get_backend().adelete_session(session_id)
+    if not deleted:
+        raise HTTPException(status_code=500, detail=f"Error deleting session {session_id}")
+    return {"message": f"Session {session_id} deleted", "deleted": True}
+
+@app.get("/sessions", response_model=SessionList)
+async def list_sessions(
+    user: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """List sessions from the session catalog, most recently active first.
+
+    Pass the returned next_cursor as `after` to fetch the following page.
+    """
+    try:
+        page = await asyncio.to_thread(get_backend().list_sessions_page, user, after, limit)
+        return SessionList(**page)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing sessions: {str(e)}")
 
 if __name__ == "__main__":
     # Get port from environment
@@ -0,0 +1,205 @@
+"""
+Checkpoint Compactor - Retention policy and incremental VACUUM for the SQLite checkpointer
+Deletes superseded checkpoints in the background so the database tracks live conversations
+"""
+
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpoint_store import SqliteConnectionPool
+from logger_config import setup_logger
+
+logger = setup_logger("checkpoint_compactor")
+
+# --- Configuration ---
+# Keep the newest K checkpoints of every thread (0 = no count-based retention).
+# Off by default: older checkpoints are the state history used for time travel
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "0"))
+# Keep every checkpoint newer than N days (0 = no age-based retention)
+CHECKPOINT_MAX_AGE_DAYS = float(os.getenv("CHECKPOINT_MAX_AGE_DAYS", "0"))
+# How often the background compactor runs (0 = only when compact() is called)
+CHECKPOINT_COMPACT_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL_SECONDS", "600"))
+
+DELETE_BATCH_SIZE = 500
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+def checkpoint_timestamp(checkpoint_id: str) -> Optional[float]:
+    """Unix time encoded in a LangGraph checkpoint ID (a version 6 UUID)"""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except (ValueError, TypeError):
+        return None
+    if value.version != 6:
+        return None
+    timestamp = ((value.int >> 80) << 12) | ((value.int >> 64) & 0x0FFF)
+    return (timestamp - _UUID_EPOCH_OFFSET) / 10_000_000
+
+def combine_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One report for several databases compacted together: counts and sizes add up"""
+    combined: Dict[str, Any] = {
+        "checkpoints_deleted": 0, "writes_deleted": 0, "threads_compacted": 0,
+        "bytes_before": 0, "bytes_after": 0, "reclaimed_bytes": 0, "free_bytes": 0,
+        "duration_seconds": 0.0,
+    }
+    for report in reports:
+        for key in combined:
+            combined[key] += report[key]
+    combined["duration_seconds"] = round(combined["duration_seconds"], 3)
+    combined["databases"] = len(reports)
+    combined["finished_at"] = datetime.now().isoformat()
+    return combined
+
+class CheckpointCompactor:
+    """Applies the retention policy to the checkpoints and writes tables.
+
+    A checkpoint is kept when it is among the newest `keep_last` of its thread or
+    is younger than `max_age_days`. The newest checkpoint of a thread is always
+    kept, because it holds the live conversation state.
+    """
+
+    def __init__(self, pool: SqliteConnectionPool,
+                 keep_last: int = CHECKPOINT_KEEP_LAST,
+                 max_age_days: float = CHECKPOINT_MAX_AGE_DAYS,
+                 interval_seconds: float = CHECKPOINT_COMPACT_INTERVAL_SECONDS):
+        self.pool = pool
+        self.keep_last = max(0, int(keep_last))
+        self.max_age_days = max(0.0, float(max_age_days))
+        self.interval_seconds = interval_seconds
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keep_last or self.max_age_days)
+
+    def start(self):
+        """Run compact() every interval_seconds on a daemon thread"""
+        if not self.enabled or self.interval_seconds <= 0 or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="checkpoint-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.compact()
+            except Exception as e:
+                logger.exception("Error compacting checkpoints: %s", e)
+
+    def _database_bytes(self) -> Tuple[int, int]:
+        with self.pool.read() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_count * page_size, freelist * page_size
+
+    def _expired_checkpoints(self) -> List[Tuple[str, str, str]]:
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        with self.pool.read() as conn:
+            rows = conn.execute("""
+                SELECT thread_id, checkpoint_ns, checkpoint_id, rank FROM (
+                    SELECT thread_id, checkpoint_ns, checkpoint_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                           ) AS rank
+                    FROM checkpoints
+                ) WHERE rank > ?
+            """, (max(1, self.keep_last),)).fetchall()
+
+        expired = []
+        for thread_id, checkpoint_ns, checkpoint_id, rank in rows:
+            if cutoff is not None:
+                created = checkpoint_timestamp(checkpoint_id)
+                if created is None or created >= cutoff:
+                    continue
+            expired.append((thread_id, checkpoint_ns, checkpoint_id))
+        return expired
+
+    def incremental_vacuum_enabled(self) -> bool:
+        with self.pool.read() as conn:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def convert_to_incremental_vacuum(self) -> bool:
+        """Switch a database created without incremental auto-vacuum over to it.
+
+        This rewrites the whole file with VACUUM and needs the only connection to
+        it, so it is an explicit maintenance step with the chatbot stopped (python
+        launcher.py vacuum), never part of the background loop. Returns False if the
+        database was already incremental.
+        """
+        with self.pool.write_lock:
+            writer = self.pool.writer
+            if writer.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            # VACUUM cannot change auto_vacuum in WAL mode, so leave it for the rewrite
+            wal = writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            if wal:
+                writer.execute("PRAGMA journal_mode=DELETE")
+            try:
+                writer.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                writer.execute("VACUUM")
+            finally:
+                if wal:
+                    writer.execute("PRAGMA journal_mode=WAL")
+        return True
+
+    def compact(self) -> Dict[str, Any]:
+        """Delete expired checkpoints and their writes, then release the freed pages.
+
+        Returns a report with the number of rows removed and the bytes reclaimed.
+        """
+        started = time.perf_counter()
+        bytes_before, _ = self._database_bytes()
+
+        expired = self._expired_checkpoints() if self.enabled else []
+        checkpoints_deleted = writes_deleted = 0
+        for start in range(0, len(expired), DELETE_BATCH_SIZE):
+            batch = expired[start:start + DELETE_BATCH_SIZE]
+            # Short transactions, so live turns only wait for one batch at a time
+            with self.pool.write() as cur:
+                cur.executemany(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", batch
+                )
+                writes_deleted += max(cur.rowcount, 0)
+                cur.executemany(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", batch
+                )
+                checkpoints_deleted += max(cur.rowcount, 0)
+
+        # Without incremental auto-vacuum the freed pages stay in the file for reuse
+        # until convert_to_incremental_vacuum() has been run once
+        with self.pool.write_lock:
+            # sqlite3's execute() steps the pragma once and frees a single page;
+            # executescript() runs it to completion
+            self.pool.writer.executescript("PRAGMA incremental_vacuum;")
+
+        bytes_after, free_bytes = self._database_bytes()
+        report = {
+            "checkpoints_deleted": checkpoints_deleted,
+            "writes_deleted": writes_deleted,
+            "threads_compacted": len({(thread_id, ns) for thread_id, ns, _ in expired}),
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "reclaimed_bytes": bytes_before - bytes_after,
+            "free_bytes": free_bytes,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "finished_at": datetime.now().isoformat(),
+        }
+        self.last_report = report
+        if checkpoints_deleted:
+            logger.info("Checkpoint compaction removed %d checkpoints and reclaimed %d bytes",
+                        checkpoints_deleted, report["reclaimed_bytes"], extra={"compaction": report})
+        return report
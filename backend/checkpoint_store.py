@@ -0,0 +1,210 @@
+"""
+Checkpoint Store - Pooled SQLite persistence for LangGraph checkpoints
+One serialized writer connection plus a pool of reader connections in WAL mode
+"""
+
+import os
+import queue
+import sqlite3
+import asyncio
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, Mapping, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+# --- Configuration ---
+SQLITE_READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", "4"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def connect_sqlite(db_path: str, busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS, read_only: bool = False) -> sqlite3.Connection:
+    """Open a SQLite connection tuned for concurrent access"""
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=busy_timeout_ms / 1000)
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+    if not read_only:
+        # Takes effect only in a database without tables, so new databases free deleted
+        # pages incrementally; it has to come before WAL mode, which initializes the file
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    if db_path != ":memory:":
+        # WAL lets readers proceed while the writer commits; NORMAL sync is durable in WAL mode
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+class SqliteConnectionPool:
+    """A single writer connection guarded by a lock, and up to N reader connections.
+
+    Readers are opened on demand and handed out one thread at a time, so reads
+    scale across threads while writes are serialized in-process instead of
+    contending for SQLite's file lock.
+    """
+
+    def __init__(self, db_path: str, readers: int = SQLITE_READER_POOL_SIZE, busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        # An in-memory database is private to its connection, so it cannot have readers
+        self.max_readers = 0 if db_path == ":memory:" else max(0, readers)
+        self.writer = connect_sqlite(db_path, busy_timeout_ms)
+        self.write_lock = threading.RLock()
+        self._idle_readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+        self.closed = False
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Cursor]:
+        """Run statements on the writer connection and commit them as one transaction"""
+        with self.write_lock:
+            cur = self.writer.cursor()
+            try:
+                yield cur
+                self.writer.commit()
+            except BaseException:
+                self.writer.rollback()
+                raise
+            finally:
+                cur.close()
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a reader connection (or the writer when there are no readers)"""
+        if not self.max_readers:
+            with self.write_lock:
+                yield self.writer
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if self.closed:
+                conn.close()
+            else:
+                self._idle_readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._idle_readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._all_readers) < self.max_readers:
+                conn = connect_sqlite(self.db_path, self.busy_timeout_ms, read_only=True)
+                self._all_readers.append(conn)
+                return conn
+        return self._idle_readers.get()
+
+    def close(self):
+        """Close the writer and every idle reader"""
+        self.closed = True
+        while True:
+            try:
+                self._idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self.write_lock:
+            self.writer.close()
+
+class PooledSqliteSaver(SqliteSaver):
+    """SqliteSaver that writes through the pool's writer and reads from its readers.
+
+    The async methods run the sync implementation on a small thread pool, so the
+    same saver backs both invoke() and ainvoke() without blocking the event loop.
+    """
+
+    def __init__(self, pool: SqliteConnectionPool, *, serde=None):
+        self.pool = pool
+        self._local = threading.local()
+        super().__init__(pool.writer, serde=serde)
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool.max_readers + 2,
+            thread_name_prefix="checkpoint-io"
+        )
+        with pool.write_lock:
+            self.setup()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # SqliteSaver.list() opens a second cursor on self.conn; point it at the
+        # reader this thread is already holding so the read stays off the writer
+        return getattr(self._local, "conn", None) or self.pool.writer
+
+    @conn.setter
+    def conn(self, value: sqlite3.Connection):
+        pass
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if transaction:
+            with self.pool.write() as cur:
+                yield cur
+            return
+
+        with self.pool.read() as conn:
+            previous = getattr(self._local, "conn", None)
+            self._local.conn = conn
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+                self._local.conn = previous
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run_in_executor(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await self._run_in_executor(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._run_in_executor(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await self._run_in_executor(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self._run_in_executor(self.delete_thread, thread_id)
+
+    async def aget_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]) -> Mapping[str, Any]:
+        return await self._run_in_executor(
+            functools.partial(self.get_delta_channel_history, config=config, channels=channels)
+        )
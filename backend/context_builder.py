@@ -0,0 +1,116 @@
+"""
+Context Builder - Fits the prompt sent to the LLM into a token budget
+Pins the system prompt (with the summary) and keeps the newest messages that fit
+"""
+
+import os
+import math
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, AIMessage, SystemMessage, ToolMessage
+
+from lru import LRUCache
+from logger_config import setup_logger
+
+logger = setup_logger("context_builder")
+
+# --- Configuration ---
+# Context window of the chat model, and the part of it left free for the reply
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "8000"))
+CONTEXT_RESERVE_TOKENS = int(os.getenv("CONTEXT_RESERVE_TOKENS", "1024"))
+# "approx" (about four characters per token) or a tiktoken encoding name such as "cl100k_base"
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "approx")
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "50000"))
+
+# Role markers and separators every message adds on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def approximate_token_count(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+def make_token_counter(tokenizer: str = CONTEXT_TOKENIZER) -> Callable[[str], int]:
+    """A text -> token count function; falls back to the approximation if tiktoken is unavailable"""
+    if tokenizer == "approx":
+        return approximate_token_count
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(tokenizer)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning("Could not load tokenizer '%s', approximating token counts: %s", tokenizer, e)
+        return approximate_token_count
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        text = content
+    else:
+        text = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        text += " ".join(f"{call['name']} {call['args']}" for call in message.tool_calls)
+    return text
+
+class ContextBuilder:
+    """Selects the messages sent to the LLM so the prompt stays within a token budget.
+
+    System messages are always kept. The other messages are kept newest first
+    until the budget runs out, so the prompt is always a recent suffix of the
+    conversation. An AI message that calls tools is kept or dropped together with
+    its tool results, because the API rejects tool results without their call.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS, reserve_tokens: int = CONTEXT_RESERVE_TOKENS,
+                 counter: Optional[Callable[[str], int]] = None, cache_size: int = TOKEN_COUNT_CACHE_SIZE):
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.counter = counter or make_token_counter()
+        # Message IDs are stable and messages are never edited, so a count is computed once
+        self._counts = LRUCache(cache_size)
+
+    @property
+    def budget(self) -> int:
+        return max(0, self.max_tokens - self.reserve_tokens)
+
+    def count_message(self, message: BaseMessage) -> int:
+        if message.id:
+            count = self._counts.get(message.id)
+            if count is not None:
+                return count
+        count = self.counter(_message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+        if message.id:
+            self._counts.put(message.id, count)
+        return count
+
+    @staticmethod
+    def _blocks(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+        """Group each AI tool call with the tool results that follow it"""
+        blocks: List[List[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, ToolMessage) and blocks and (
+                isinstance(blocks[-1][0], AIMessage) and blocks[-1][0].tool_calls
+            ):
+                blocks[-1].append(message)
+            else:
+                blocks.append([message])
+        return blocks
+
+    def build(self, system_messages: List[SystemMessage],
+              history: List[BaseMessage]) -> Tuple[List[BaseMessage], int]:
+        """The messages to send and their token count.
+
+        The newest block is kept even if it alone exceeds the budget, since it
+        holds the message the LLM has to answer.
+        """
+        pinned = list(system_messages) + [m for m in history if isinstance(m, SystemMessage)]
+        used = sum(self.count_message(m) for m in pinned)
+
+        selected: List[List[BaseMessage]] = []
+        for block in reversed(self._blocks([m for m in history if not isinstance(m, SystemMessage)])):
+            cost = sum(self.count_message(m) for m in block)
+            if selected and used + cost > self.budget:
+                break
+            selected.append(block)
+            used += cost
+
+        kept = [m for block in reversed(selected) for m in block]
+        return pinned + kept, used
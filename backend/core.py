@@ -4,28 +4,52 @@ Enhanced version of the provided LangGraph sample with tools support
 """
 
 import os
+import sys
 import uuid
-from typing import Annotated, Literal, List, Optional, Dict, Any
+import asyncio
+import logging
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Annotated, Literal, List, Optional, Dict, Any, AsyncIterator
 import operator
 from datetime import datetime
 
 from langchain_core.messages import (
     BaseMessage, HumanMessage, AIMessage, SystemMessage, RemoveMessage
 )
-from langchain_openai import ChatOpenAI
-from langchain_ollama import OllamaEmbeddings
 from langchain_core.tools import BaseTool, tool
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda, RunnableConfig
 
 from langgraph.graph import StateGraph, END, MessagesState
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.pregel import Pregel
-from langgraph.prebuilt import ToolNode
 
-# Load environment variables
+# Load environment variables (before the sibling modules, which read their settings on import)
 from dotenv import load_dotenv
 load_dotenv("config/.env")
 
+# Sibling backend modules are imported by name, whichever way this module was imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from logger_config import setup_logger
+from storage import open_storage, sqlite_url, DATABASE_URL
+from metrics import MeteredCheckpointSaver, metrics_callback, NODE_SECONDS, METRICS_ENABLED
+from tracing import tracer, optional_span
+from tool_executor import BudgetedToolNode
+from lru import LRUCache
+from session_catalog import MAX_PAGE_SIZE
+from checkpoint_compactor import CheckpointCompactor, combine_reports
+from memory_index import HashingEmbeddings, MEMORY_SEARCH_TOP_K
+from embedding_cache import CachedEmbeddings, LazyEmbeddings
+from session_locks import SessionLocks
+from context_builder import ContextBuilder
+from response_cache import ResponseCache, RESPONSE_CACHE_SEMANTIC
+from llm_client import get_chat_model, llm_client_stats
+
+logger = setup_logger("core")
+
 # --- Configuration ---
 LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://141.98.210.15:15203/v1")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "deepseek-r1")
@@ -33,11 +57,20 @@ LLM_API_KEY = os.getenv("LLM_API_KEY", "324")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.5"))
 
 OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/chatbot.db")
+# "ollama" embeds memory with OLLAMA_EMBEDDING_MODEL, "hashing" uses the local stand-in
+MEMORY_EMBEDDINGS = os.getenv("MEMORY_EMBEDDINGS", "ollama")
+# Threads embedding new messages into the memory index, apart from the summarizers
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "1"))
 
 # --- Constants for Summarization ---
 MESSAGES_TO_KEEP_AFTER_SUMMARY = int(os.getenv("MESSAGES_TO_KEEP_AFTER_SUMMARY", "2"))
 NEW_MESSAGES_THRESHOLD_FOR_SUMMARY = int(os.getenv("NEW_MESSAGES_THRESHOLD_FOR_SUMMARY", "10"))
+# Summarize in the background after the reply is returned, instead of inside the turn
+DEFER_SUMMARIZATION = os.getenv("DEFER_SUMMARIZATION", "true").lower() in ("1", "true", "yes")
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+
+# --- Session cache ---
+KNOWN_SESSION_CACHE_SIZE = int(os.getenv("KNOWN_SESSION_CACHE_SIZE", "10000"))
 
 # --- Helper to ensure message has an ID ---
 def ensure_message_has_id(message: BaseMessage) -> BaseMessage:
@@ -46,20 +79,58 @@ def ensure_message_has_id(message: BaseMessage) -> BaseMessage:
         message.id = new_id
     return message
 
-# --- Initialize LLM & Embeddings ---
-llm = ChatOpenAI(
-    base_url=LLM_BASE_URL, 
-    model_name=LLM_MODEL_NAME, 
-    temperature=LLM_TEMPERATURE, 
-    api_key=LLM_API_KEY
-)
+# --- Lazily initialized clients ---
+# Importing this module loads no client library and touches no network: the LLM,
+# the embeddings model, the caches and the graph are created on first use.
+# Assigning one of these module attributes (e.g. a fake LLM in tests) replaces it.
+_lazy_lock = threading.RLock()
+
+def _lazy(name: str, factory):
+    value = globals().get(name)
+    if value is None:
+        with _lazy_lock:
+            value = globals().get(name)
+            if value is None:
+                value = factory()
+                globals()[name] = value
+    return value
+
+def get_llm():
+    """The chat model; chat and summarization share one pooled HTTP client and concurrency limit"""
+    return _lazy("llm", lambda: get_chat_model(
+        base_url=LLM_BASE_URL,
+        model_name=LLM_MODEL_NAME,
+        temperature=LLM_TEMPERATURE,
+        api_key=LLM_API_KEY
+    ))
+
+def get_llm_with_tools():
+    return _lazy("llm_with_tools", lambda: get_llm().bind_tools(tools))
+
+def _ollama_embeddings() -> Embeddings:
+    from langchain_ollama import OllamaEmbeddings
+    ollama = OllamaEmbeddings(model=OLLAMA_EMBEDDING_MODEL)
+    logger.info("OllamaEmbeddings initialized with model: %s", OLLAMA_EMBEDDING_MODEL)
+    return ollama
+
+def _memory_embeddings() -> Embeddings:
+    # Falls back to hashing only without the Ollama client; an unreachable server is not detected
+    if MEMORY_EMBEDDINGS == "hashing" or importlib.util.find_spec("langchain_ollama") is None:
+        return HashingEmbeddings()
+    return LazyEmbeddings(_ollama_embeddings, model=OLLAMA_EMBEDDING_MODEL)
+
+def get_memory_embeddings() -> Embeddings:
+    return _lazy("memory_embeddings", _memory_embeddings)
 
-try:
-    embeddings = OllamaEmbeddings(model=OLLAMA_EMBEDDING_MODEL)
-    print(f"✓ OllamaEmbeddings initialized with model: {OLLAMA_EMBEDDING_MODEL}")
-except Exception as e:
-    print(f"⚠️ Warning: Could not initialize OllamaEmbeddings: {e}")
-    embeddings = None
+def get_context_builder() -> ContextBuilder:
+    """Fits each LLM prompt into CONTEXT_MAX_TOKENS, caching token counts per message ID"""
+    return _lazy("context_builder", ContextBuilder)
+
+def get_response_cache() -> ResponseCache:
+    """Reuses replies to repeated prompts (off unless RESPONSE_CACHE_ENABLED is set)"""
+    return _lazy("response_cache", lambda: ResponseCache(
+        embeddings=get_memory_embeddings() if RESPONSE_CACHE_SEMANTIC else None
+    ))
 
 # --- Define Tools ---
 @tool
@@ -82,17 +153,26 @@ def calculate(expression: str) -> str:
         return f"Error: {str(e)}"
 
 @tool
-def search_memory(query: str) -> str:
+def search_memory(query: str, config: RunnableConfig) -> str:
     """Search through conversation memory for relevant information."""
-    # This is a placeholder - in a real implementation, you'd use vector search
-    return f"Memory search results for '{query}': No relevant memories found yet."
+    configurable = config.get("configurable", {})
+    index = configurable.get("memory_index")
+    session_id = configurable.get("thread_id")
+    if index is None or not session_id:
+        return f"Memory search results for '{query}': Memory search is not available."
+    
+    hits = index.search(session_id, query, k=MEMORY_SEARCH_TOP_K)
+    if not hits:
+        return f"Memory search results for '{query}': No relevant memories found."
+    
+    lines = [f"Memory search results for '{query}':"]
+    for i, hit in enumerate(hits, 1):
+        lines.append(f"{i}. [{hit['role']}, relevance {hit['score']:.2f}] {hit['content']}")
+    return "\n".join(lines)
 
 # Available tools
 tools = [get_current_time, calculate, search_memory]
-tool_node = ToolNode(tools)
-
-# Create tool-calling LLM
-llm_with_tools = llm.bind_tools(tools)
+tool_names = [t.name for t in tools]
 
 # --- Define Enhanced Graph State ---
 class AgentState(MessagesState):
@@ -114,14 +194,17 @@ def should_continue(state: AgentState) -> Literal["tools", "should_summarize_nod
     # Otherwise we check if we should summarize
     return "should_summarize_node"
 
+def after_tools(state: AgentState) -> Literal["llm_caller", "should_summarize_node"]:
+    """Return tool results to the LLM, unless the tools node ended the turn with a reply."""
+    if isinstance(state["messages"][-1], AIMessage):
+        return "should_summarize_node"
+    return "llm_caller"
+
 # --- Define Enhanced Nodes ---
-def call_llm_node(state: AgentState) -> dict:
-    print("--- Node: call_llm_node ---")
+def _build_llm_messages(state: AgentState) -> List[BaseMessage]:
+    """Assemble the system prompt, summary and history sent to the LLM."""
     current_messages_in_state = state['messages']
     summary = state.get("summary", "")
-    session_id = state.get("session_id", "default")
-    
-    messages_to_send_to_llm = []
     
     # Add system prompt with context
     system_prompt = """You are a helpful AI assistant with access to tools. You can:
@@ -135,18 +218,26 @@ def call_llm_node(state: AgentState) -> dict:
     if summary:
         system_prompt += f"\n\nConversation summary so far: {summary}"
     
-    messages_to_send_to_llm.append(ensure_message_has_id(SystemMessage(content=system_prompt)))
+    # Add the conversation history that fits the token budget, newest first.
+    # The prompt gets its ID afterwards: it changes every turn, so its count is not cached
+    history = [msg for msg in current_messages_in_state if not isinstance(msg, RemoveMessage)]
+    system_message = SystemMessage(content=system_prompt)
+    messages_to_send_to_llm, context_tokens = get_context_builder().build([system_message], history)
+    ensure_message_has_id(system_message)
     
-    # Add conversation history
-    for msg in current_messages_in_state:
-        if not isinstance(msg, RemoveMessage):
-            messages_to_send_to_llm.append(msg)
+    dropped = len(history) + 1 - len(messages_to_send_to_llm)
+    if dropped:
+        logger.info("Context budget: sending %d messages (~%d tokens), %d older messages left out",
+                    len(messages_to_send_to_llm), context_tokens, dropped,
+                    extra={"context_tokens": context_tokens, "dropped_messages": dropped})
 
     if not any(isinstance(m, (HumanMessage, SystemMessage)) for m in messages_to_send_to_llm):
         messages_to_send_to_llm.append(ensure_message_has_id(HumanMessage(content="Hello.")))
 
-    response = llm_with_tools.invoke(messages_to_send_to_llm)
-    
+    return messages_to_send_to_llm
+
+def _llm_turn_update(response: BaseMessage) -> dict:
+    """Build the state update for an LLM response."""
     # Track tools used
     tools_used = []
     if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -158,22 +249,43 @@ def call_llm_node(state: AgentState) -> dict:
         "tools_used": tools_used
     }
 
+def call_llm_node(state: AgentState) -> dict:
+    logger.debug("Node: call_llm_node")
+    messages = _build_llm_messages(state)
+    preferences = state.get("user_preferences")
+    llm_with_tools, response_cache = get_llm_with_tools(), get_response_cache()
+    response = response_cache.lookup(messages, llm_with_tools, tool_names, preferences)
+    if response is None:
+        response = llm_with_tools.invoke(messages)
+        response_cache.store(messages, llm_with_tools, response, tool_names, preferences)
+    return _llm_turn_update(response)
+
+async def acall_llm_node(state: AgentState) -> dict:
+    logger.debug("Node: call_llm_node (async)")
+    messages = _build_llm_messages(state)
+    preferences = state.get("user_preferences")
+    llm_with_tools, response_cache = get_llm_with_tools(), get_response_cache()
+    response = response_cache.lookup(messages, llm_with_tools, tool_names, preferences)
+    if response is None:
+        response = await llm_with_tools.ainvoke(messages)
+        response_cache.store(messages, llm_with_tools, response, tool_names, preferences)
+    return _llm_turn_update(response)
+
 def should_summarize_node(state: AgentState) -> dict:
-    print("--- Node: should_summarize_node ---")
     num_since_last_summary = state.get("messages_since_last_summary", 0)
+    logger.debug("Node: should_summarize_node, %d messages since last summary", num_since_last_summary)
     
-    print(f"Messages since last summary: {num_since_last_summary}")
     if num_since_last_summary >= NEW_MESSAGES_THRESHOLD_FOR_SUMMARY:
-        print(f"Condition met for summarization: {num_since_last_summary} new messages >= {NEW_MESSAGES_THRESHOLD_FOR_SUMMARY}")
+        logger.info("Condition met for summarization: %d new messages >= %d%s", num_since_last_summary,
+                    NEW_MESSAGES_THRESHOLD_FOR_SUMMARY, " (deferred until after the reply)" if DEFER_SUMMARIZATION else "")
         # Return empty dict - the conditional edge will handle routing to summarization
         return {}
     else:
-        print(f"Condition not met ({num_since_last_summary} new messages). Ending turn.")
         # Return empty dict - the conditional edge will handle routing to END
         return {}
 
-def summarize_conversation_node(state: AgentState):
-    print("--- Node: summarize_conversation_node ---")
+def _summarization_inputs(state: AgentState):
+    """Return the messages to summarize and the prompt asking the LLM to do so."""
     current_messages_in_state = state['messages']
     
     # Messages to summarize
@@ -200,10 +312,15 @@ def summarize_conversation_node(state: AgentState):
         full_summarization_prompt_text += f"\nPrevious Summary:\n{existing_summary}\n\nNew Excerpts to Incorporate:\n"
     full_summarization_prompt_text += "\n".join(formatted_messages_for_summary_prompt)
 
-    print(f"DEBUG: Summarization prompt (first 300): {full_summarization_prompt_text[:300]}...")
-    summary_llm_response = llm.invoke([ensure_message_has_id(HumanMessage(content=full_summarization_prompt_text))])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Summarization prompt (first 300): %s...", full_summarization_prompt_text[:300])
+    return messages_to_summarize_content_from, [ensure_message_has_id(HumanMessage(content=full_summarization_prompt_text))]
+
+def _summary_update(state: AgentState, messages_to_summarize_content_from: List[BaseMessage], summary_llm_response: BaseMessage) -> dict:
+    """Build the state update that stores the summary and prunes summarized messages."""
     new_summary = summary_llm_response.content.strip()
-    print(f"Generated new summary: '{new_summary[:100]}...'")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Generated new summary: '%s...'", new_summary[:100])
 
     # Create removal directives
     delete_directives = []
@@ -215,11 +332,13 @@ def summarize_conversation_node(state: AgentState):
             if hasattr(m_to_remove, 'id') and m_to_remove.id is not None and isinstance(m_to_remove.id, str):
                 delete_directives.append(RemoveMessage(id=m_to_remove.id))
             else:
-                print(f"Critical Warning: Summarized message type {type(m_to_remove)} content '{m_to_remove.content[:20]}' lacks valid ID for removal.")
+                logger.warning("Summarized message type %s content '%s' lacks valid ID for removal.",
+                               type(m_to_remove).__name__, m_to_remove.content[:20])
 
-        print(f"Creating RemoveMessage directives for {len(delete_directives)} messages from the current summarization block.")
+        logger.debug("Creating RemoveMessage directives for %d messages from the current summarization block.",
+                     len(delete_directives))
     else:
-        print("Not enough messages in the current summarization block to prune, or keeping all of them.")
+        logger.debug("Not enough messages in the current summarization block to prune, or keeping all of them.")
 
     current_msg_since_last_summary = state.get("messages_since_last_summary", 0)
     return {
@@ -228,131 +347,512 @@ def summarize_conversation_node(state: AgentState):
         "messages_since_last_summary": MESSAGES_TO_KEEP_AFTER_SUMMARY - current_msg_since_last_summary
     }
 
+def summarize_conversation_node(state: AgentState):
+    logger.debug("Node: summarize_conversation_node")
+    messages_to_summarize, prompt = _summarization_inputs(state)
+    summary_llm_response = get_llm().invoke(prompt)
+    return _summary_update(state, messages_to_summarize, summary_llm_response)
+
+async def asummarize_conversation_node(state: AgentState):
+    logger.debug("Node: summarize_conversation_node (async)")
+    messages_to_summarize, prompt = _summarization_inputs(state)
+    summary_llm_response = await get_llm().ainvoke(prompt)
+    return _summary_update(state, messages_to_summarize, summary_llm_response)
+
 def should_summarize_router(state: AgentState) -> Literal["summarize_conversation_node", "__end__"]:
     """Router function to determine if we should summarize or end"""
     num_since_last_summary = state.get("messages_since_last_summary", 0)
     
-    if num_since_last_summary >= NEW_MESSAGES_THRESHOLD_FOR_SUMMARY:
+    # When deferred, ChatbotBackend summarizes after the turn instead
+    if num_since_last_summary >= NEW_MESSAGES_THRESHOLD_FOR_SUMMARY and not DEFER_SUMMARIZATION:
         return "summarize_conversation_node"
     else:
         return "__end__"
 
 # --- Define Graph ---
-workflow = StateGraph(AgentState)
-
-# Add nodes
-workflow.add_node("llm_caller", call_llm_node)
-workflow.add_node("tools", tool_node)
-workflow.add_node("summarize_conversation_node", summarize_conversation_node)
-
-# Set entry point
-workflow.set_entry_point("llm_caller")
+def build_workflow() -> StateGraph:
+    """The agent graph, before compilation"""
+    workflow = StateGraph(AgentState)
+    
+    # Add nodes (each LLM node has a sync and an async implementation so the same
+    # graph serves both invoke() and ainvoke())
+    workflow.add_node("llm_caller", RunnableLambda(call_llm_node, afunc=acall_llm_node, name="llm_caller"))
+    # Tool calls of a step run concurrently, within per-call timeouts and a per-turn budget
+    workflow.add_node("tools", BudgetedToolNode(tools).as_runnable("tools"))
+    workflow.add_node(
+        "summarize_conversation_node",
+        RunnableLambda(summarize_conversation_node, afunc=asummarize_conversation_node, name="summarize_conversation_node")
+    )
+    
+    # Set entry point
+    workflow.set_entry_point("llm_caller")
+    
+    # Add conditional edges
+    workflow.add_conditional_edges(
+        "llm_caller",
+        should_continue,
+        {"tools": "tools", "should_summarize_node": "should_summarize_node"}
+    )
+    
+    workflow.add_conditional_edges(
+        "tools",
+        after_tools,
+        {"llm_caller": "llm_caller", "should_summarize_node": "should_summarize_node"}
+    )
+    
+    # Add summarization nodes and edges
+    workflow.add_node("should_summarize_node", should_summarize_node)
+    workflow.add_conditional_edges(
+        "should_summarize_node",
+        should_summarize_router,  # Use the separate router function
+        {"summarize_conversation_node": "summarize_conversation_node", "__end__": END}
+    )
+    workflow.add_edge("summarize_conversation_node", END)
+    
+    return workflow
 
-# Add conditional edges
-workflow.add_conditional_edges(
-    "llm_caller",
-    should_continue,
-    {"tools": "tools", "should_summarize_node": "should_summarize_node"}
-)
+def get_compiled_workflow() -> Pregel:
+    """The workflow compiled once per process; backends attach their checkpointer to a copy"""
+    return _lazy("compiled_workflow", lambda: build_workflow().compile())
 
-workflow.add_edge("tools", "llm_caller")
+# Module attributes created on first access, e.g. core.llm
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "llm_with_tools": get_llm_with_tools,
+    "memory_embeddings": get_memory_embeddings,
+    "context_builder": get_context_builder,
+    "response_cache": get_response_cache,
+}
 
-# Add summarization nodes and edges
-workflow.add_node("should_summarize_node", should_summarize_node)
-workflow.add_conditional_edges(
-    "should_summarize_node",
-    should_summarize_router,  # Use the separate router function
-    {"summarize_conversation_node": "summarize_conversation_node", "__end__": END}
-)
-workflow.add_edge("summarize_conversation_node", END)
+def __getattr__(name: str):
+    getter = _LAZY_ATTRIBUTES.get(name)
+    if getter is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getter()
 
 # --- Chat Interface Functions ---
 class ChatbotBackend:
-    def __init__(self, db_path: str = "./data/chatbot_messages.sqlite"):
-        self.db_path = db_path
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    def __init__(self, db_path: Optional[str] = None, embedder: Optional[Embeddings] = None,
+                 database_url: Optional[str] = None):
+        # Storage comes from DATABASE_URL unless a database URL or SQLite file is given
+        self.database_url = database_url or (sqlite_url(db_path) if db_path else DATABASE_URL)
+        self.storage = open_storage(self.database_url)
+        self.pool = self.storage.pool
+        # Checkpoint I/O and graph runs feed the metrics served at /metrics and the turn traces
+        metered = METRICS_ENABLED or tracer.enabled
+        self.checkpointer = MeteredCheckpointSaver(self.storage.checkpointer) if metered else self.storage.checkpointer
+        self.app = get_compiled_workflow().copy(update={"checkpointer": self.checkpointer})
+        
+        # Session IDs known to have messages, so a turn does not have to load the
+        # checkpoint once to check for the session and again to run the graph
+        self.known_sessions = LRUCache(KNOWN_SESSION_CACHE_SIZE)
+        
+        # Identical texts are embedded once per model, then served from memory or disk
+        self.embedding_cache = CachedEmbeddings(embedder or get_memory_embeddings(), self.pool)
+        
+        # Vector index over every message, including ones later summarized away
+        self.memory_index = self.storage.memory_index(self.embedding_cache)
+        
+        # Turns and background summaries of one session never interleave their writes
+        self.session_locks = SessionLocks()
+        self.summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summarizer")
+        self._summary_futures: Dict[str, Future] = {}
+        self._summary_guard = threading.Lock()
         
-        # Use direct SQLite connection with thread safety like in the example
-        import sqlite3
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.checkpointer = SqliteSaver(self.conn)
-        self.app = workflow.compile(checkpointer=self.checkpointer)
+        # Messages are embedded into the memory index after the reply, on their own
+        # executor so they never queue behind a summary's LLM call
+        self.index_executor = ThreadPoolExecutor(max_workers=INDEX_WORKERS, thread_name_prefix="indexer")
+        self._index_pending: Dict[str, Dict[str, BaseMessage]] = {}
+        self._index_futures: Dict[str, Future] = {}
+        self._index_guard = threading.Lock()
         
-        print(f"✓ Chatbot backend initialized with SQLite persistence: {db_path}")
+        # Indexed per-session metadata, so listings never deserialize checkpoints
+        self.catalog = self.storage.session_catalog()
+        if self.catalog.is_empty():
+            self._backfill_catalog()
+        
+        # Background retention so the database tracks live state, not every step
+        self.compactors = [CheckpointCompactor(pool) for pool in self.storage.checkpoint_pools]
+        for compactor in self.compactors:
+            compactor.start()
+        
+        logger.info("Chatbot backend initialized with storage: %s", self.database_url)
     
     def close(self):
-        """Close the database connection"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
-            print("✓ Database connection closed")
+        """Close the database connections"""
+        for compactor in getattr(self, 'compactors', []):
+            compactor.stop()
+        if hasattr(self, 'summary_executor'):
+            self.summary_executor.shutdown(wait=True)
+        if hasattr(self, 'index_executor'):
+            self.index_executor.shutdown(wait=True)
+        if hasattr(self, 'storage') and not self.storage.closed:
+            self.storage.close()
+            logger.info("Database connection closed")
+    
+    async def aclose(self):
+        """Close the database connections from async code (waiting for background work off the loop)"""
+        await asyncio.to_thread(self.close)
     
     def __del__(self):
         """Cleanup when object is destroyed"""
         self.close()
     
+    def _schedule_summary(self, session_id: str, values: dict):
+        """Queue a background summary once a turn crosses the threshold (at most one per session)"""
+        if not DEFER_SUMMARIZATION:
+            return
+        if values.get("messages_since_last_summary", 0) < NEW_MESSAGES_THRESHOLD_FOR_SUMMARY:
+            return
+        
+        with self._summary_guard:
+            if session_id in self._summary_futures:
+                return
+            try:
+                future = self.summary_executor.submit(self._summarize_session, session_id)
+            except RuntimeError:
+                # The backend is shutting down
+                return
+            self._summary_futures[session_id] = future
+        future.add_done_callback(lambda _: self._finish_summary(session_id))
+    
+    def _finish_summary(self, session_id: str):
+        with self._summary_guard:
+            self._summary_futures.pop(session_id, None)
+    
+    def _summarize_session(self, session_id: str):
+        """Summarize a session off the request path and merge the result into its latest checkpoint.
+        
+        The LLM call works on a snapshot, so turns keep running meanwhile. The update
+        only removes the summarized messages by ID and adjusts the message counter by
+        a delta, so messages added after the snapshot are kept and still counted.
+        """
+        config = self.get_config(session_id)
+        try:
+            snapshot = self.app.get_state(config)
+            if not self._has_messages(snapshot):
+                return
+            state = snapshot.values
+            if state.get("messages_since_last_summary", 0) < NEW_MESSAGES_THRESHOLD_FOR_SUMMARY:
+                return
+            
+            logger.debug("Background summarization for session %s", session_id, extra={"session_id": session_id})
+            started = time.perf_counter()
+            messages_to_summarize, prompt = _summarization_inputs(state)
+            summary_llm_response = get_llm().invoke(prompt, config={"callbacks": config.get("callbacks")})
+            update = _summary_update(state, messages_to_summarize, summary_llm_response)
+            # Deferred summaries run outside the graph, so time them as the node they replace
+            NODE_SECONDS.observe(time.perf_counter() - started, node="summarize_conversation_node")
+            
+            # One checkpoint write carries the summary and the removals together
+            with self.session_locks.hold(session_id):
+                if not self._has_messages(self.app.get_state(config)):
+                    return
+                self.app.update_state(config, update, as_node="summarize_conversation_node")
+            logger.info("Summary applied to session %s", session_id, extra={"session_id": session_id})
+            
+        except Exception as e:
+            logger.exception("Error summarizing session %s: %s", session_id, e, extra={"session_id": session_id})
+    
+    def flush_summaries(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued background summaries; returns False if some are still running"""
+        with self._summary_guard:
+            futures = list(self._summary_futures.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+    
+    async def aflush_summaries(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued background summaries without blocking the event loop"""
+        return await asyncio.to_thread(self.flush_summaries, timeout)
+    
+    def _schedule_indexing(self, session_id: str, messages: List[BaseMessage]):
+        """Queue messages for the memory index (at most one job per session, later turns join it)"""
+        with self._index_guard:
+            pending = self._index_pending.setdefault(session_id, {})
+            pending.update((m.id, m) for m in messages if m.id)
+            if session_id in self._index_futures:
+                return
+            try:
+                self._index_futures[session_id] = self.index_executor.submit(self._index_session, session_id)
+            except RuntimeError:
+                # The backend is shutting down; the messages are indexed with the session's next turn
+                self._index_pending.pop(session_id, None)
+    
+    def _index_session(self, session_id: str):
+        """Embed a session's queued messages until none are left"""
+        while True:
+            with self._index_guard:
+                pending = self._index_pending.pop(session_id, None)
+                if not pending:
+                    self._index_futures.pop(session_id, None)
+                    return
+            try:
+                self.memory_index.add_messages(session_id, list(pending.values()))
+            except Exception as e:
+                # Messages stay unindexed and are retried with the next turn
+                logger.warning("Error indexing memory for session %s: %s", session_id, e, extra={"session_id": session_id})
+    
+    def _cancel_indexing(self, session_id: str):
+        """Drop a session's queued messages and wait for a job already embedding them"""
+        with self._index_guard:
+            self._index_pending.pop(session_id, None)
+            future = self._index_futures.get(session_id)
+            # A job still queued behind other sessions' indexing never starts
+            if future is not None and future.cancel():
+                del self._index_futures[session_id]
+                return
+        if future is not None:
+            wait([future])
+    
+    def flush_indexing(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued memory indexing; returns False if some is still running"""
+        with self._index_guard:
+            futures = list(self._index_futures.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+    
+    async def aflush_indexing(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued memory indexing without blocking the event loop"""
+        return await asyncio.to_thread(self.flush_indexing, timeout)
+    
+    def compact_checkpoints(self) -> Dict[str, Any]:
+        """Apply the checkpoint retention policy now and report the reclaimed bytes"""
+        return combine_reports([compactor.compact() for compactor in self.compactors])
+    
+    def get_embedding_cache_stats(self) -> Dict[str, float]:
+        """Hits per cache tier, model calls and the overall hit rate"""
+        return self.embedding_cache.stats()
+    
+    def get_llm_client_stats(self) -> Dict[str, Any]:
+        """Upstream LLM requests, queue waits and in-flight counts under the shared concurrency limit"""
+        return llm_client_stats()
+    
+    def get_response_cache_stats(self) -> Dict[str, Any]:
+        """Exact and semantic hits, misses, bypasses and the hit rate of the LLM response cache"""
+        return get_response_cache().stats()
+    
+    def set_user_preferences(self, session_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge preferences into a session's user_preferences, e.g. {"response_cache": False} to opt out of cached replies"""
+        self.initialize_session(session_id)
+        config = self.get_config(session_id)
+        with self.session_locks.hold(session_id):
+            current = self.app.get_state(config).values.get("user_preferences") or {}
+            merged = {**current, **preferences}
+            self.app.update_state(config, {"user_preferences": merged})
+        return merged
+    
     def get_config(self, session_id: str) -> dict:
         """Get configuration for a session"""
-        return {"configurable": {"thread_id": session_id}}
+        # search_memory finds the session's index through the run config
+        config = {"configurable": {"thread_id": session_id, "memory_index": self.memory_index}}
+        if METRICS_ENABLED:
+            config["callbacks"] = [metrics_callback]
+        return config
     
-    def initialize_session(self, session_id: str, system_prompt: str = None) -> bool:
-        """Initialize a new chat session"""
+    def _turn_config(self, session_id: str, trace) -> dict:
+        """Config for a turn's graph run, with the turn's trace (if it is traced) as a callback"""
         config = self.get_config(session_id)
-        current_state_snapshot = self.app.get_state(config)
+        if trace is not None:
+            config["callbacks"] = config.get("callbacks", []) + [trace]
+        return config
+    
+    def _initial_state(self, session_id: str, system_prompt: str = None) -> dict:
+        """Build the state written when a session is created"""
+        if not system_prompt:
+            system_prompt = "You are a helpful AI assistant with access to various tools. Be conversational and assist the user with their requests."
         
-        is_new_conversation = True
-        if current_state_snapshot and current_state_snapshot.values:
-            if current_state_snapshot.values.get("messages"):
-                is_new_conversation = False
+        initial_system_message = ensure_message_has_id(SystemMessage(content=system_prompt))
+        return {
+            "messages": [initial_system_message],
+            "summary": "",
+            "messages_since_last_summary": 0,
+            "tools_used": [],
+            "session_id": session_id,
+            "user_preferences": {}
+        }
+    
+    @staticmethod
+    def _has_messages(state_snapshot) -> bool:
+        return bool(state_snapshot and state_snapshot.values and state_snapshot.values.get("messages"))
+    
+    @staticmethod
+    def _extract_reply(result: dict) -> str:
+        """Get the last AI message from a graph result"""
+        reply = ""
+        for msg in reversed(result.get("messages", [])):
+            if isinstance(msg, AIMessage):
+                reply = msg.content
+                break
         
-        if is_new_conversation:
-            if not system_prompt:
-                system_prompt = "You are a helpful AI assistant with access to various tools. Be conversational and assist the user with their requests."
-            
-            initial_system_message = ensure_message_has_id(SystemMessage(content=system_prompt))
-            initial_state_update = {
-                "messages": [initial_system_message],
-                "summary": "",
-                "messages_since_last_summary": 0,
-                "tools_used": [],
-                "session_id": session_id,
-                "user_preferences": {}
-            }
-            self.app.update_state(config, initial_state_update)
-            return True
-        return False
+        return reply if reply else "I apologize, but I couldn't process your request."
     
-    def send_message(self, session_id: str, message: str) -> str:
-        """Send a message and get response"""
+    def initialize_session(self, session_id: str, system_prompt: str = None, owner: str = None) -> bool:
+        """Initialize a new chat session"""
+        if session_id in self.known_sessions:
+            return False
+        
         config = self.get_config(session_id)
+        # Concurrent calls for one session must agree on which of them created it
+        with self.session_locks.hold(session_id):
+            if session_id in self.known_sessions:
+                return False
+            created = False
+            if not self._has_messages(self.app.get_state(config)):
+                self.app.update_state(config, self._initial_state(session_id, system_prompt))
+                self.catalog.record_created(session_id, owner)
+                created = True
+            self.known_sessions.put(session_id)
+        return created
+    
+    async def ainitialize_session(self, session_id: str, system_prompt: str = None, owner: str = None) -> bool:
+        """Initialize a new chat session without blocking the event loop"""
+        if session_id in self.known_sessions:
+            return False
         
-        # Ensure session is initialized
-        self.initialize_session(session_id)
+        config = self.get_config(session_id)
+        async with self.session_locks.ahold(session_id):
+            if session_id in self.known_sessions:
+                return False
+            created = False
+            if not self._has_messages(await self.app.aget_state(config)):
+                await self.app.aupdate_state(config, self._initial_state(session_id, system_prompt))
+                await asyncio.to_thread(self.catalog.record_created, session_id, owner)
+                created = True
+            self.known_sessions.put(session_id)
+        return created
+    
+    def _record_turn(self, session_id: str, values: dict, owner: str = None, last_activity: str = None):
+        """Update the session catalog from the state written by a turn"""
+        visible = [m for m in values.get("messages", []) if isinstance(m, (HumanMessage, AIMessage)) and m.content]
+        title = next((m.content for m in visible if isinstance(m, HumanMessage)), None)
+        preview = visible[-1].content if visible else ""
+        self.catalog.record_turn(session_id, len(visible), title=title, preview=preview,
+                                 owner=owner, last_activity=last_activity)
+        # Embedding waits on the embeddings server, so it never delays the reply
+        self._schedule_indexing(session_id, visible)
+    
+    def _backfill_catalog(self):
+        """Index sessions that were written before the catalog existed (their messages are
+        embedded in the background)"""
+        thread_ids = self.storage.thread_ids()
         
-        user_message_with_id = ensure_message_has_id(HumanMessage(content=message))
-        inputs = {"messages": [user_message_with_id]}
+        for thread_id in thread_ids:
+            try:
+                snapshot = self.app.get_state(self.get_config(thread_id))
+                if self._has_messages(snapshot):
+                    self._record_turn(thread_id, snapshot.values, last_activity=snapshot.created_at)
+            except Exception as e:
+                logger.warning("Error indexing session %s: %s", thread_id, e)
         
-        try:
-            # Use invoke for consistent results like in the example
-            result = self.app.invoke(inputs, config=config)
+        if thread_ids:
+            logger.info("Indexed %d existing sessions in the session catalog", len(thread_ids))
+    
+    def send_message(self, session_id: str, message: str, owner: str = None) -> str:
+        """Send a message and get response"""
+        with tracer.turn("send_message", session_id=session_id) as trace:
+            config = self._turn_config(session_id, trace)
             
-            # Get the last AI message from the result
-            reply = ""
-            for msg in reversed(result.get("messages", [])):
-                if isinstance(msg, AIMessage):
-                    reply = msg.content
-                    break
+            # Ensure session is initialized
+            self.initialize_session(session_id, owner=owner)
             
-            return reply if reply else "I apologize, but I couldn't process your request."
+            user_message_with_id = ensure_message_has_id(HumanMessage(content=message))
+            inputs = {"messages": [user_message_with_id]}
             
-        except Exception as e:
-            print(f"Error in send_message: {e}")
-            return f"I encountered an error: {str(e)}"
+            try:
+                # Use invoke for consistent results like in the example
+                with self.session_locks.hold(session_id):
+                    result = self.app.invoke(inputs, config=config)
+                    with optional_span(trace, "record_turn"):
+                        self._record_turn(session_id, result, owner=owner)
+                self._schedule_summary(session_id, result)
+                return self._extract_reply(result)
+                
+            except Exception as e:
+                logger.exception("Error in send_message: %s", e, extra={"session_id": session_id})
+                if trace is not None:
+                    trace.set_error(e)
+                return f"I encountered an error: {str(e)}"
     
-    def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
-        """Get chat history for a session"""
-        config = self.get_config(session_id)
-        current_state_snapshot = self.app.get_state(config)
-        
+    async def asend_message(self, session_id: str, message: str, owner: str = None) -> str:
+        """Send a message and get response using the async graph, LLM and checkpointer"""
+        with tracer.turn("asend_message", session_id=session_id) as trace:
+            config = self._turn_config(session_id, trace)
+            
+            # Ensure session is initialized
+            await self.ainitialize_session(session_id, owner=owner)
+            
+            user_message_with_id = ensure_message_has_id(HumanMessage(content=message))
+            inputs = {"messages": [user_message_with_id]}
+            
+            try:
+                async with self.session_locks.ahold(session_id):
+                    result = await self.app.ainvoke(inputs, config=config)
+                    with optional_span(trace, "record_turn"):
+                        await asyncio.to_thread(self._record_turn, session_id, result, owner)
+                self._schedule_summary(session_id, result)
+                return self._extract_reply(result)
+                
+            except Exception as e:
+                logger.exception("Error in asend_message: %s", e, extra={"session_id": session_id})
+                if trace is not None:
+                    trace.set_error(e)
+                return f"I encountered an error: {str(e)}"
+
+    async def astream_message(self, session_id: str, message: str, owner: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Send a message and stream the turn as events.
+
+        Yields dicts with a "type" of:
+        - "token": a chunk of the assistant reply ("content")
+        - "tool_start" / "tool_end": a tool call starting or finishing ("id", "name", "input"/"output")
+        - "message": the final reply ("content"), always the last event of a successful turn
+        - "error": the turn failed ("content")
+        """
+        with tracer.turn("astream_message", session_id=session_id) as trace:
+            config = self._turn_config(session_id, trace)
+
+            # Ensure session is initialized
+            await self.ainitialize_session(session_id, owner=owner)
+
+            user_message_with_id = ensure_message_has_id(HumanMessage(content=message))
+            inputs = {"messages": [user_message_with_id]}
+
+            try:
+                result = {}
+                async with self.session_locks.ahold(session_id):
+                    async for event in self.app.astream_events(inputs, config=config, version="v2"):
+                        kind = event["event"]
+
+                        # Only stream the chat reply, not the summarization call
+                        if kind == "on_chat_model_stream" and event["metadata"].get("langgraph_node") == "llm_caller":
+                            content = event["data"]["chunk"].content
+                            if content and isinstance(content, str):
+                                yield {"type": "token", "content": content}
+
+                        elif kind == "on_tool_start":
+                            yield {"type": "tool_start", "id": event["run_id"], "name": event["name"],
+                                   "input": event["data"].get("input")}
+
+                        elif kind == "on_tool_end":
+                            output = event["data"].get("output")
+                            yield {"type": "tool_end", "id": event["run_id"], "name": event["name"],
+                                   "output": str(getattr(output, "content", output))}
+
+                        elif kind == "on_chain_end" and not event["parent_ids"]:
+                            result = event["data"].get("output") or {}
+
+                    with optional_span(trace, "record_turn"):
+                        await asyncio.to_thread(self._record_turn, session_id, result, owner)
+                self._schedule_summary(session_id, result)
+                yield {"type": "message", "content": self._extract_reply(result)}
+
+            except Exception as e:
+                logger.exception("Error in astream_message: %s", e, extra={"session_id": session_id})
+                if trace is not None:
+                    trace.set_error(e)
+                yield {"type": "error", "content": f"I encountered an error: {str(e)}"}
+
+    @staticmethod
+    def _history_from_snapshot(current_state_snapshot) -> List[Dict[str, Any]]:
         if not current_state_snapshot or not current_state_snapshot.values:
             return []
         
@@ -367,11 +867,16 @@ class ChatbotBackend:
         
         return history
     
-    def get_session_info(self, session_id: str) -> Dict[str, Any]:
-        """Get session information"""
-        config = self.get_config(session_id)
-        current_state_snapshot = self.app.get_state(config)
-        
+    def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get chat history for a session"""
+        return self._history_from_snapshot(self.app.get_state(self.get_config(session_id)))
+    
+    async def aget_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get chat history for a session without blocking the event loop"""
+        return self._history_from_snapshot(await self.app.aget_state(self.get_config(session_id)))
+    
+    @staticmethod
+    def _info_from_snapshot(session_id: str, current_state_snapshot) -> Dict[str, Any]:
         if not current_state_snapshot or not current_state_snapshot.values:
             return {"session_id": session_id, "exists": False}
         
@@ -386,75 +891,80 @@ class ChatbotBackend:
             "user_preferences": values.get("user_preferences", {})
         }
     
-    def list_all_sessions(self) -> List[Dict[str, Any]]:
-        """List all sessions with their metadata"""
+    def get_session_info(self, session_id: str) -> Dict[str, Any]:
+        """Get session information"""
+        return self._info_from_snapshot(session_id, self.app.get_state(self.get_config(session_id)))
+    
+    async def aget_session_info(self, session_id: str) -> Dict[str, Any]:
+        """Get session information without blocking the event loop"""
+        return self._info_from_snapshot(session_id, await self.app.aget_state(self.get_config(session_id)))
+    
+    def list_all_sessions(self, owner: str = None) -> List[Dict[str, Any]]:
+        """List all sessions with their metadata, most recently active first"""
         try:
-            # Get all threads from the checkpointer using existing connection
-            sessions = []
-            
-            # Use the existing connection to query the database
-            cursor = self.conn.cursor()
-            
-            # Get all unique thread_ids from the checkpoints table
-            cursor.execute("""
-                SELECT DISTINCT thread_id, MIN(checkpoint_ns) as first_checkpoint, MAX(checkpoint_ns) as last_checkpoint
-                FROM checkpoints 
-                GROUP BY thread_id
-                ORDER BY last_checkpoint DESC
-            """)
-            
-            for row in cursor.fetchall():
-                thread_id, first_checkpoint, last_checkpoint = row
-                
-                # Get session info for each thread
-                try:
-                    session_info = self.get_session_info(thread_id)
-                    if session_info.get("exists", False):
-                        # Add timestamps
-                        session_info["created_at"] = first_checkpoint
-                        session_info["last_activity"] = last_checkpoint
-                        
-                        # Get a preview of the conversation
-                        history = self.get_chat_history(thread_id)
-                        if history:
-                            # Get the first user message as title
-                            user_messages = [msg for msg in history if msg["role"] == "user"]
-                            if user_messages:
-                                session_info["title"] = user_messages[0]["content"][:50] + "..." if len(user_messages[0]["content"]) > 50 else user_messages[0]["content"]
-                            else:
-                                session_info["title"] = "New Chat"
-                        else:
-                            session_info["title"] = "Empty Chat"
-                        
-                        sessions.append(session_info)
-                        
-                except Exception as e:
-                    print(f"Error getting info for session {thread_id}: {e}")
-                    continue
-            
+            sessions, cursor = self.catalog.list_page(owner=owner, limit=MAX_PAGE_SIZE)
+            while cursor:
+                page, cursor = self.catalog.list_page(owner=owner, after=cursor, limit=MAX_PAGE_SIZE)
+                sessions.extend(page)
             return sessions
             
         except Exception as e:
-            print(f"Error listing sessions: {e}")
+            logger.exception("Error listing sessions: %s", e)
+            return []
+    
+    def list_sessions_page(self, owner: str = None, after: str = None, limit: int = 50) -> Dict[str, Any]:
+        """List one page of sessions from the catalog; pass next_cursor back as `after`"""
+        sessions, next_cursor = self.catalog.list_page(owner=owner, after=after, limit=limit)
+        return {"sessions": sessions, "next_cursor": next_cursor}
+    
+    def list_user_sessions(self, owner: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """A user's most recently active sessions with their cached title and preview.
+
+        One range scan on the catalog's owner index, however many sessions other users have.
+        """
+        try:
+            sessions, _ = self.catalog.list_page(owner=owner, limit=limit)
+            return sessions
+        except Exception as e:
+            logger.exception("Error listing sessions for %s: %s", owner, e)
             return []
     
+    async def alist_user_sessions(self, owner: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Like list_user_sessions, without blocking the event loop"""
+        return await asyncio.to_thread(self.list_user_sessions, owner, limit)
+    
     def delete_session(self, session_id: str) -> bool:
         """Delete a session and all its data"""
         try:
-            # Use the existing connection to delete session data
-            cursor = self.conn.cursor()
+            # Delete all checkpoints and writes for this thread_id in one write transaction
+            with self.session_locks.hold(session_id):
+                self.checkpointer.delete_thread(session_id)
+                self.catalog.delete(session_id)
+                self._cancel_indexing(session_id)
+                self.memory_index.delete(session_id)
+                self.known_sessions.discard(session_id)
             
-            # Delete all checkpoints for this thread_id
-            cursor.execute("DELETE FROM checkpoints WHERE thread_id = ?", (session_id,))
-            cursor.execute("DELETE FROM writes WHERE thread_id = ?", (session_id,))
-            
-            self.conn.commit();
+            logger.info("Session %s deleted", session_id, extra={"session_id": session_id})
+            return True
             
-            print(f"Session {session_id} deleted successfully")
+        except Exception as e:
+            logger.exception("Error deleting session %s: %s", session_id, e, extra={"session_id": session_id})
+            return False
+    
+    async def adelete_session(self, session_id: str) -> bool:
+        """Delete a session and all its data without blocking the event loop"""
+        try:
+            async with self.session_locks.ahold(session_id):
+                await self.checkpointer.adelete_thread(session_id)
+                await asyncio.to_thread(self.catalog.delete, session_id)
+                await asyncio.to_thread(self._cancel_indexing, session_id)
+                await asyncio.to_thread(self.memory_index.delete, session_id)
+                self.known_sessions.discard(session_id)
+            logger.info("Session %s deleted", session_id, extra={"session_id": session_id})
             return True
             
         except Exception as e:
-            print(f"Error deleting session {session_id}: {e}")
+            logger.exception("Error deleting session %s: %s", session_id, e, extra={"session_id": session_id})
             return False
     
     def get_session_preview(self, session_id: str) -> Dict[str, Any]:
@@ -493,7 +1003,7 @@ class ChatbotBackend:
             return preview
             
         except Exception as e:
-            print(f"Error getting session preview for {session_id}: {e}")
+            logger.warning("Error getting session preview for %s: %s", session_id, e)
             return None
 
 # --- Command Line Interface ---
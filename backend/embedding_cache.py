@@ -0,0 +1,182 @@
+"""
+Embedding Cache - Content-addressed cache in front of an embeddings model
+Vectors are keyed by (model, SHA-256 of the normalized text) in an in-memory LRU and a SQLite table
+"""
+
+import os
+import hashlib
+import threading
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from checkpoint_store import SqliteConnectionPool
+from lru import LRUCache
+from session_catalog import utc_now
+
+# --- Configuration ---
+# Vectors kept in memory; the SQLite tier is unbounded
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Identify the model behind an embeddings object, so vectors of different models never mix"""
+    for attribute in ("model", "model_name"):
+        value = getattr(embeddings, attribute, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embeddings).__name__
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with whitespace collapsed, so trivially different copies share an entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LazyEmbeddings(Embeddings):
+    """Creates the wrapped embeddings model on the first embed call.
+
+    `model` names it up front, so cache keys are known without loading its
+    client library or contacting its server.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], model: str):
+        self.factory = factory
+        self.model = model
+        self._embeddings: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> Embeddings:
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self.factory()
+        return self._embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._get().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._get().embed_query(text)
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings object; only texts never seen before reach the model.
+
+    Lookups go memory, then disk, then one batched call to the model for all
+    remaining misses. `stats()` reports hits per tier and the overall hit rate.
+    """
+
+    def __init__(self, embeddings: Embeddings, pool: SqliteConnectionPool,
+                 cache_size: int = EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.pool = pool
+        self.model = embedding_model_name(embeddings)
+        self._memory = LRUCache(cache_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "model_calls": 0}
+        self.setup()
+
+    def setup(self):
+        with self.pool.write() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            """)
+
+    def _count(self, **increments: int):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def _read_disk(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self.pool.read() as conn:
+            for start in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + _LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _write_disk(self, entries: List[Tuple[str, np.ndarray]]):
+        now = utc_now()
+        with self.pool.write() as cur:
+            cur.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, text_hash, dimensions, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.model, key, len(vector), vector.tobytes(), now) for key, vector in entries]
+            )
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[np.ndarray], int]:
+        """Vectors for the texts, plus how many distinct texts had to be embedded"""
+        normalized = [normalize_text(text) for text in texts]
+        hashes = [text_hash(text) for text in normalized]
+
+        vectors: Dict[str, np.ndarray] = {}
+        for key in set(hashes):
+            vector = self._memory.get(key)
+            if vector is not None:
+                vectors[key] = vector
+
+        missing = [key for key in dict.fromkeys(hashes) if key not in vectors]
+        from_disk = self._read_disk(missing) if missing else {}
+        for key, vector in from_disk.items():
+            self._memory.put(key, vector)
+        vectors.update(from_disk)
+        disk_hits = sum(1 for key in hashes if key in from_disk)
+
+        # Each distinct text is embedded once, in a single call to the model
+        to_embed = {key: text for key, text in zip(hashes, normalized) if key not in vectors}
+        if to_embed:
+            embedded = self.embeddings.embed_documents(list(to_embed.values()))
+            entries = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(to_embed, embedded)]
+            self._write_disk(entries)
+            for key, vector in entries:
+                self._memory.put(key, vector)
+                vectors[key] = vector
+
+        # Repeats of a text within one call are served from memory too
+        self._count(memory_hits=len(hashes) - disk_hits - len(to_embed), disk_hits=disk_hits,
+                    misses=len(to_embed), model_calls=1 if to_embed else 0)
+        return [vectors[key] for key in hashes], len(to_embed)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return [vector.tolist() for vector in self._lookup(list(texts))[0]]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._lookup([text])[0][0].tolist()
+
+    def prefetch(self, texts: Iterable[str]) -> int:
+        """Warm the cache for many texts with one model call; returns how many were embedded"""
+        texts = list(texts)
+        return self._lookup(texts)[1] if texts else 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self._memory)
+        return stats
+
+    def clear_memory(self):
+        """Drop the in-memory tier (the SQLite tier is kept)"""
+        self._memory.clear()
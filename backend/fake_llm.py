@@ -0,0 +1,122 @@
+"""
+Fake LLM - Chat model with configurable latency for load tests and benchmarks
+Answers without a network call, requests a calculate tool call on a share of turns,
+and streams its replies word by word like a real provider
+"""
+
+import json
+import time
+import random
+import asyncio
+import threading
+import uuid
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that waits `latency` seconds before its first token and
+    `token_interval` between words, instead of calling a provider.
+
+    After a human message it asks for a calculate tool call with probability
+    `tool_call_rate`; after a tool result it answers in text, so a tool turn
+    costs two model calls as it would with a real model.
+    """
+    latency: float = 0.5
+    jitter: float = 0.0
+    token_interval: float = 0.0
+    reply_words: int = 20
+    tool_call_rate: float = 0.0
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _tool_calls: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def tool_calls(self) -> int:
+        return self._tool_calls
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _first_token_delay(self) -> float:
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency * (1 + spread))
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        with self._lock:
+            self._calls += 1
+            wants_tool = (not isinstance(messages[-1], ToolMessage)
+                          and self._random.random() < self.tool_call_rate)
+            if wants_tool:
+                self._tool_calls += 1
+                a, b = self._random.randint(2, 99), self._random.randint(2, 99)
+
+        if wants_tool:
+            return AIMessage(content="", tool_calls=[
+                {"name": "calculate", "args": {"expression": f"{a}*{b}"}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+            ])
+        if isinstance(messages[-1], ToolMessage):
+            opening = f"The tool says {messages[-1].content}."
+        else:
+            opening = "Here is a benchmark reply."
+        filler = " ".join(f"word{i}" for i in range(max(0, self.reply_words - len(opening.split()))))
+        return AIMessage(content=f"{opening} {filler}".strip())
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        response = self._respond(messages)
+        time.sleep(self._first_token_delay() + self.token_interval * len(response.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        response = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay() + self.token_interval * len(response.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _chunks(self, response: AIMessage) -> List[ChatGenerationChunk]:
+        words = response.content.split(" ") if response.content else []
+        chunks = [ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+                  for i, word in enumerate(words)]
+        if response.tool_calls:
+            chunks.append(ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(response.tool_calls)
+            ])))
+        return chunks
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        response = self._respond(messages)
+        time.sleep(self._first_token_delay())
+        for i, chunk in enumerate(self._chunks(response)):
+            if i and self.token_interval:
+                time.sleep(self.token_interval)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        response = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay())
+        for i, chunk in enumerate(self._chunks(response)):
+            if i and self.token_interval:
+                await asyncio.sleep(self.token_interval)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
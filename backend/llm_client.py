@@ -0,0 +1,276 @@
+"""
+LLM Client - Process-wide factory for ChatOpenAI models
+All models share one keep-alive HTTP connection pool and one concurrency limit on upstream requests
+"""
+
+import os
+import time
+import asyncio
+import threading
+import weakref
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    # Imported on the first get_chat_model() call; it takes most of a second to load
+    from langchain_openai import ChatOpenAI
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv("config/.env")
+
+# --- Configuration ---
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://141.98.210.15:15203/v1")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "deepseek-r1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "324")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.5"))
+
+# Upstream requests in flight at once, across every model, thread and event loop
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+class ConcurrencyLimiter:
+    """A FIFO semaphore shared by threads and any number of event loops.
+
+    asyncio.Semaphore belongs to one event loop, and threading.Semaphore would
+    block one. Waiters of both kinds queue here, and release() hands the permit
+    directly to the oldest waiter, so nobody can jump the queue.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: deque = deque()  # threading.Event or (loop, future)
+        self._stats = {"requests": 0, "queued_requests": 0, "total_wait_seconds": 0.0,
+                       "max_wait_seconds": 0.0, "peak_in_flight": 0}
+
+    def _record(self, waited: float):
+        with self._lock:
+            self._stats["requests"] += 1
+            if waited > 0:
+                self._stats["queued_requests"] += 1
+                self._stats["total_wait_seconds"] += waited
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def _take_free_permit(self) -> bool:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        start = time.perf_counter()
+        with self._lock:
+            if self._take_free_permit():
+                event = None
+            else:
+                event = threading.Event()
+                self._waiters.append(event)
+        if event is None:
+            self._record(0.0)
+            return
+        event.wait()
+        self._record(time.perf_counter() - start)
+
+    async def aacquire(self):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take_free_permit():
+                waiter = None
+            else:
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+        if waiter is None:
+            self._record(0.0)
+            return
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The permit was handed over just as we were cancelled; pass it on
+            self.release()
+            raise
+        self._record(time.perf_counter() - start)
+
+    @staticmethod
+    def _grant(future: asyncio.Future):
+        if not future.cancelled():
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    # That waiter's event loop is closed; try the next one
+                    continue
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(limit=self.limit, in_flight=self._in_flight, queue_length=len(self._waiters))
+        queued = stats["queued_requests"]
+        stats["mean_wait_seconds"] = stats["total_wait_seconds"] / queued if queued else 0.0
+        return stats
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that returns the permit once the response is closed"""
+
+    def __init__(self, stream: httpx.SyncByteStream, limiter: ConcurrencyLimiter):
+        self._stream = stream
+        self._limiter = limiter
+        self._released = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._limiter.release()
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, limiter: ConcurrencyLimiter):
+        self._stream = stream
+        self._limiter = limiter
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._limiter.release()
+
+class LimitedTransport(httpx.BaseTransport):
+    """Pooled HTTP transport that holds a limiter permit from request until the response is closed"""
+
+    def __init__(self, limiter: ConcurrencyLimiter, limits: httpx.Limits):
+        self.limiter = limiter
+        self._transport = httpx.HTTPTransport(limits=limits)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.limiter.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self.limiter.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self.limiter)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of LimitedTransport.
+
+    Pooled connections belong to the event loop that opened them, so each running
+    loop (FastAPI, Chainlit, the Telegram bot, tests) gets its own pool.
+    """
+
+    def __init__(self, limiter: ConcurrencyLimiter, limits: httpx.Limits):
+        self.limiter = limiter
+        self.limits = limits
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(limits=self.limits)
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.limiter.aacquire()
+        try:
+            response = await self._transport().handle_async_request(request)
+        except BaseException:
+            self.limiter.release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, self.limiter)
+        return response
+
+    async def aclose(self):
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+# --- Process-wide singletons ---
+limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY)
+_limits = httpx.Limits(
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+)
+http_client = httpx.Client(transport=LimitedTransport(limiter, _limits), timeout=LLM_TIMEOUT_SECONDS)
+http_async_client = httpx.AsyncClient(transport=AsyncLimitedTransport(limiter, _limits), timeout=LLM_TIMEOUT_SECONDS)
+
+_models: Dict[tuple, "ChatOpenAI"] = {}
+_models_lock = threading.Lock()
+
+def get_chat_model(base_url: Optional[str] = None, model_name: Optional[str] = None,
+                   temperature: Optional[float] = None, api_key: Optional[str] = None) -> "ChatOpenAI":
+    """The shared ChatOpenAI for these settings (defaults from the LLM_* environment variables).
+
+    Every model returned here sends its requests through the same connection pool
+    and concurrency limit, and equal settings return the same instance.
+    """
+    settings = (
+        base_url or LLM_BASE_URL,
+        model_name or LLM_MODEL_NAME,
+        LLM_TEMPERATURE if temperature is None else temperature,
+        api_key or LLM_API_KEY,
+    )
+    with _models_lock:
+        model = _models.get(settings)
+        if model is None:
+            from langchain_openai import ChatOpenAI
+            model = ChatOpenAI(
+                base_url=settings[0],
+                model_name=settings[1],
+                temperature=settings[2],
+                api_key=settings[3],
+                max_retries=LLM_MAX_RETRIES,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            _models[settings] = model
+        return model
+
+def llm_client_stats() -> Dict[str, Any]:
+    """Concurrency limiter metrics: requests, queue waits, in-flight and peak in-flight counts"""
+    return limiter.stats()
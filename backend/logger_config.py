@@ -0,0 +1,139 @@
+"""
+Logger Config - Structured, level-gated logging that never blocks the caller
+Records go through a queue to one background listener thread, which formats them
+as text or JSON and writes them out; levels can be set per module
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# --- Configuration ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# text or json (one object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Per-module overrides, e.g. "core=DEBUG,checkpoint_compactor=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+TEXT_FORMAT = "%(asctime)s | %(name)s | %(levelname)s | %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# LogRecord attributes; anything else on a record came from `extra=` and is logged as a field
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra=` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener without formatting them in the caller's thread.
+
+    The stock QueueHandler formats the whole record before queueing it; this one
+    only merges the arguments into the message and renders a traceback, since
+    neither survives the trip to another thread, and leaves the rest to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time, so redirecting it (as test
+    runners and the benchmark do) also redirects the log"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """"core=DEBUG,api=WARNING" -> {"core": 10, "api": 30}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if not level or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            raise ValueError(f"Invalid LOG_LEVELS entry {item!r}: expected module=LEVEL")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+def level_for(name: str, default: str = LOG_LEVEL, overrides: Optional[Dict[str, int]] = None) -> int:
+    """The most specific override for a logger name ("a.b" matches "a.b", then "a"), else the default"""
+    overrides = _overrides if overrides is None else overrides
+    parts = name.split(".")
+    for i in range(len(parts), 0, -1):
+        level = overrides.get(".".join(parts[:i]))
+        if level is not None:
+            return level
+    return logging.getLevelName(default) if isinstance(logging.getLevelName(default), int) else logging.INFO
+
+def make_formatter(fmt: str = LOG_FORMAT) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+_overrides = parse_levels(LOG_LEVELS)
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+def _shared_queue_handler() -> QueueHandler:
+    """Start the listener on first use; every logger shares its queue"""
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is None:
+            records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            output = _StdoutHandler()
+            output.setFormatter(make_formatter())
+            _listener = QueueListener(records, output, respect_handler_level=True)
+            _listener.start()
+            # Write out what is still queued when the process exits
+            atexit.register(_listener.stop)
+            _queue_handler = _NonBlockingQueueHandler(records)
+        return _queue_handler
+
+def setup_logger(name: str) -> logging.Logger:
+    """Setup structured logger with consistent formatting."""
+    logger = logging.getLogger(name)
+    
+    if not logger.handlers:
+        logger.setLevel(level_for(name))
+        logger.addHandler(_shared_queue_handler())
+        # Already handled here; the root logger may have its own handlers
+        logger.propagate = False
+    
+    return logger
+
+def flush_logs():
+    """Write out every record queued so far (the listener drains its queue when stopped)"""
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
@@ -0,0 +1,195 @@
+"""
+Memory Index - Per-session vector index behind the search_memory tool
+Embeds messages incrementally as turns are written and serves top-k cosine search
+"""
+
+import os
+import re
+import hashlib
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+
+from checkpoint_store import SqliteConnectionPool
+from lru import LRUCache
+from embedding_cache import embedding_model_name
+from session_catalog import utc_now
+from session_locks import SessionLocks
+
+# --- Configuration ---
+# Sessions whose vectors are kept in memory between searches
+MEMORY_INDEX_CACHE_SIZE = int(os.getenv("MEMORY_INDEX_CACHE_SIZE", "256"))
+MEMORY_SEARCH_TOP_K = int(os.getenv("MEMORY_SEARCH_TOP_K", "4"))
+# Cosine similarity below which a message is not considered relevant
+MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", "0.2"))
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic local embeddings from hashed word unigrams and bigrams.
+
+    Needs no model server, so tests and offline deployments get stable vectors.
+    Texts that share words get a high cosine similarity.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class _SessionVectors:
+    """The in-memory copy of one session's index: a normalized matrix plus row metadata"""
+
+    def __init__(self, message_ids: List[str], roles: List[str], contents: List[str], matrix: np.ndarray):
+        self.message_ids = message_ids
+        self.known_ids = set(message_ids)
+        self.roles = roles
+        self.contents = contents
+        self.matrix = matrix
+
+    def append(self, message_ids: List[str], roles: List[str], contents: List[str], matrix: np.ndarray):
+        self.message_ids.extend(message_ids)
+        self.known_ids.update(message_ids)
+        self.roles.extend(roles)
+        self.contents.extend(contents)
+        self.matrix = np.vstack([self.matrix, matrix]) if len(self.matrix) else matrix
+
+def _normalize(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class MemoryIndex:
+    """The `memory_vectors` table plus an LRU of per-session matrices.
+
+    Each message is embedded once, when it is first seen, and stored next to the
+    checkpoints; a search is one matrix-vector product over the session's rows.
+    """
+
+    def __init__(self, pool: SqliteConnectionPool, embeddings: Embeddings,
+                 cache_size: int = MEMORY_INDEX_CACHE_SIZE):
+        self.pool = pool
+        self.embeddings = embeddings
+        self.model = embedding_model_name(embeddings)
+        self._sessions = LRUCache(cache_size)
+        # Serializes loading and appending per session; searches read a snapshot.
+        # Locks are ref-counted, so sessions nobody is using hold no lock
+        self._locks = SessionLocks()
+        self.setup()
+
+    def setup(self):
+        with self.pool.write() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS memory_vectors (
+                    session_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (session_id, model, message_id)
+                )
+            """)
+
+    def _load(self, session_id: str) -> _SessionVectors:
+        with self.pool.read() as conn:
+            rows = conn.execute(
+                "SELECT message_id, role, content, embedding FROM memory_vectors "
+                "WHERE session_id = ? AND model = ? ORDER BY rowid",
+                (session_id, self.model)
+            ).fetchall()
+
+        if rows:
+            matrix = np.vstack([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        return _SessionVectors([row[0] for row in rows], [row[1] for row in rows],
+                               [row[2] for row in rows], matrix)
+
+    def _session(self, session_id: str) -> _SessionVectors:
+        vectors = self._sessions.get(session_id)
+        if vectors is None:
+            vectors = self._load(session_id)
+            self._sessions.put(session_id, vectors)
+        return vectors
+
+    def add_messages(self, session_id: str, messages: Sequence[BaseMessage]) -> int:
+        """Embed and store the user and assistant messages not indexed yet; returns how many were added"""
+        with self._locks.hold(session_id):
+            vectors = self._session(session_id)
+            new_messages = [
+                m for m in messages
+                if isinstance(m, (HumanMessage, AIMessage)) and isinstance(m.content, str)
+                and m.content.strip() and m.id and m.id not in vectors.known_ids
+            ]
+            if not new_messages:
+                return 0
+
+            matrix = _normalize(self.embeddings.embed_documents([m.content for m in new_messages]))
+            message_ids = [m.id for m in new_messages]
+            roles = ["user" if isinstance(m, HumanMessage) else "assistant" for m in new_messages]
+            contents = [m.content for m in new_messages]
+            now = utc_now()
+
+            with self.pool.write() as cur:
+                cur.executemany(
+                    "INSERT OR IGNORE INTO memory_vectors "
+                    "(session_id, model, message_id, role, content, created_at, embedding) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(session_id, self.model, message_id, role, content, now, row.tobytes())
+                     for message_id, role, content, row in zip(message_ids, roles, contents, matrix)]
+                )
+            vectors.append(message_ids, roles, contents, matrix)
+            return len(new_messages)
+
+    def search(self, session_id: str, query: str, k: int = MEMORY_SEARCH_TOP_K,
+               min_score: float = MEMORY_MIN_SCORE) -> List[Dict[str, Any]]:
+        """The k messages of a session most similar to the query, best first"""
+        with self._locks.hold(session_id):
+            vectors = self._session(session_id)
+            # Rows are only ever appended, so this snapshot stays consistent with the lists
+            matrix, roles, contents = vectors.matrix, vectors.roles, vectors.contents
+        if not len(matrix) or k <= 0:
+            return []
+
+        query_vector = _normalize([self.embeddings.embed_query(query)])[0]
+        scores = matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"role": roles[i], "content": contents[i], "score": float(scores[i])}
+            for i in top if scores[i] >= min_score
+        ]
+
+    def delete(self, session_id: str):
+        with self._locks.hold(session_id):
+            with self.pool.write() as cur:
+                cur.execute("DELETE FROM memory_vectors WHERE session_id = ?", (session_id,))
+            self._sessions.discard(session_id)
+
+    def count(self, session_id: str) -> int:
+        with self._locks.hold(session_id):
+            return len(self._session(session_id).message_ids)
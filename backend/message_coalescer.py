@@ -0,0 +1,96 @@
+"""
+Message Coalescer - Per-session debounce for users who send several short messages in a row
+Messages arriving within the window become one turn; later ones queue behind it in order
+"""
+
+import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from logger_config import setup_logger
+
+logger = setup_logger("message_coalescer")
+
+# --- Configuration ---
+# Quiet period that closes a batch, and the longest a first message can wait for it
+COALESCE_WINDOW_MS = int(os.getenv("COALESCE_WINDOW_MS", "800"))
+COALESCE_MAX_DELAY_MS = int(os.getenv("COALESCE_MAX_DELAY_MS", "3000"))
+COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", "10"))
+
+T = TypeVar("T")
+
+@dataclass
+class _SessionQueue(Generic[T]):
+    items: List[T] = field(default_factory=list)
+    arrived: asyncio.Event = field(default_factory=asyncio.Event)
+    worker: Optional[asyncio.Task] = None
+
+class MessageCoalescer(Generic[T]):
+    """Batches items per key and hands each batch to `process`, one batch at a time per key.
+
+    A batch closes after `window_ms` without a new item, after `max_delay_ms` since
+    its first item, or once it holds `max_batch` items. Items that arrive while a
+    batch is being processed form the next batch, so a session never has two turns
+    in flight and its messages are answered in the order they were sent.
+    """
+
+    def __init__(self, process: Callable[[Hashable, List[T]], Awaitable[Any]],
+                 window_ms: int = COALESCE_WINDOW_MS,
+                 max_delay_ms: int = COALESCE_MAX_DELAY_MS,
+                 max_batch: int = COALESCE_MAX_BATCH):
+        self.process = process
+        self.window = window_ms / 1000
+        self.max_delay = max(window_ms, max_delay_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self._queues: Dict[Hashable, _SessionQueue[T]] = {}
+        self.stats = {"items": 0, "batches": 0}
+
+    def submit(self, key: Hashable, item: T) -> None:
+        """Add an item for a key; returns immediately, processing happens in the background"""
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _SessionQueue()
+        queue.items.append(item)
+        queue.arrived.set()
+        self.stats["items"] += 1
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._drain(key, queue))
+
+    def pending(self, key: Hashable) -> int:
+        queue = self._queues.get(key)
+        return len(queue.items) if queue else 0
+
+    async def _collect(self, queue: _SessionQueue[T]):
+        """Wait until the current batch is closed by silence, age or size"""
+        started = time.monotonic()
+        while len(queue.items) < self.max_batch:
+            remaining = self.max_delay - (time.monotonic() - started)
+            if remaining <= 0:
+                return
+            queue.arrived.clear()
+            try:
+                await asyncio.wait_for(queue.arrived.wait(), timeout=min(self.window, remaining))
+            except asyncio.TimeoutError:
+                return
+
+    async def _drain(self, key: Hashable, queue: _SessionQueue[T]):
+        try:
+            while queue.items:
+                await self._collect(queue)
+                batch, queue.items = queue.items[:self.max_batch], queue.items[self.max_batch:]
+                self.stats["batches"] += 1
+                try:
+                    await self.process(key, batch)
+                except Exception as e:
+                    logger.exception("Error processing %d coalesced messages for %s: %s", len(batch), key, e)
+        finally:
+            # No await between the last check of queue.items and this, so nothing is lost
+            self._queues.pop(key, None)
+
+    async def flush(self):
+        """Wait until every queued item has been processed"""
+        while self._queues:
+            await asyncio.gather(*[q.worker for q in list(self._queues.values()) if q.worker],
+                                 return_exceptions=True)
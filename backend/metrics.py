@@ -0,0 +1,476 @@
+"""
+Metrics - Prometheus text-format metrics for the chatbot, collected in process
+Graph nodes, tools and LLM calls are timed by a callback handler passed with each run,
+checkpoint I/O by a wrapper around the checkpointer; /metrics renders the registry
+"""
+
+import os
+import time
+import math
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+)
+
+from tracing import current_trace, is_node_run, token_usage
+
+# --- Configuration ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# A session counts as active if it ran a turn within this many seconds
+METRICS_ACTIVE_SESSION_SECONDS = float(os.getenv("METRICS_ACTIVE_SESSION_SECONDS", "300"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans fast checkpoint reads up to slow LLM completions
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """A value that only goes up"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is computed by `function` when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.function = function
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        if self.function is not None:
+            return self.function()
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [count per bucket (not cumulative)..., sum, count]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def sum(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-2] if series else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+class MetricsRegistry:
+    """The metrics one /metrics endpoint exposes"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+class ActiveSessions:
+    """Sessions that ran a turn within the last `window` seconds"""
+
+    def __init__(self, window: float = METRICS_ACTIVE_SESSION_SECONDS):
+        self.window = window
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: str):
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+
+    def count(self) -> float:
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            # Forget idle sessions as we go, so the map stays the size of the active set
+            for session_id in [s for s, seen in self._last_seen.items() if seen < cutoff]:
+                del self._last_seen[session_id]
+            return len(self._last_seen)
+
+active_sessions = ActiveSessions()
+
+NODE_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_graph_node_duration_seconds", "Time spent in each LangGraph node", ["node"]))
+NODE_ERRORS = REGISTRY.register(Counter(
+    "chatbot_graph_node_errors_total", "LangGraph node runs that raised", ["node"]))
+TOOL_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_tool_duration_seconds", "Time spent in each tool call", ["tool"]))
+TOOL_ERRORS = REGISTRY.register(Counter(
+    "chatbot_tool_errors_total", "Tool calls that raised", ["tool"]))
+TOOL_LIMITS = REGISTRY.register(Counter(
+    "chatbot_tool_limits_total", "Tool calls cut off by a timeout, the turn's tool budget or the round trip cap",
+    ["reason"]))
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_llm_time_to_first_token_seconds", "Time from an LLM request to its first token"))
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_llm_duration_seconds", "Time from an LLM request to its complete response"))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "chatbot_llm_tokens_total", "Tokens reported by the LLM provider", ["type"]))
+CHECKPOINT_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_checkpoint_operation_duration_seconds", "Time spent in checkpointer calls", ["operation"]))
+CHECKPOINT_BYTES = REGISTRY.register(Counter(
+    "chatbot_checkpoint_bytes_total", "Bytes serialized to or deserialized from checkpoints", ["direction"]))
+GRAPH_RUNS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbot_graph_runs_in_flight", "Graph runs (turns) currently executing"))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbot_http_requests_in_flight", "API requests currently being served"))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_http_request_duration_seconds", "API request latency by route", ["method", "route", "status"]))
+ACTIVE_SESSIONS = REGISTRY.register(Gauge(
+    "chatbot_active_sessions", f"Sessions with a turn in the last {METRICS_ACTIVE_SESSION_SECONDS:g} seconds",
+    function=active_sessions.count))
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times graph nodes, tool calls and LLM calls from LangChain callbacks.
+
+    One instance serves every run; state is keyed by run ID. The handler runs
+    inline, so it adds no executor hop to async runs.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, Tuple[str, str, float]] = {}
+        # LLM run ID -> (start, whether the first token was seen)
+        self._llm_runs: Dict[UUID, Tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kind: str, label: str):
+        with self._lock:
+            self._runs[run_id] = (kind, label, time.perf_counter())
+
+    def _finish(self, run_id: UUID, error: bool = False):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        kind, label, start = run
+        elapsed = time.perf_counter() - start
+        if kind == "graph":
+            GRAPH_RUNS_IN_FLIGHT.dec()
+        elif kind == "node":
+            NODE_SECONDS.observe(elapsed, node=label)
+            if error:
+                NODE_ERRORS.inc(node=label)
+        elif kind == "tool":
+            TOOL_SECONDS.observe(elapsed, tool=label)
+            if error:
+                TOOL_ERRORS.inc(tool=label)
+
+    # --- Graph and nodes ---
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       tags: Optional[List[str]] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        if parent_run_id is None:
+            GRAPH_RUNS_IN_FLIGHT.inc()
+            if metadata and metadata.get("thread_id"):
+                active_sessions.touch(str(metadata["thread_id"]))
+            self._start(run_id, "graph", "")
+        elif is_node_run(kwargs.get("name"), tags, metadata):
+            self._start(run_id, "node", kwargs["name"])
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        # Interrupts and Command routing raise too, but not as ordinary exceptions
+        self._finish(run_id, error=isinstance(error, Exception))
+
+    # --- Tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._start(run_id, "tool", name)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id, error=True)
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._llm_runs[run_id] = (time.perf_counter(), False)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, **kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        with self._lock:
+            run = self._llm_runs.get(run_id)
+            if run is None or run[1]:
+                return
+            self._llm_runs[run_id] = (run[0], True)
+        LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - run[0])
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        with self._lock:
+            run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        start, streamed = run
+        elapsed = time.perf_counter() - start
+        LLM_SECONDS.observe(elapsed)
+        if not streamed:
+            # A response that was not streamed arrives all at once
+            LLM_FIRST_TOKEN_SECONDS.observe(elapsed)
+        input_tokens, output_tokens = token_usage(response)
+        if input_tokens:
+            LLM_TOKENS.inc(input_tokens, type="input")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, type="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+metrics_callback = MetricsCallbackHandler()
+
+# --- Checkpoint I/O ---
+class MeteredSerializer:
+    """Counts the bytes a checkpointer's serializer produces and consumes"""
+
+    def __init__(self, serde):
+        self.serde = serde
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        CHECKPOINT_BYTES.inc(len(data), direction="write")
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        CHECKPOINT_BYTES.inc(len(data[1]), direction="read")
+        return self.serde.loads_typed(data)
+
+    def __getattr__(self, name: str):
+        return getattr(self.serde, name)
+
+def _meter_serializers(saver: BaseCheckpointSaver):
+    # A sharded saver serializes in its shards, not in itself
+    for inner in getattr(saver, "savers", None) or [saver]:
+        if not isinstance(inner.serde, MeteredSerializer):
+            inner.serde = MeteredSerializer(inner.serde)
+
+# Span names of the checkpoint operations a turn makes
+CHECKPOINT_SPANS = {"get_tuple": "checkpoint.load", "put": "checkpoint.save", "put_writes": "checkpoint.save_writes"}
+
+def _checkpoint_span(operation: str):
+    trace = current_trace()
+    if trace is None or operation not in CHECKPOINT_SPANS:
+        return None
+    return trace.start_span(CHECKPOINT_SPANS[operation], attributes={"checkpoint.operation": operation})
+
+class MeteredCheckpointSaver(BaseCheckpointSaver):
+    """Times every call of the checkpointer it wraps"""
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        _meter_serializers(saver)
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    def _timed(self, operation: str, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        span = _checkpoint_span(operation)
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            CHECKPOINT_SECONDS.observe(time.perf_counter() - start, operation=operation)
+            if span is not None:
+                span.end(error=error)
+
+    async def _atimed(self, operation: str, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        span = _checkpoint_span(operation)
+        error = None
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            CHECKPOINT_SECONDS.observe(time.perf_counter() - start, operation=operation)
+            if span is not None:
+                span.end(error=error)
+
+    def close(self):
+        close = getattr(self.saver, "close", None)
+        if close is not None:
+            close()
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    # --- Sync API ---
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._timed("get_tuple", self.saver.get_tuple, config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        start = time.perf_counter()
+        try:
+            yield from self.saver.list(config, filter=filter, before=before, limit=limit)
+        finally:
+            CHECKPOINT_SECONDS.observe(time.perf_counter() - start, operation="list")
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self._timed("put", self.saver.put, config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        return self._timed("put_writes", self.saver.put_writes, config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self._timed("delete_thread", self.saver.delete_thread, thread_id)
+
+    def get_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]) -> Mapping[str, Any]:
+        return self.saver.get_delta_channel_history(config=config, channels=channels)
+
+    # --- Async API ---
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._atimed("get_tuple", self.saver.aget_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        start = time.perf_counter()
+        try:
+            async for item in self.saver.alist(config, filter=filter, before=before, limit=limit):
+                yield item
+        finally:
+            CHECKPOINT_SECONDS.observe(time.perf_counter() - start, operation="list")
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._atimed("put", self.saver.aput, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await self._atimed("put_writes", self.saver.aput_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self._atimed("delete_thread", self.saver.adelete_thread, thread_id)
+
+    async def aget_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]) -> Mapping[str, Any]:
+        return await self.saver.aget_delta_channel_history(config=config, channels=channels)
@@ -0,0 +1,200 @@
+"""
+Response Cache - Reuses LLM replies for repeated prompts
+An exact tier keyed on the normalized prompt, model and temperature, plus an optional
+embedding-similarity tier for first turns that carry no conversation context
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from lru import LRUCache
+
+# --- Configuration ---
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+# The semantic tier embeds first-turn questions and matches paraphrases above this similarity
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+# user_preferences key a session sets to False to opt out
+OPT_OUT_PREFERENCE = "response_cache"
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+def _message_key(message: BaseMessage) -> List[Any]:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+    key = [message.type, _normalize(content)]
+    if isinstance(message, AIMessage) and message.tool_calls:
+        key.append([[call["name"], call["args"]] for call in message.tool_calls])
+    return key
+
+def model_identity(model: Any) -> Tuple[str, Optional[float]]:
+    """(model name, temperature) of a chat model, looking through bound runnables such as bind_tools()"""
+    model = getattr(model, "bound", model)
+    name = getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+    return str(name), getattr(model, "temperature", None)
+
+class ResponseCache:
+    """Exact and semantic caches of final LLM replies, with TTL and LRU eviction.
+
+    Only plain text replies are stored: replies that call tools, and prompts that
+    contain tool results, depend on state outside the prompt and always go to the LLM.
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 maxsize: int = RESPONSE_CACHE_SIZE,
+                 embeddings: Optional[Embeddings] = None,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.embeddings = embeddings
+        self.similarity = similarity
+        self._exact = LRUCache(maxsize)
+        # scope -> question hash -> (normalized vector, reply text, expiry)
+        self._semantic: Dict[str, "OrderedDict[str, Tuple[np.ndarray, str, float]]"] = {}
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+
+    # --- Keys ---
+    @staticmethod
+    def _exact_key(messages: Sequence[BaseMessage], identity: Tuple[str, Optional[float]], tool_names: Sequence[str]) -> str:
+        raw = json.dumps([list(identity), sorted(tool_names), [_message_key(m) for m in messages]],
+                         sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _first_turn_question(messages: Sequence[BaseMessage]) -> Optional[str]:
+        """The user's question if the prompt is system messages plus one human message, else None"""
+        conversation = [m for m in messages if not isinstance(m, SystemMessage)]
+        if len(conversation) == 1 and isinstance(conversation[0], HumanMessage) and isinstance(conversation[0].content, str):
+            return conversation[0].content
+        return None
+
+    @staticmethod
+    def _semantic_scope(messages: Sequence[BaseMessage], identity: Tuple[str, Optional[float]], tool_names: Sequence[str]) -> str:
+        system = [_message_key(m) for m in messages if isinstance(m, SystemMessage)]
+        raw = json.dumps([list(identity), sorted(tool_names), system], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _usable(self, messages: Sequence[BaseMessage], preferences: Optional[Dict[str, Any]]) -> bool:
+        if not self.enabled:
+            return False
+        if preferences and preferences.get(OPT_OUT_PREFERENCE) is False:
+            return False
+        return not any(isinstance(m, ToolMessage) for m in messages)
+
+    # --- Lookup and store ---
+    def lookup(self, messages: Sequence[BaseMessage], model: Any, tool_names: Sequence[str] = (),
+               preferences: Optional[Dict[str, Any]] = None) -> Optional[AIMessage]:
+        """A cached reply for this prompt, or None (the caller then calls the LLM and store()s)"""
+        if not self._usable(messages, preferences):
+            if self.enabled:
+                self._count("bypassed")
+            return None
+
+        identity = model_identity(model)
+        now = time.time()
+        entry = self._exact.get(self._exact_key(messages, identity, tool_names))
+        if entry is not None and entry[1] > now:
+            self._count("exact_hits")
+            return AIMessage(content=entry[0], response_metadata={"cache": "exact"})
+
+        question = self._first_turn_question(messages)
+        if self.embeddings is not None and question:
+            reply = self._semantic_lookup(self._semantic_scope(messages, identity, tool_names), question, now)
+            if reply is not None:
+                self._count("semantic_hits")
+                return AIMessage(content=reply, response_metadata={"cache": "semantic"})
+
+        self._count("misses")
+        return None
+
+    def _semantic_lookup(self, scope: str, question: str, now: float) -> Optional[str]:
+        with self._lock:
+            entries = self._semantic.get(scope)
+            if not entries:
+                return None
+            for key in [key for key, (_, _, expires) in entries.items() if expires <= now]:
+                del entries[key]
+            if not entries:
+                return None
+            keys = list(entries)
+            matrix = np.vstack([entries[key][0] for key in keys])
+
+        query = np.asarray(self.embeddings.embed_query(_normalize(question)), dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+        scores = matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        with self._lock:
+            entry = entries.get(keys[best])
+            if entry is None:
+                return None
+            entries.move_to_end(keys[best])
+            return entry[1]
+
+    def store(self, messages: Sequence[BaseMessage], model: Any, response: BaseMessage,
+              tool_names: Sequence[str] = (), preferences: Optional[Dict[str, Any]] = None):
+        """Remember a reply the LLM just produced for this prompt"""
+        if not self._usable(messages, preferences):
+            return
+        if not isinstance(response, AIMessage) or response.tool_calls:
+            return
+        if not isinstance(response.content, str) or not response.content.strip():
+            return
+
+        identity = model_identity(model)
+        expires = time.time() + self.ttl_seconds
+        self._exact.put(self._exact_key(messages, identity, tool_names), (response.content, expires))
+
+        question = self._first_turn_question(messages)
+        if self.embeddings is not None and question:
+            normalized = _normalize(question)
+            vector = np.asarray(self.embeddings.embed_query(normalized), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                scope = self._semantic_scope(messages, identity, tool_names)
+                key = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+                with self._lock:
+                    entries = self._semantic.setdefault(scope, OrderedDict())
+                    entries[key] = (vector / norm, response.content, expires)
+                    entries.move_to_end(key)
+                    while len(entries) > self.maxsize:
+                        entries.popitem(last=False)
+        self._count("stores")
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["semantic_entries"] = sum(len(entries) for entries in self._semantic.values())
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        stats["exact_entries"] = len(self._exact)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
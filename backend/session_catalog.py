@@ -0,0 +1,147 @@
+"""
+Session Catalog - Indexed per-session metadata stored next to the checkpoints
+Keeps title, timestamps, message count and a preview so listings never load graph state
+"""
+
+import json
+import base64
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpoint_store import SqliteConnectionPool
+
+DEFAULT_TITLE = "New Chat"
+TITLE_LENGTH = 50
+PREVIEW_LENGTH = 100
+MAX_PAGE_SIZE = 200
+
+_COLUMNS = "session_id, owner, title, created_at, last_activity, message_count, last_preview"
+
+def utc_now() -> str:
+    """Fixed-width UTC timestamp, so string order matches time order"""
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+def _truncate(text: str, length: int) -> str:
+    text = " ".join(str(text).split())
+    return text[:length] + "..." if len(text) > length else text
+
+def encode_cursor(last_activity: str, session_id: str) -> str:
+    raw = json.dumps([last_activity, session_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        last_activity, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(last_activity), str(session_id)
+    except Exception as e:
+        raise ValueError(f"Invalid session cursor: {cursor!r}") from e
+
+class SessionCatalog:
+    """The `sessions` table: one row per conversation, updated on every write"""
+
+    def __init__(self, pool: SqliteConnectionPool):
+        self.pool = pool
+        self.setup()
+
+    def setup(self):
+        with self.pool.write() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL DEFAULT '',
+                    title TEXT NOT NULL DEFAULT '{DEFAULT_TITLE}',
+                    created_at TEXT NOT NULL,
+                    last_activity TEXT NOT NULL,
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    last_preview TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS sessions_by_activity ON sessions (last_activity DESC, session_id DESC)")
+            cur.execute("CREATE INDEX IF NOT EXISTS sessions_by_owner ON sessions (owner, last_activity DESC, session_id DESC)")
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict[str, Any]:
+        session_id, owner, title, created_at, last_activity, message_count, last_preview = row
+        return {
+            "session_id": session_id,
+            "owner": owner,
+            "title": title,
+            "created_at": created_at,
+            "last_activity": last_activity,
+            "message_count": message_count,
+            "last_preview": last_preview,
+        }
+
+    def record_created(self, session_id: str, owner: Optional[str] = None):
+        """Add a row for a new session; existing rows are left untouched"""
+        now = utc_now()
+        with self.pool.write() as cur:
+            cur.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, owner, created_at, last_activity) VALUES (?, ?, ?, ?)",
+                (session_id, owner or "", now, now)
+            )
+
+    def record_turn(self, session_id: str, message_count: int, title: Optional[str] = None,
+                    preview: str = "", owner: Optional[str] = None, last_activity: Optional[str] = None):
+        """Upsert a session's row after a write.
+
+        The title is only set while the session still has the default one, so it
+        stays the first user message even after that message is summarized away.
+        """
+        now = last_activity or utc_now()
+        title = _truncate(title, TITLE_LENGTH) if title else DEFAULT_TITLE
+        with self.pool.write() as cur:
+            cur.execute(f"""
+                INSERT INTO sessions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    owner = CASE WHEN sessions.owner = '' THEN excluded.owner ELSE sessions.owner END,
+                    title = CASE WHEN sessions.title = '{DEFAULT_TITLE}' THEN excluded.title ELSE sessions.title END,
+                    last_activity = excluded.last_activity,
+                    message_count = excluded.message_count,
+                    last_preview = excluded.last_preview
+            """, (session_id, owner or "", title, now, now, message_count, _truncate(preview, PREVIEW_LENGTH)))
+
+    def delete(self, session_id: str):
+        with self.pool.write() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self.pool.read() as conn:
+            row = conn.execute(f"SELECT {_COLUMNS} FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_page(self, owner: Optional[str] = None, after: Optional[str] = None,
+                  limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of sessions, most recently active first.
+
+        `after` is the opaque cursor returned with the previous page. Each page is a
+        single range scan on an index, whatever the total number of sessions.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        where, params = [], []
+        if owner is not None:
+            where.append("owner = ?")
+            params.append(owner)
+        if after:
+            where.append("(last_activity, session_id) < (?, ?)")
+            params.extend(decode_cursor(after))
+
+        query = f"SELECT {_COLUMNS} FROM sessions"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY last_activity DESC, session_id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self.pool.read() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        sessions = [self._row_to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = sessions[-1]
+            next_cursor = encode_cursor(last["last_activity"], last["session_id"])
+        return sessions, next_cursor
+
+    def is_empty(self) -> bool:
+        with self.pool.read() as conn:
+            return conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone() is None
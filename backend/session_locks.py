@@ -0,0 +1,151 @@
+"""
+Session Locks - Per-session mutual exclusion shared by sync code, async code and background workers
+"""
+
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Deque, Dict, List, Optional
+
+class _Waiter:
+    """A thread or coroutine queued for a FairLock; woken once the lock is handed to it"""
+
+    __slots__ = ("granted", "event", "loop", "future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.granted = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self) -> bool:
+        """Wake the waiter; False if it can no longer be woken (its event loop is closed)"""
+        if self.event is not None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False
+        return True
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+class FairLock:
+    """A first-come, first-served lock that threads and coroutines can both wait for.
+
+    Releasing hands the lock straight to the longest waiter, so a later arrival
+    can never overtake it, and an async waiter sleeps on a future instead of polling.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._held = False
+        self._waiters: Deque[_Waiter] = deque()
+
+    def _try_take(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """Take the lock if it is free and nobody is queued, else queue a waiter"""
+        with self._guard:
+            if not self._held and not self._waiters:
+                self._held = True
+                return None
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def acquire(self):
+        waiter = self._try_take()
+        if waiter is not None:
+            waiter.event.wait()
+
+    async def aacquire(self):
+        waiter = self._try_take(asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._guard:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            # Cancelled just as the lock was handed over: pass it on
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        while True:
+            with self._guard:
+                if not self._waiters:
+                    self._held = False
+                    return
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+            if waiter.wake():
+                return
+
+    def locked(self) -> bool:
+        return self._held
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class SessionLocks:
+    """One lock per session ID, created on first use and dropped when nobody holds or waits for it.
+
+    A turn holds its session's lock while it reads and writes the checkpoint, so a
+    background update applied to the same session can never be overwritten by a
+    turn that started from an older checkpoint. Waiters get the lock in arrival order.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[str, List] = {}  # session_id -> [lock, users]
+
+    def _checkout(self, session_id: str) -> FairLock:
+        with self._guard:
+            entry = self._locks.setdefault(session_id, [FairLock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _checkin(self, session_id: str):
+        with self._guard:
+            entry = self._locks[session_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    @contextmanager
+    def hold(self, session_id: str):
+        lock = self._checkout(session_id)
+        try:
+            with lock:
+                yield
+        finally:
+            self._checkin(session_id)
+
+    @asynccontextmanager
+    async def ahold(self, session_id: str):
+        """Like hold(), without blocking the event loop while waiting (and safe to cancel)"""
+        lock = self._checkout(session_id)
+        try:
+            await lock.aacquire()
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._checkin(session_id)
+
+    def is_locked(self, session_id: str) -> bool:
+        with self._guard:
+            entry = self._locks.get(session_id)
+            return bool(entry and entry[0].locked())
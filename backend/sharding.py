@@ -0,0 +1,235 @@
+"""
+Sharding - Spreads sessions over several SQLite files by consistent hash of the thread ID
+Each shard has its own writer, so turns of sessions on different shards commit in parallel
+"""
+
+import bisect
+import hashlib
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+)
+
+from checkpoint_store import PooledSqliteSaver
+from session_catalog import SessionCatalog, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from memory_index import MemoryIndex, MEMORY_SEARCH_TOP_K, MEMORY_MIN_SCORE
+
+# Points per shard on the hash ring; more points spread sessions more evenly
+VIRTUAL_NODES = 64
+
+T = TypeVar("T")
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class ConsistentHashRing:
+    """Maps keys to shards so that adding a shard moves only about 1/N of the keys"""
+
+    def __init__(self, shards: int, virtual_nodes: int = VIRTUAL_NODES):
+        if shards < 1:
+            raise ValueError("A hash ring needs at least one shard")
+        self.shards = shards
+        points = sorted((_hash(f"shard-{shard}#{node}"), shard)
+                        for shard in range(shards) for node in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+class ShardExecutor:
+    """Runs one call per shard in parallel and returns the results in shard order"""
+
+    def __init__(self, shards: int):
+        self.shards = shards
+        self.executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="shard-fanout")
+
+    def map(self, func: Callable[[int], T]) -> List[T]:
+        return list(self.executor.map(func, range(self.shards)))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def _thread_id(config: RunnableConfig) -> str:
+    return config["configurable"]["thread_id"]
+
+def _checkpoint_order(item: CheckpointTuple) -> str:
+    return item.config["configurable"]["checkpoint_id"]
+
+class ShardedSqliteSaver(BaseCheckpointSaver):
+    """Checkpointer that routes every thread to one PooledSqliteSaver by consistent hash.
+
+    Calls for one thread go to its shard only. Listing without a thread merges
+    the shards' newest-first results, and deleting a thread runs on every shard
+    in parallel, so rows left behind by a change of shard count are removed too.
+    """
+
+    def __init__(self, savers: List[PooledSqliteSaver], ring: ConsistentHashRing, fanout: ShardExecutor):
+        super().__init__(serde=savers[0].serde)
+        self.savers = savers
+        self.ring = ring
+        self.fanout = fanout
+
+    def saver_for(self, thread_id: str) -> PooledSqliteSaver:
+        return self.savers[self.ring.shard_for(thread_id)]
+
+    def close(self):
+        for saver in self.savers:
+            saver.close()
+
+    def get_next_version(self, current, channel):
+        return self.savers[0].get_next_version(current, channel)
+
+    # --- Sync API ---
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver_for(_thread_id(config)).get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config and config.get("configurable", {}).get("thread_id"):
+            yield from self.saver_for(_thread_id(config)).list(config, filter=filter, before=before, limit=limit)
+            return
+
+        per_shard = self.fanout.map(
+            lambda shard: list(self.savers[shard].list(config, filter=filter, before=before, limit=limit))
+        )
+        merged = heapq.merge(*per_shard, key=_checkpoint_order, reverse=True)
+        for count, item in enumerate(merged):
+            if limit is not None and count >= limit:
+                return
+            yield item
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self.saver_for(_thread_id(config)).put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        return self.saver_for(_thread_id(config)).put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.fanout.map(lambda shard: self.savers[shard].delete_thread(thread_id))
+
+    def get_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]) -> Mapping[str, Any]:
+        return self.saver_for(_thread_id(config)).get_delta_channel_history(config=config, channels=channels)
+
+    # --- Async API ---
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self.saver_for(_thread_id(config)).aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config and config.get("configurable", {}).get("thread_id"):
+            async for item in self.saver_for(_thread_id(config)).alist(config, filter=filter, before=before, limit=limit):
+                yield item
+            return
+
+        items = await self.savers[0]._run_in_executor(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self.saver_for(_thread_id(config)).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await self.saver_for(_thread_id(config)).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.savers[0]._run_in_executor(self.delete_thread, thread_id)
+
+    async def aget_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]) -> Mapping[str, Any]:
+        return await self.saver_for(_thread_id(config)).aget_delta_channel_history(config=config, channels=channels)
+
+class ShardedSessionCatalog:
+    """The session catalog split across shards: each session's row lives on its thread's shard"""
+
+    def __init__(self, catalogs: List[SessionCatalog], ring: ConsistentHashRing, fanout: ShardExecutor):
+        self.catalogs = catalogs
+        self.ring = ring
+        self.fanout = fanout
+
+    def _catalog(self, session_id: str) -> SessionCatalog:
+        return self.catalogs[self.ring.shard_for(session_id)]
+
+    def record_created(self, session_id: str, owner: Optional[str] = None):
+        self._catalog(session_id).record_created(session_id, owner)
+
+    def record_turn(self, session_id: str, message_count: int, title: Optional[str] = None,
+                    preview: str = "", owner: Optional[str] = None, last_activity: Optional[str] = None):
+        self._catalog(session_id).record_turn(session_id, message_count, title=title, preview=preview,
+                                              owner=owner, last_activity=last_activity)
+
+    def delete(self, session_id: str):
+        self.fanout.map(lambda shard: self.catalogs[shard].delete(session_id))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._catalog(session_id).get(session_id)
+
+    def list_page(self, owner: Optional[str] = None, after: Optional[str] = None,
+                  limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page across all shards: every shard returns its own first page in
+        parallel, and the newest `limit` of their union form the page"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if after:
+            decode_cursor(after)  # reject a bad cursor before fanning out
+
+        pages = self.fanout.map(lambda shard: self.catalogs[shard].list_page(owner=owner, after=after, limit=limit))
+        rows = sorted((row for sessions, _ in pages for row in sessions),
+                      key=lambda row: (row["last_activity"], row["session_id"]), reverse=True)
+        has_more = len(rows) > limit or any(cursor for _, cursor in pages)
+
+        sessions = rows[:limit]
+        next_cursor = None
+        if has_more and sessions:
+            last = sessions[-1]
+            next_cursor = encode_cursor(last["last_activity"], last["session_id"])
+        return sessions, next_cursor
+
+    def is_empty(self) -> bool:
+        return all(self.fanout.map(lambda shard: self.catalogs[shard].is_empty()))
+
+class ShardedMemoryIndex:
+    """Memory vectors stored on each session's shard, behind MemoryIndex's interface"""
+
+    def __init__(self, indexes: List[MemoryIndex], ring: ConsistentHashRing, fanout: ShardExecutor):
+        self.indexes = indexes
+        self.ring = ring
+        self.fanout = fanout
+
+    def _index(self, session_id: str) -> MemoryIndex:
+        return self.indexes[self.ring.shard_for(session_id)]
+
+    def add_messages(self, session_id: str, messages: Sequence[BaseMessage]) -> int:
+        return self._index(session_id).add_messages(session_id, messages)
+
+    def search(self, session_id: str, query: str, k: int = MEMORY_SEARCH_TOP_K,
+               min_score: float = MEMORY_MIN_SCORE) -> List[Dict[str, Any]]:
+        return self._index(session_id).search(session_id, query, k=k, min_score=min_score)
+
+    def delete(self, session_id: str):
+        self.fanout.map(lambda shard: self.indexes[shard].delete(session_id))
+
+    def count(self, session_id: str) -> int:
+        return self._index(session_id).count(session_id)
@@ -3,29 +3,38 @@ Simplified Backend Core - No Streaming, Basic LangGraph
 """
 
 import os
+import sys
 import uuid
-from typing import Annotated, Literal, List, Optional, Dict, Any
+from typing import Annotated, Literal, List, Optional, Dict, Any, Iterator
 import operator
 from datetime import datetime
 
 from langchain_core.messages import (
     BaseMessage, HumanMessage, AIMessage, SystemMessage
 )
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 
 from langgraph.graph import StateGraph, END, MessagesState
-from langgraph.checkpoint.memory import MemorySaver
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv("config/.env")
 
+# Share the process-wide LLM connection pool and concurrency limit with the main backend
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from llm_client import get_chat_model
+from storage import open_storage
+from logger_config import setup_logger
+
+logger = setup_logger("simple_core")
+
 # Configuration
 LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://141.98.210.15:15203/v1")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "deep-seek-r1")
 LLM_API_KEY = os.getenv("LLM_API_KEY", "324")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.5"))
+# Conversations are kept in memory unless a durable URL is given (see storage.py)
+SIMPLE_DATABASE_URL = os.getenv("SIMPLE_DATABASE_URL", "memory://")
 
 # Helper function
 def ensure_message_has_id(message: BaseMessage) -> BaseMessage:
@@ -35,15 +44,15 @@ def ensure_message_has_id(message: BaseMessage) -> BaseMessage:
 
 # Initialize LLM
 try:
-    llm = ChatOpenAI(
+    llm = get_chat_model(
         base_url=LLM_BASE_URL, 
         model_name=LLM_MODEL_NAME, 
         temperature=LLM_TEMPERATURE, 
         api_key=LLM_API_KEY
     )
-    print(f"✅ LLM initialized: {LLM_MODEL_NAME}")
+    logger.info("LLM initialized: %s", LLM_MODEL_NAME)
 except Exception as e:
-    print(f"⚠️ LLM initialization warning: {e}")
+    logger.warning("LLM initialization failed, using the test-mode mock: %s", e)
     # Use a mock LLM for testing
     class MockLLM:
         def invoke(self, messages):
@@ -130,11 +139,12 @@ workflow.add_edge("llm", END)
 
 # Simplified Backend Class
 class SimpleChatbotBackend:
-    def __init__(self):
-        self.checkpointer = MemorySaver()
+    def __init__(self, database_url: str = SIMPLE_DATABASE_URL):
+        self.storage = open_storage(database_url)
+        self.checkpointer = self.storage.checkpointer
         self.app = workflow.compile(checkpointer=self.checkpointer)
         self.sessions = {}  # Track sessions
-        print("✅ Simplified chatbot backend initialized")
+        logger.info("Simplified chatbot backend initialized")
     
     def get_config(self, session_id: str) -> dict:
         return {"configurable": {"thread_id": session_id}}
@@ -185,9 +195,36 @@ class SimpleChatbotBackend:
             return "I couldn't process your request. Please try again."
             
         except Exception as e:
-            print(f"Error in send_message: {e}")
+            logger.exception("Error in send_message: %s", e, extra={"session_id": session_id})
             return f"I encountered an error: {str(e)}"
     
+    def stream_message(self, session_id: str, message: str) -> Iterator[str]:
+        """Send a message and yield the reply in chunks as the LLM generates it"""
+        config = self.get_config(session_id)
+        
+        # Ensure session exists
+        if session_id not in self.sessions:
+            self.initialize_session(session_id)
+        
+        # Create user message
+        user_message = ensure_message_has_id(HumanMessage(content=message))
+        
+        try:
+            streamed = False
+            for chunk, metadata in self.app.stream({"messages": [user_message]}, config=config, stream_mode="messages"):
+                if metadata.get("langgraph_node") != "llm" or not isinstance(chunk, AIMessage):
+                    continue
+                if chunk.content and isinstance(chunk.content, str):
+                    streamed = True
+                    yield chunk.content
+            
+            if not streamed:
+                yield "I couldn't process your request. Please try again."
+            
+        except Exception as e:
+            logger.exception("Error in stream_message: %s", e, extra={"session_id": session_id})
+            yield f"I encountered an error: {str(e)}"
+    
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get chat history for a session"""
         config = self.get_config(session_id)
@@ -217,7 +254,7 @@ class SimpleChatbotBackend:
             return history
             
         except Exception as e:
-            print(f"Error getting chat history: {e}")
+            logger.exception("Error getting chat history: %s", e, extra={"session_id": session_id})
             return []
     
     def get_session_info(self, session_id: str) -> Dict[str, Any]:
@@ -241,7 +278,7 @@ class SimpleChatbotBackend:
             }
             
         except Exception as e:
-            print(f"Error getting session info: {e}")
+            logger.exception("Error getting session info: %s", e, extra={"session_id": session_id})
             return {"session_id": session_id, "exists": False}
 
 # Terminal interface
@@ -0,0 +1,162 @@
+"""
+Storage - Checkpoint and session storage selected by a database URL
+  memory://                        everything in process memory, lost on restart
+  sqlite:///path/to/file.sqlite    one WAL-tuned SQLite file (relative path; sqlite:////abs for absolute)
+  sqlite+sharded:///path/to/dir    sessions spread over several SQLite files by hash of the thread ID
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from langchain_core.embeddings import Embeddings
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+from checkpoint_store import SqliteConnectionPool, PooledSqliteSaver, SQLITE_READER_POOL_SIZE
+from session_catalog import SessionCatalog
+from memory_index import MemoryIndex
+from sharding import ConsistentHashRing, ShardExecutor, ShardedSqliteSaver, ShardedSessionCatalog, ShardedMemoryIndex
+
+# --- Configuration ---
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/chatbot_messages.sqlite")
+# Shard files of sqlite+sharded:// when the URL has no ?shards= option
+SQLITE_SHARDS = int(os.getenv("SQLITE_SHARDS", "4"))
+
+def parse_database_url(url: str) -> Tuple[str, str, Dict[str, str]]:
+    """Split a database URL into (scheme, path, query options)"""
+    scheme, separator, rest = url.partition("://")
+    if not separator:
+        raise ValueError(f"Invalid database URL {url!r}: expected scheme://...")
+    path, _, query = rest.partition("?")
+    # sqlite:///relative/path and sqlite:////absolute/path, as in SQLAlchemy
+    if path.startswith("/"):
+        path = path[1:]
+    return scheme.lower(), path, dict(parse_qsl(query))
+
+class Storage:
+    """Where a backend keeps its state.
+
+    `checkpointer` holds the LangGraph checkpoints. `pool` holds the tables the
+    backend maintains itself (session catalog, memory vectors, embedding cache).
+    `checkpoint_pools` are the SQLite pools that hold checkpoint tables, for
+    retention and maintenance; it is empty when checkpoints live in memory.
+
+    When sharded, each shard pool also holds the catalog rows and memory
+    vectors of its sessions, and `ring` says which shard a session lives on.
+    """
+
+    def __init__(self, url: str, checkpointer: BaseCheckpointSaver, pool: SqliteConnectionPool,
+                 checkpoint_pools: List[SqliteConnectionPool], durable: bool,
+                 ring: Optional[ConsistentHashRing] = None, fanout: Optional[ShardExecutor] = None):
+        self.url = url
+        self.checkpointer = checkpointer
+        self.pool = pool
+        self.checkpoint_pools = checkpoint_pools
+        self.durable = durable
+        self.ring = ring
+        self.fanout = fanout
+
+    @property
+    def sharded(self) -> bool:
+        return self.ring is not None
+
+    def session_catalog(self) -> Union[SessionCatalog, ShardedSessionCatalog]:
+        if not self.sharded:
+            return SessionCatalog(self.pool)
+        return ShardedSessionCatalog([SessionCatalog(pool) for pool in self.checkpoint_pools], self.ring, self.fanout)
+
+    def memory_index(self, embeddings: Embeddings) -> Union[MemoryIndex, ShardedMemoryIndex]:
+        if not self.sharded:
+            return MemoryIndex(self.pool, embeddings)
+        return ShardedMemoryIndex([MemoryIndex(pool, embeddings) for pool in self.checkpoint_pools],
+                                  self.ring, self.fanout)
+
+    def thread_ids(self) -> List[str]:
+        """Every thread that has at least one checkpoint"""
+        if not self.checkpoint_pools:
+            return sorted({config["configurable"]["thread_id"] for config in
+                           (item.config for item in self.checkpointer.list(None))})
+
+        def shard_thread_ids(pool: SqliteConnectionPool) -> List[str]:
+            with pool.read() as conn:
+                return [row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+
+        if self.fanout is None:
+            per_pool = [shard_thread_ids(pool) for pool in self.checkpoint_pools]
+        else:
+            per_pool = self.fanout.map(lambda shard: shard_thread_ids(self.checkpoint_pools[shard]))
+        return sorted({thread_id for thread_ids in per_pool for thread_id in thread_ids})
+
+    def close(self):
+        close = getattr(self.checkpointer, "close", None)
+        if close is not None:
+            close()
+        if self.fanout is not None:
+            self.fanout.shutdown()
+        if not self.pool.closed:
+            self.pool.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.pool.closed
+
+def open_storage(url: str = DATABASE_URL) -> Storage:
+    """Create the storage a database URL describes"""
+    scheme, path, options = parse_database_url(url)
+
+    if scheme == "memory":
+        # The backend's own tables go to a private in-memory SQLite database
+        return Storage(url, InMemorySaver(), SqliteConnectionPool(":memory:"), [], durable=False)
+
+    if scheme == "sqlite":
+        if not path:
+            raise ValueError(f"Invalid database URL {url!r}: sqlite:/// needs a file path")
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        pool = SqliteConnectionPool(path, readers=int(options.get("readers", SQLITE_READER_POOL_SIZE)))
+        return Storage(url, PooledSqliteSaver(pool), pool, [pool], durable=path != ":memory:")
+
+    if scheme == "sqlite+sharded":
+        if not path:
+            raise ValueError(f"Invalid database URL {url!r}: sqlite+sharded:/// needs a directory")
+        return _open_sharded(url, path, int(options.get("shards", SQLITE_SHARDS)),
+                             int(options.get("readers", SQLITE_READER_POOL_SIZE)))
+
+    raise ValueError(f"Unsupported database URL scheme {scheme!r}: "
+                     "use memory://, sqlite:///path or sqlite+sharded:///dir")
+
+def _check_shard_count(pool: SqliteConnectionPool, shards: int):
+    """Record the shard count on first use and refuse to reopen with another one,
+    since the ring would then look for existing sessions on the wrong files"""
+    with pool.write() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        cur.execute("INSERT OR IGNORE INTO storage_meta (key, value) VALUES ('shards', ?)", (str(shards),))
+        stored = int(cur.execute("SELECT value FROM storage_meta WHERE key = 'shards'").fetchone()[0])
+    if stored != shards:
+        raise ValueError(f"Storage was created with {stored} shards, not {shards}; "
+                         "sessions cannot be found with a different shard count")
+
+def _open_sharded(url: str, directory: str, shards: int, readers: int) -> Storage:
+    """shared.sqlite holds the embedding cache and shard metadata; shard-NN.sqlite
+    hold the checkpoints, catalog rows and memory vectors of their sessions"""
+    if shards < 1:
+        raise ValueError(f"Invalid database URL {url!r}: shards must be at least 1")
+    os.makedirs(directory, exist_ok=True)
+    shared = SqliteConnectionPool(os.path.join(directory, "shared.sqlite"), readers=readers)
+    try:
+        _check_shard_count(shared, shards)
+    except ValueError:
+        shared.close()
+        raise
+
+    pools = [SqliteConnectionPool(os.path.join(directory, f"shard-{shard:02d}.sqlite"), readers=readers)
+             for shard in range(shards)]
+    ring = ConsistentHashRing(shards)
+    fanout = ShardExecutor(shards)
+    checkpointer = ShardedSqliteSaver([PooledSqliteSaver(pool) for pool in pools], ring, fanout)
+    return Storage(url, checkpointer, shared, pools, durable=True, ring=ring, fanout=fanout)
+
+def sqlite_url(db_path: str) -> str:
+    """The URL of a single SQLite file at db_path (absolute paths get the fourth slash)"""
+    return f"sqlite:///{db_path}"
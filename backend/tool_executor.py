@@ -0,0 +1,202 @@
+"""
+Tool Executor - Runs the tool calls of one LLM step concurrently, bounded in time and round trips
+Each call has a timeout, the tools of a turn share a time budget, and a turn that keeps
+asking for tools is ended with a reply instead of looping between the LLM and the tools
+"""
+
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
+
+from logger_config import setup_logger
+from metrics import TOOL_LIMITS
+
+logger = setup_logger("tool_executor")
+
+# --- Configuration ---
+# Seconds one tool call may take; a call that is late is reported to the LLM as timed out
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "10"))
+# Per-tool overrides, e.g. search_memory=5,get_current_time=1
+TOOL_TIMEOUTS = os.getenv("TOOL_TIMEOUTS", "")
+# Wall-clock seconds the tool steps of one turn may take together
+TOOL_TURN_BUDGET_SECONDS = float(os.getenv("TOOL_TURN_BUDGET_SECONDS", "30"))
+# LLM -> tools round trips per turn before the turn is ended with a reply
+MAX_TOOL_ROUND_TRIPS = int(os.getenv("MAX_TOOL_ROUND_TRIPS", "5"))
+# Threads running sync tool calls, shared by every turn
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+
+ROUND_TRIP_LIMIT_REPLY = (
+    "I stopped working on this after {round_trips} rounds of tool calls without reaching an answer. "
+    "Could you rephrase the request or break it into smaller steps?"
+)
+
+def parse_timeouts(spec: str) -> Dict[str, float]:
+    """Parse "tool=seconds,..." into per-tool timeouts"""
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, seconds = item.partition("=")
+        try:
+            timeouts[name.strip()] = float(seconds)
+        except ValueError:
+            raise ValueError(f"Invalid tool timeout {item!r}, expected tool=seconds") from None
+    return timeouts
+
+def turn_tool_usage(messages: Sequence[BaseMessage]) -> Tuple[int, float]:
+    """(round trips, tool seconds) of the turn in progress, read back from its messages.
+
+    A round trip is an AI message with tool calls since the last human message; the
+    time of a step is its slowest call, as the calls of a step run side by side.
+    """
+    round_trips, spent, step = 0, 0.0, 0.0
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, ToolMessage):
+            step = max(step, message.response_metadata.get("duration_seconds", 0.0))
+        elif isinstance(message, AIMessage) and message.tool_calls:
+            round_trips += 1
+            spent, step = spent + step, 0.0
+    return round_trips, spent + step
+
+def _error_message(call: Dict[str, Any], content: str, duration: float = 0.0) -> ToolMessage:
+    return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error",
+                       response_metadata={"duration_seconds": round(duration, 6)})
+
+class BudgetedToolNode:
+    """Graph node that executes the tool calls of the last AI message.
+
+    Sync runs submit the calls to a shared thread pool, async runs gather them on
+    the event loop. A sync call that times out cannot be interrupted; it keeps its
+    worker until it returns, while the turn moves on without its result. A call
+    still queued for a worker at its deadline is cancelled and reported as not run.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], timeout: float = TOOL_TIMEOUT_SECONDS,
+                 timeouts: Optional[Dict[str, float]] = None, turn_budget: float = TOOL_TURN_BUDGET_SECONDS,
+                 max_round_trips: int = MAX_TOOL_ROUND_TRIPS, workers: int = TOOL_WORKERS):
+        self.tools_by_name = {t.name: t for t in tools}
+        self.timeout = timeout
+        self.timeouts = parse_timeouts(TOOL_TIMEOUTS) if timeouts is None else timeouts
+        self.turn_budget = turn_budget
+        self.max_round_trips = max_round_trips
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def as_runnable(self, name: str = "tools") -> RunnableLambda:
+        return RunnableLambda(self.run, afunc=self.arun, name=name)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tool")
+            return self._executor
+
+    def _plan(self, state: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[dict], float]:
+        """The calls to run, or the update that ends the turn, and the time left in the budget"""
+        message = state["messages"][-1]
+        calls = list(getattr(message, "tool_calls", None) or [])
+        round_trips, spent = turn_tool_usage(state["messages"])
+
+        if round_trips > self.max_round_trips:
+            logger.warning("Ending turn after %d tool round trips", self.max_round_trips,
+                           extra={"round_trips": round_trips})
+            TOOL_LIMITS.inc(reason="round_trips")
+            skipped = [_error_message(call, "Not run: the tool call limit for this turn was reached.")
+                       for call in calls]
+            reply = AIMessage(content=ROUND_TRIP_LIMIT_REPLY.format(round_trips=self.max_round_trips))
+            return [], {"messages": skipped + [reply], "messages_since_last_summary": 1}, 0.0
+
+        remaining = self.turn_budget - spent
+        if remaining <= 0:
+            TOOL_LIMITS.inc(len(calls), reason="budget")
+            content = "Not run: the tool time budget for this turn is used up. Answer with what you have."
+            return [], {"messages": [_error_message(call, content) for call in calls]}, 0.0
+        return calls, None, remaining
+
+    def _timeout_for(self, call: Dict[str, Any], remaining: float) -> float:
+        return min(self.timeouts.get(call["name"], self.timeout), remaining)
+
+    def _late(self, call: Dict[str, Any], timeout: float, remaining: float, started: bool = True) -> ToolMessage:
+        budget = timeout >= remaining
+        TOOL_LIMITS.inc(reason="budget" if budget else "timeout")
+        if not started:
+            # Cancelled while queued behind busy workers: it never ran and never will
+            logger.warning("Tool %s did not get a worker within %.1fs", call["name"], timeout, extra={"tool": call["name"]})
+            reason = "the tool time budget for this turn ran out" if budget else f"no worker was free within {timeout:g}s"
+            return _error_message(call, f"Not run: {reason}.")
+        logger.warning("Tool %s did not finish within %.1fs", call["name"], timeout, extra={"tool": call["name"]})
+        reason = "the tool time budget for this turn ran out" if budget else f"it timed out after {timeout:g}s"
+        return _error_message(call, f"Error: {call['name']} did not finish: {reason}.", timeout)
+
+    def _reject_unknown(self, call: Dict[str, Any]) -> Optional[ToolMessage]:
+        if call["name"] not in self.tools_by_name:
+            return _error_message(call, f"Error: {call['name']} is not a valid tool, try one of "
+                                        f"[{', '.join(self.tools_by_name)}].")
+        return None
+
+    def _invoke(self, call: Dict[str, Any], config: RunnableConfig) -> ToolMessage:
+        start = time.perf_counter()
+        try:
+            message = self.tools_by_name[call["name"]].invoke({**call, "type": "tool_call"}, config)
+        except Exception as e:
+            return _error_message(call, f"Error: {e!r}", time.perf_counter() - start)
+        message.response_metadata["duration_seconds"] = round(time.perf_counter() - start, 6)
+        return message
+
+    async def _ainvoke(self, call: Dict[str, Any], config: RunnableConfig) -> ToolMessage:
+        start = time.perf_counter()
+        try:
+            message = await self.tools_by_name[call["name"]].ainvoke({**call, "type": "tool_call"}, config)
+        except Exception as e:
+            return _error_message(call, f"Error: {e!r}", time.perf_counter() - start)
+        message.response_metadata["duration_seconds"] = round(time.perf_counter() - start, 6)
+        return message
+
+    def run(self, state: Dict[str, Any], config: RunnableConfig) -> dict:
+        calls, update, remaining = self._plan(state)
+        if update is not None:
+            return update
+
+        results: List[Optional[ToolMessage]] = [self._reject_unknown(call) for call in calls]
+        # Every call starts at once; each is then waited for up to its own deadline
+        futures = {
+            i: self.executor.submit(contextvars.copy_context().run, self._invoke, call, config)
+            for i, call in enumerate(calls) if results[i] is None
+        }
+        start = time.perf_counter()
+        for i, future in futures.items():
+            timeout = self._timeout_for(calls[i], remaining)
+            done, _ = wait([future], timeout=max(0.0, timeout - (time.perf_counter() - start)))
+            if done:
+                results[i] = future.result()
+            else:
+                # cancel() only succeeds for a call still waiting for a worker
+                results[i] = self._late(calls[i], timeout, remaining, started=not future.cancel())
+        return {"messages": results}
+
+    async def arun(self, state: Dict[str, Any], config: RunnableConfig) -> dict:
+        calls, update, remaining = self._plan(state)
+        if update is not None:
+            return update
+
+        async def run_call(call: Dict[str, Any]) -> ToolMessage:
+            rejected = self._reject_unknown(call)
+            if rejected is not None:
+                return rejected
+            timeout = self._timeout_for(call, remaining)
+            try:
+                return await asyncio.wait_for(self._ainvoke(call, config), timeout)
+            except asyncio.TimeoutError:
+                return self._late(call, timeout, remaining)
+
+        return {"messages": list(await asyncio.gather(*(run_call(call) for call in calls)))}
@@ -0,0 +1,392 @@
+"""
+Tracing - Per-turn span trees written as OTLP JSON to a rotating local file
+A turn gets a root span with children for checkpoint loads and saves, each graph node,
+each LLM call (with token counts) and each tool call, so a slow turn shows where it went
+"""
+
+import os
+import json
+import time
+import random
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+import queue
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# --- Configuration ---
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "./data/traces/turns.otlp.jsonl")
+# Share of turns traced (head sampling), from 0 to 1
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# Also keep any turn slower than this, sampled or not (0 = off); every turn is then recorded
+TRACE_SLOW_TURN_SECONDS = float(os.getenv("TRACE_SLOW_TURN_SECONDS", "0"))
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv("TRACE_FILE_BACKUPS", "5"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ai-chatbot")
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+def is_node_run(name: Optional[str], tags: Optional[List[str]], metadata: Optional[Dict[str, Any]]) -> bool:
+    """Whether a chain run is a LangGraph node itself rather than a runnable inside one"""
+    # LangGraph tags the run of a node with its step; runnables inside a node
+    # inherit the langgraph_node metadata but not the tag
+    return bool(metadata and name and metadata.get("langgraph_node") == name
+                and any(tag.startswith("graph:step:") for tag in tags or []))
+
+def token_usage(response) -> Tuple[int, int]:
+    """(input, output) tokens from a LLMResult, from usage metadata or the provider's llm_output"""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP JSON carries 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class Span:
+    """One timed operation of a turn"""
+
+    __slots__ = ("span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_span_id: Optional[str], kind: int = SPAN_KIND_INTERNAL,
+                 start_ns: Optional[int] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def end(self, error: Optional[BaseException] = None, end_ns: Optional[int] = None):
+        self.end_ns = end_ns or time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self, trace_id: str) -> Dict[str, Any]:
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+class TurnTrace(BaseCallbackHandler):
+    """The spans of one turn. Passed as a callback with the turn's graph run, it
+    opens a span for every node, LLM call and tool call; checkpoint operations
+    add theirs through current_trace().
+    """
+
+    run_inline = True
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None, sampled: bool = True):
+        self.trace_id = os.urandom(16).hex()
+        self.sampled = sampled
+        self.root = Span(name, None, kind=SPAN_KIND_SERVER, attributes=attributes)
+        self.spans: List[Span] = [self.root]
+        # Callback run ID -> the span it belongs to (its own, or its nearest traced ancestor's)
+        self._run_spans: Dict[UUID, Span] = {}
+        self._open: Dict[UUID, Span] = {}
+        self._first_token: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, kind: int = SPAN_KIND_INTERNAL,
+                   start_ns: Optional[int] = None, attributes: Optional[Dict[str, Any]] = None) -> Span:
+        span = Span(name, (parent or self.root).span_id, kind, start_ns, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time a block of the turn as a child of the root span"""
+        span = self.start_span(name, attributes=attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        span.end()
+
+    def set_error(self, error: BaseException):
+        self.root.error = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The turn as an OTLP ExportTraceServiceRequest"""
+        with self._lock:
+            spans = [span.to_otlp(self.trace_id) for span in self.spans]
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "chatbot.tracing"}, "spans": spans}],
+        }]}
+
+    # --- Callback plumbing ---
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Span:
+        if parent_run_id is None:
+            return self.root
+        return self._run_spans.get(parent_run_id, self.root)
+
+    def _open_span(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: int = SPAN_KIND_INTERNAL,
+                   attributes: Optional[Dict[str, Any]] = None):
+        span = self.start_span(name, self._parent_span(parent_run_id), kind, attributes=attributes)
+        with self._lock:
+            self._run_spans[run_id] = span
+            self._open[run_id] = span
+
+    def _close_span(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        with self._lock:
+            span = self._open.pop(run_id, None)
+        if span is not None:
+            span.end(error=error)
+        return span
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       tags: Optional[List[str]] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        name = kwargs.get("name")
+        if parent_run_id is not None and is_node_run(name, tags, metadata):
+            self._open_span(run_id, parent_run_id, f"node {name}", attributes={
+                "langgraph.node": name, "langgraph.step": metadata.get("langgraph_step"),
+            })
+        else:
+            # Runnables inside a node report to the node's span
+            with self._lock:
+                self._run_spans[run_id] = self._parent_span(parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._close_span(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._close_span(run_id, error if isinstance(error, Exception) else None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._open_span(run_id, parent_run_id, f"tool {name}", attributes={"tool.name": name})
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self._close_span(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._close_span(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            invocation_params: Optional[Dict[str, Any]] = None, **kwargs):
+        params = invocation_params or {}
+        model = params.get("model_name") or params.get("model") or params.get("_type")
+        self._open_span(run_id, parent_run_id, "llm", kind=SPAN_KIND_CLIENT, attributes={"gen_ai.request.model": model})
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, parent_run_id=parent_run_id, **kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._first_token.setdefault(run_id, time.time_ns())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        span = self._close_span(run_id)
+        if span is None:
+            return
+        input_tokens, output_tokens = token_usage(response)
+        span.attributes["gen_ai.usage.input_tokens"] = input_tokens
+        span.attributes["gen_ai.usage.output_tokens"] = output_tokens
+        with self._lock:
+            first_token = self._first_token.pop(run_id, None)
+        if first_token is not None:
+            span.attributes["gen_ai.time_to_first_token_ms"] = round((first_token - span.start_ns) / 1e6, 1)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._close_span(run_id, error)
+        with self._lock:
+            self._first_token.pop(run_id, None)
+
+class FileSpanExporter:
+    """Appends one OTLP JSON request per turn to a size-rotated file, from a
+    background thread so a turn never waits on the disk"""
+
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = TRACE_FILE_MAX_BYTES,
+                 backups: int = TRACE_FILE_BACKUPS):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self._handler = handler
+        self._listener = QueueListener(self._queue, handler)
+        self._lock = threading.Lock()
+        self._listener.start()
+        self._running = True  # whether the listener thread is writing the queue out
+        atexit.register(self.shutdown)
+
+    def export(self, trace: TurnTrace):
+        line = json.dumps(trace.to_otlp(), separators=(",", ":"))
+        self._queue.put(logging.makeLogRecord({"msg": line, "levelno": logging.INFO, "levelname": "INFO"}))
+
+    def flush(self):
+        """Write out every queued turn"""
+        with self._lock:
+            if self._running:
+                self._listener.stop()
+                self._listener.start()
+
+    def shutdown(self):
+        with self._lock:
+            if self._running:
+                self._listener.stop()
+                self._running = False
+            self._handler.close()
+
+_current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("current_trace", default=None)
+
+def current_trace() -> Optional[TurnTrace]:
+    """The trace of the turn running in this context, if it is being traced"""
+    return _current_trace.get()
+
+class Tracer:
+    """Decides which turns are traced and exports the ones worth keeping"""
+
+    def __init__(self, enabled: bool = TRACE_ENABLED, sample_rate: float = TRACE_SAMPLE_RATE,
+                 slow_turn_seconds: float = TRACE_SLOW_TURN_SECONDS, path: str = TRACE_FILE,
+                 exporter: Optional[FileSpanExporter] = None):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_turn_seconds = slow_turn_seconds
+        self.path = path
+        self._exporter = exporter
+        self._exporter_lock = threading.Lock()
+        self._random = random.Random()
+
+    @property
+    def exporter(self) -> FileSpanExporter:
+        # The file is opened by the first exported turn, not at import
+        with self._exporter_lock:
+            if self._exporter is None:
+                self._exporter = FileSpanExporter(self.path)
+            return self._exporter
+
+    @contextmanager
+    def turn(self, name: str, **attributes) -> Iterator[Optional[TurnTrace]]:
+        """Trace the block as one turn; yields None when the turn is not recorded"""
+        if not self.enabled:
+            yield None
+            return
+        sampled = self._random.random() < self.sample_rate
+        if not sampled and self.slow_turn_seconds <= 0:
+            yield None
+            return
+
+        trace = TurnTrace(name, attributes, sampled=sampled)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.set_error(e)
+            raise
+        finally:
+            try:
+                _current_trace.reset(token)
+            except ValueError:
+                # An abandoned async generator is closed from another context
+                pass
+            trace.root.end()
+            slow = 0 < self.slow_turn_seconds <= trace.root.duration_seconds
+            if trace.sampled or slow or trace.root.error:
+                trace.root.attributes["trace.sampled_by"] = "rate" if trace.sampled else ("latency" if slow else "error")
+                self.exporter.export(trace)
+
+    def flush(self):
+        if self._exporter is not None:
+            self._exporter.flush()
+
+tracer = Tracer()
+
+def optional_span(trace: Optional[TurnTrace], name: str, **attributes):
+    """A span of the trace, or a no-op block for an untraced turn"""
+    return trace.span(name, **attributes) if trace is not None else nullcontext()
+
+# --- Reading traces ---
+def load_traces(path: str = TRACE_FILE) -> List[Dict[str, Any]]:
+    """Every span of every turn in a trace file, grouped by turn"""
+    turns = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            spans = [span for resource in request["resourceSpans"]
+                     for scope in resource["scopeSpans"] for span in scope["spans"]]
+            turns.append({"trace_id": spans[0]["traceId"], "spans": spans})
+    return turns
+
+def _attribute(span: Dict[str, Any], key: str) -> Any:
+    for attribute in span.get("attributes", []):
+        if attribute["key"] == key:
+            return next(iter(attribute["value"].values()))
+    return None
+
+def format_turn(spans: List[Dict[str, Any]]) -> str:
+    """A turn as an indented tree of spans with their start offset and duration"""
+    by_parent: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        by_parent.setdefault(span.get("parentSpanId"), []).append(span)
+    root = by_parent[None][0]
+    origin = int(root["startTimeUnixNano"])
+    lines = []
+
+    def walk(span: Dict[str, Any], depth: int):
+        start = (int(span["startTimeUnixNano"]) - origin) / 1e6
+        duration = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+        details = []
+        tokens = (_attribute(span, "gen_ai.usage.input_tokens"), _attribute(span, "gen_ai.usage.output_tokens"))
+        if any(t not in (None, "0") for t in tokens):
+            details.append(f"tokens {tokens[0]} in / {tokens[1]} out")
+        if span["status"].get("code") == STATUS_ERROR:
+            details.append(f"error: {span['status'].get('message')}")
+        suffix = f"  ({', '.join(details)})" if details else ""
+        lines.append(f"{start:9.1f} ms {duration:9.1f} ms  {'  ' * depth}{span['name']}{suffix}")
+        for child in sorted(by_parent.get(span["spanId"], []), key=lambda s: int(s["startTimeUnixNano"])):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Offline load test of the chatbot with a fake LLM of configurable latency
+Simulated users talk to ChatbotBackend.send_message, the API's POST /chat or the
+Telegram message handler, and the run is summarized as a JSON report:
+latency percentiles, turns per second, checkpoint database growth and peak RSS
+
+Usage:
+  python benchmark.py --target backend --users 20 --turns 5 --latency 0.2 --output report.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+import platform
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Add the project root and backend to the Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "backend"))
+
+from logger_config import flush_logs
+
+TARGETS = ("backend", "api", "telegram")
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of the values (0 for none)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def database_bytes(storage) -> int:
+    """Bytes on disk of the SQLite files behind a storage, WAL and shared memory included"""
+    paths = {pool.db_path for pool in [storage.pool, *storage.checkpoint_pools] if pool.db_path != ":memory:"}
+    return sum(os.path.getsize(path + suffix) for path in paths for suffix in ("", "-wal", "-shm")
+               if os.path.exists(path + suffix))
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+class LoadResult:
+    """Latencies and failures collected from every simulated user"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: List[str] = []
+        self.lock = threading.Lock()
+
+    def record(self, start: float, error: Optional[BaseException] = None):
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            if error is None:
+                self.latencies.append(elapsed)
+            else:
+                self.errors.append(f"{type(error).__name__}: {error}")
+
+def user_message(user: int, turn: int) -> str:
+    return f"User {user} asks question {turn}: what is {user + 2} times {turn + 3}?"
+
+# --- Targets ---
+def run_backend(backend, users: int, turns: int) -> LoadResult:
+    """Each user is a thread calling ChatbotBackend.send_message turn after turn"""
+    result = LoadResult()
+
+    def user_loop(user: int):
+        for turn in range(turns):
+            start = time.perf_counter()
+            try:
+                backend.send_message(f"bench_{user}", user_message(user, turn), owner=f"bench_user_{user}")
+            except Exception as e:
+                result.record(start, e)
+            else:
+                result.record(start)
+
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="bench-user") as pool:
+        list(pool.map(user_loop, range(users)))
+    return result
+
+def run_api(backend, users: int, turns: int) -> LoadResult:
+    """Each user is a task posting to /chat through the ASGI app, without a network hop"""
+    import httpx
+    from backend.api import api
+    original = api.chatbot_backend
+    api.chatbot_backend = backend
+    result = LoadResult()
+
+    async def user_loop(client, user: int):
+        for turn in range(turns):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/chat", json={
+                    "message": user_message(user, turn), "session_id": f"bench_{user}", "user": f"bench_user_{user}"
+                })
+                response.raise_for_status()
+            except Exception as e:
+                result.record(start, e)
+            else:
+                result.record(start)
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await asyncio.gather(*[user_loop(client, user) for user in range(users)])
+
+    try:
+        asyncio.run(run())
+    finally:
+        api.chatbot_backend = original
+    return result
+
+def run_telegram(backend, users: int, turns: int) -> LoadResult:
+    """Each user is a task sending text updates to TelegramChatbot.handle_message and
+    waiting for the reply, so coalescing and the worker pool are measured too
+    (every turn includes the COALESCE_WINDOW_MS wait for follow-up messages)"""
+    sys.path.insert(0, os.path.join(project_root, "frontend", "telegram"))
+    import bot
+    original = bot.chatbot_backend
+    bot.chatbot_backend = backend
+    result = LoadResult()
+
+    async def no_chat_action(**kwargs):
+        pass
+
+    context = SimpleNamespace(bot=SimpleNamespace(send_chat_action=no_chat_action))
+
+    async def user_loop(telegram_bot, user: int):
+        bot.user_sessions[user] = f"bench_{user}"
+        for turn in range(turns):
+            replied = asyncio.Event()
+            replies = []
+
+            async def reply_text(text, **kwargs):
+                replies.append(text)
+                replied.set()
+
+            update = SimpleNamespace(
+                effective_user=SimpleNamespace(id=user, username=f"bench_user_{user}"),
+                effective_chat=SimpleNamespace(id=user),
+                message=SimpleNamespace(text=user_message(user, turn), reply_text=reply_text),
+            )
+            start = time.perf_counter()
+            await telegram_bot.handle_message(update, context)
+            await replied.wait()
+            # The handler reports backend failures to the user instead of raising
+            failed = replies[0].startswith("❌")
+            result.record(start, RuntimeError(replies[0]) if failed else None)
+
+    async def run():
+        telegram_bot = bot.TelegramChatbot("123456:BENCHMARK")
+        # The full backend answers in one piece; SimpleChatbotBackend is the one that streams
+        telegram_bot.streaming = False
+        try:
+            await asyncio.gather(*[user_loop(telegram_bot, user) for user in range(users)])
+        finally:
+            telegram_bot.executor.shutdown(wait=True)
+
+    try:
+        asyncio.run(run())
+    finally:
+        bot.chatbot_backend = original
+        for user in range(users):
+            bot.user_sessions.pop(user, None)
+    return result
+
+RUNNERS: Dict[str, Callable[[Any, int, int], LoadResult]] = {
+    "backend": run_backend,
+    "api": run_api,
+    "telegram": run_telegram,
+}
+
+# --- Benchmark ---
+def run_benchmark(target: str = "backend", users: int = 10, turns: int = 5, latency: float = 0.2,
+                  jitter: float = 0.0, token_interval: float = 0.0, tool_call_rate: float = 0.3,
+                  reply_words: int = 20, database_url: Optional[str] = None,
+                  seed: Optional[int] = 0) -> Dict[str, Any]:
+    """Run one load test and return its report"""
+    if target not in RUNNERS:
+        raise ValueError(f"Unknown target {target!r}: use one of {', '.join(TARGETS)}")
+
+    import backend.core as core
+    from backend.core import ChatbotBackend
+    from fake_llm import FakeChatModel
+
+    model = FakeChatModel(latency=latency, jitter=jitter, token_interval=token_interval,
+                          tool_call_rate=tool_call_rate, reply_words=reply_words, seed=seed)
+    core.llm = model
+    core.llm_with_tools = model
+    core.memory_embeddings = core.HashingEmbeddings()
+
+    database_url = database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='benchmark-'), 'bench.sqlite')}"
+    backend = ChatbotBackend(database_url=database_url, embedder=core.HashingEmbeddings())
+    try:
+        size_before = database_bytes(backend.storage)
+        start = time.perf_counter()
+        result = RUNNERS[target](backend, users, turns)
+        duration = time.perf_counter() - start
+        backend.flush_summaries()
+        size_after = database_bytes(backend.storage)
+    finally:
+        backend.close()
+
+    completed = len(result.latencies)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "target": target,
+        "config": {
+            "users": users, "turns_per_user": turns, "latency_seconds": latency, "jitter": jitter,
+            "token_interval_seconds": token_interval, "tool_call_rate": tool_call_rate,
+            "reply_words": reply_words, "database_url": database_url,
+        },
+        "turns": completed,
+        "errors": len(result.errors),
+        "error_samples": result.errors[:5],
+        "llm_calls": model.calls,
+        "tool_calls": model.tool_calls,
+        "duration_seconds": round(duration, 3),
+        "turns_per_second": round(completed / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(result.latencies, 50) * 1000, 1),
+            "p95": round(percentile(result.latencies, 95) * 1000, 1),
+            "p99": round(percentile(result.latencies, 99) * 1000, 1),
+            "mean": round(sum(result.latencies) / completed * 1000, 1) if completed else 0.0,
+            "max": round(max(result.latencies, default=0.0) * 1000, 1),
+        },
+        "checkpoint_db": {
+            "before_bytes": size_before,
+            "after_bytes": size_after,
+            "growth_bytes": size_after - size_before,
+            "bytes_per_turn": round((size_after - size_before) / completed) if completed else 0,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test of the chatbot with a fake LLM")
+    parser.add_argument("--target", choices=TARGETS, default="backend", help="entry point to drive")
+    parser.add_argument("--users", type=int, default=10, help="simulated concurrent users")
+    parser.add_argument("--turns", type=int, default=5, help="turns per user")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- fraction of the latency")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="fake LLM seconds between words")
+    parser.add_argument("--tool-call-rate", type=float, default=0.3, help="share of turns that call a tool")
+    parser.add_argument("--reply-words", type=int, default=20, help="words per fake reply")
+    parser.add_argument("--database-url", default=None, help="storage to use (default: a fresh SQLite file)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the fake LLM's choices")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # The backend logs every turn to stdout; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(
+            target=args.target, users=args.users, turns=args.turns, latency=args.latency, jitter=args.jitter,
+            token_interval=args.token_interval, tool_call_rate=args.tool_call_rate, reply_words=args.reply_words,
+            database_url=args.database_url, seed=args.seed,
+        )
+        flush_logs()
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        latency = report["latency_ms"]
+        print(f"📊 {report['turns']} turns at {report['turns_per_second']}/s, "
+              f"p50 {latency['p50']} ms, p99 {latency['p99']} ms -> {args.output}")
+    else:
+        print(text)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
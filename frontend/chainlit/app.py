@@ -7,6 +7,7 @@ import chainlit as cl
 import os
 import sys
 import uuid
+import threading
 from typing import Dict, Any, List, Optional
 import asyncio
 
@@ -14,26 +15,67 @@ import asyncio
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
 
 from core import ChatbotBackend
+from logger_config import setup_logger
+
+logger = setup_logger("chainlit_app")
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv("config/.env")
 
-# Initialize chatbot backend
-chatbot_backend = ChatbotBackend()
+# The chatbot backend, created when the app starts so importing this module opens no
+# database; tests assign their own
+chatbot_backend: Optional[ChatbotBackend] = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> ChatbotBackend:
+    """The backend serving chats, created on first use"""
+    global chatbot_backend
+    with _backend_lock:
+        if chatbot_backend is None:
+            chatbot_backend = ChatbotBackend()
+        return chatbot_backend
+
+async def aget_backend() -> ChatbotBackend:
+    """get_backend() for handlers; building the backend opens the databases and may
+    backfill the catalog, so it runs off the event loop"""
+    if chatbot_backend is not None:
+        return chatbot_backend
+    return await asyncio.to_thread(get_backend)
+
+@cl.on_app_startup
+async def on_app_startup():
+    """Open the backend before the first browser connects"""
+    await aget_backend()
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Release the backend's database connections"""
+    if chatbot_backend is not None:
+        await chatbot_backend.aclose()
+
+# Sessions listed in the selector and searched by /switch
+SESSION_SELECTOR_LIMIT = int(os.getenv("CHAINLIT_SESSION_LIMIT", "20"))
 
 # Global storage for user sessions
 user_sessions: Dict[str, str] = {}
-available_sessions: List[Dict[str, Any]] = []
+
+def current_user_id() -> str:
+    """The signed-in user's identifier, or a guest ID kept for the whole browser session"""
+    user_id = cl.user_session.get("user_id")
+    if not user_id:
+        user = cl.user_session.get("user")
+        user_id = user.identifier if user else f"guest_{uuid.uuid4().hex[:8]}"
+        cl.user_session.set("user_id", user_id)
+    return user_id
 
 async def load_available_sessions():
-    """Load all available sessions from backend"""
+    """Load the current user's sessions from the backend's session catalog"""
     try:
-        global available_sessions
-        available_sessions = chatbot_backend.list_sessions()
-        return available_sessions
+        backend = await aget_backend()
+        return await backend.alist_user_sessions(current_user_id(), limit=SESSION_SELECTOR_LIMIT)
     except Exception as e:
-        print(f"Error loading sessions: {e}")
+        logger.exception("Error loading sessions: %s", e)
         return []
 
 async def show_session_selector():
@@ -47,11 +89,11 @@ async def show_session_selector():
             session_content += f"**Total Sessions:** {len(sessions)}\n\n"
             
             for i, session in enumerate(sessions[:10]):  # Show max 10 sessions
-                messages_count = session.get('messages_count', 0)
-                preview = session.get('preview', 'No messages')
+                messages_count = session.get('message_count', 0)
+                preview = session.get('last_preview') or 'No messages'
                 session_id_short = session['session_id'][-12:]  # Show last 12 chars
                 
-                session_content += f"**{i+1}.** `{session_id_short}` ({messages_count} messages)\n"
+                session_content += f"**{i+1}.** {session['title']} `{session_id_short}` ({messages_count} messages)\n"
                 session_content += f"└ *{preview}*\n\n"
             
             session_content += "\n---\n\n"
@@ -95,7 +137,7 @@ async def show_session_selector():
             ).send()
             
     except Exception as e:
-        print(f"Error showing session selector: {e}")
+        logger.exception("Error showing session selector: %s", e)
         # Fallback message
         await cl.Message(
             content="⚠️ **Session Management Unavailable**\n\nContinue chatting in the current session.",
@@ -106,8 +148,7 @@ async def show_session_selector():
 async def on_new_session(action):
     """Handle new session creation"""
     # Create new session ID
-    user = cl.user_session.get("user")
-    user_id = user.identifier if user else f"guest_{uuid.uuid4().hex[:8]}"
+    user_id = current_user_id()
     new_session_id = f"chainlit_{user_id}_{uuid.uuid4().hex[:8]}"
     
     # Store session ID
@@ -119,7 +160,8 @@ async def on_new_session(action):
 You can help with calculations, provide current time, and search through our conversation history.
 Be conversational, helpful, and engaging. Use tools when appropriate to provide better assistance."""
     
-    chatbot_backend.initialize_session(new_session_id, system_prompt)
+    backend = await aget_backend()
+    await backend.ainitialize_session(new_session_id, system_prompt, owner=user_id)
     
     await cl.Message(content=f"🆕 **New session created!**\n\nSession ID: `{new_session_id}`\n\nHow can I help you today?").send()
     await show_session_selector()
@@ -139,8 +181,9 @@ async def on_switch_session(action):
     cl.user_session.set("session_id", target_session_id)
     
     # Get session info and history
-    session_info = chatbot_backend.get_session_info(target_session_id)
-    history = chatbot_backend.get_chat_history(target_session_id)
+    backend = await aget_backend()
+    session_info = await backend.aget_session_info(target_session_id)
+    history = await backend.aget_chat_history(target_session_id)
     
     # Show session switch confirmation
     messages_count = session_info.get('messages_count', 0)
@@ -171,8 +214,7 @@ async def on_chat_start():
     """Initialize chat session when user starts a conversation"""
     
     # Get user info (if authentication is enabled)
-    user = cl.user_session.get("user")
-    user_id = user.identifier if user else f"guest_{uuid.uuid4().hex[:8]}"
+    user_id = current_user_id()
     
     # Create session ID
     session_id = f"chainlit_{user_id}_{uuid.uuid4().hex[:8]}"
@@ -186,7 +228,8 @@ async def on_chat_start():
 You can help with calculations, provide current time, and search through our conversation history.
 Be conversational, helpful, and engaging. Use tools when appropriate to provide better assistance."""
     
-    chatbot_backend.initialize_session(session_id, system_prompt)
+    backend = await aget_backend()
+    await backend.ainitialize_session(session_id, system_prompt, owner=user_id)
     
     # Send welcome message
     welcome_message = f"""# Welcome to AI Chatbot! 🤖
@@ -233,21 +276,44 @@ async def on_message(message: cl.Message):
         await handle_command(message.content, session_id)
         return
     
-    # Show typing indicator
-    async with cl.Step(name="thinking") as step:
-        step.input = message.content
+    # Stream the reply into a message as it is generated; the turn runs on the
+    # async graph, so other users' messages are handled in the meantime
+    reply = cl.Message(content="")
+    turn_step = cl.context.current_step
+    tool_steps: Dict[str, cl.Step] = {}
+    final_content = ""
+    
+    backend = await aget_backend()
+    async for event in backend.astream_message(session_id, message.content, owner=current_user_id()):
+        kind = event["type"]
         
-        try:
-            # Send message to backend
-            response = chatbot_backend.send_message(session_id, message.content)
-            step.output = response
-            
-        except Exception as e:
-            response = f"❌ I encountered an error: {str(e)}"
-            step.output = response
+        if kind == "token":
+            await reply.stream_token(event["content"])
+        
+        elif kind == "tool_start":
+            # Each tool call shows up as a live child step of this turn
+            step = cl.Step(name=event["name"], type="tool", parent_id=turn_step.id if turn_step else None)
+            step.input = event["input"]
+            await step.send()
+            tool_steps[event["id"]] = step
+        
+        elif kind == "tool_end":
+            step = tool_steps.pop(event["id"], None)
+            if step:
+                step.output = event["output"]
+                await step.update()
+        
+        elif kind == "message":
+            final_content = event["content"]
+        
+        elif kind == "error":
+            final_content = f"❌ {event['content']}"
     
-    # Send response
-    await cl.Message(content=response).send()
+    # Text streamed before a tool call is not part of the final reply, and cached
+    # replies arrive without tokens, so the message ends with the final reply
+    if final_content and reply.content != final_content:
+        reply.content = final_content
+    await reply.send()
 
 async def handle_command(command: str, current_session_id: str):
     """Handle special commands"""
@@ -303,11 +369,11 @@ async def handle_command(command: str, current_session_id: str):
 async def show_chat_history(session_id: str):
     """Show chat history in sidebar"""
     try:
-        # Get list of all sessions
-        sessions = chatbot_backend.list_sessions()
+        # Get the user's sessions
+        sessions = await load_available_sessions()
         
         if not sessions:
-            print(f"No previous sessions found")
+            logger.debug("No previous sessions found")
             return
             
         # Create sidebar content for session management
@@ -316,7 +382,7 @@ async def show_chat_history(session_id: str):
         current_session_highlighted = False
         for i, session in enumerate(sessions[:10]):  # Limit to 10 recent sessions
             session_id_short = session['session_id'][-8:]  # Show last 8 chars
-            preview = session['preview'][:50] + "..." if len(session['preview']) > 50 else session['preview']
+            preview = session['last_preview'][:50] + "..." if len(session['last_preview']) > 50 else session['last_preview']
             
             if session['session_id'] == session_id:
                 sidebar_content += f"**🔸 {session_id_short}** (Current)\n"
@@ -332,15 +398,14 @@ async def show_chat_history(session_id: str):
         sidebar_content += "- All conversations are automatically saved\n"
         sidebar_content += "- Use tools like calculator and time for enhanced assistance\n"
         
-        print(f"Sidebar content prepared for session: {session_id}")
-        print(f"Found {len(sessions)} total sessions")
+        logger.debug("Sidebar content prepared for session %s, %d sessions found", session_id, len(sessions))
         
         # Note: Chainlit sidebar implementation would go here
         # For now, we're printing the sidebar content
         # In future versions, this could be displayed as a proper sidebar
             
     except Exception as e:
-        print(f"Error showing chat history: {e}")
+        logger.exception("Error showing chat history: %s", e)
 
 @cl.on_settings_update
 async def on_settings_update(settings):
@@ -356,7 +421,7 @@ async def on_stop():
     """Handle chat stop"""
     session_id = cl.user_session.get("session_id")
     if session_id:
-        print(f"Chat session ended: {session_id}")
+        logger.info("Chat session ended: %s", session_id, extra={"session_id": session_id})
 
 # Authentication configuration (optional)
 # Note: Authentication can be configured in chainlit.toml or via environment variables
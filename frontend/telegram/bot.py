@@ -5,10 +5,14 @@ Connects to the LangGraph backend via API
 
 import os
 import sys
+import time
 import asyncio
 import logging
-from typing import Dict, Any
-from telegram import Update, BotCommand
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from typing import Dict, Any, List, Callable, Optional
+from telegram import Update, BotCommand, Message
+from telegram.error import BadRequest
 from telegram.ext import (
     Application, 
     CommandHandler, 
@@ -21,6 +25,7 @@ from telegram.ext import (
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
 
 from simple_core import SimpleChatbotBackend
+from message_coalescer import MessageCoalescer
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -33,16 +38,134 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize chatbot backend
-chatbot_backend = SimpleChatbotBackend()
+# Turns processed at once across all users (the backend is synchronous, so each
+# turn occupies one worker thread); the LLM client limit applies on top of this
+TELEGRAM_MAX_CONCURRENT_TURNS = int(os.getenv("TELEGRAM_MAX_CONCURRENT_TURNS", "16"))
+
+# Stream replies into a placeholder message, editing it every interval or once
+# enough new characters have arrived (Telegram rate-limits edits per chat)
+TELEGRAM_STREAMING = os.getenv("TELEGRAM_STREAMING", "true").lower() in ("1", "true", "yes")
+TELEGRAM_EDIT_INTERVAL_SECONDS = float(os.getenv("TELEGRAM_EDIT_INTERVAL_SECONDS", "1.0"))
+TELEGRAM_EDIT_CHARS = int(os.getenv("TELEGRAM_EDIT_CHARS", "500"))
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+STREAMING_PLACEHOLDER = "💭 ..."
+
+# The chatbot backend, created on first use so importing this module opens no database;
+# tests and the benchmark assign their own
+chatbot_backend: Optional[SimpleChatbotBackend] = None
+
+def get_backend() -> SimpleChatbotBackend:
+    """The backend serving chats, created on first use"""
+    global chatbot_backend
+    if chatbot_backend is None:
+        chatbot_backend = SimpleChatbotBackend()
+    return chatbot_backend
 
 # Store user sessions
 user_sessions: Dict[int, str] = {}
 
+class StreamingReply:
+    """A reply that is posted as a placeholder and edited as the text arrives.
+
+    Text past Telegram's message limit continues in a new message, split at the
+    last line break or space where possible.
+    """
+
+    def __init__(self, update: Update, interval: float = TELEGRAM_EDIT_INTERVAL_SECONDS,
+                 min_chars: int = TELEGRAM_EDIT_CHARS):
+        self.update = update
+        self.interval = interval
+        self.min_chars = min_chars
+        self.message: Optional[Message] = None
+        self.text = ""    # text of the current message received so far
+        self.shown = ""   # reply text the current message displays
+        self.last_edit = 0.0
+        self.edits = 0
+
+    async def start(self):
+        self.message = await self.update.message.reply_text(STREAMING_PLACEHOLDER)
+        self.last_edit = time.monotonic()
+
+    def append(self, chunk: str):
+        self.text += chunk
+
+    def _pending(self) -> bool:
+        return self.text.strip() != "" and self.text != self.shown
+
+    def next_edit_in(self) -> Optional[float]:
+        """Seconds until the pending text is due to be shown, or None if nothing is pending"""
+        if not self._pending():
+            return None
+        return max(0.0, self.last_edit + self.interval - time.monotonic())
+
+    def _due(self) -> bool:
+        if not self._pending():
+            return False
+        if len(self.text) > TELEGRAM_MESSAGE_LIMIT:
+            return True
+        if self.min_chars and len(self.text) - len(self.shown) >= self.min_chars:
+            return True
+        return time.monotonic() - self.last_edit >= self.interval
+
+    async def _show(self, text: str):
+        if self.message is None:
+            self.message = await self.update.message.reply_text(text)
+        else:
+            try:
+                await self.message.edit_text(text)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+            self.edits += 1
+        self.shown = text
+        self.last_edit = time.monotonic()
+
+    async def _roll_over(self):
+        """Finish the current message with as much text as fits and start the next one"""
+        while len(self.text) > TELEGRAM_MESSAGE_LIMIT:
+            head = self.text[:TELEGRAM_MESSAGE_LIMIT]
+            cut = head.rfind("\n")
+            if cut < TELEGRAM_MESSAGE_LIMIT // 2:
+                cut = head.rfind(" ")
+            if cut < TELEGRAM_MESSAGE_LIMIT // 2:
+                cut = TELEGRAM_MESSAGE_LIMIT
+            await self._show(self.text[:cut])
+            self.message, self.shown = None, ""
+            self.text = self.text[cut:].lstrip()
+
+    async def update_if_due(self):
+        if self._due():
+            await self._roll_over()
+            if self._pending():
+                await self._show(self.text)
+
+    async def finish(self):
+        """Show the complete text"""
+        await self._roll_over()
+        if self._pending():
+            await self._show(self.text)
+
+    async def fail(self, error: str):
+        """Turn the placeholder into the error, after whatever part of the reply arrived"""
+        partial = self.text.strip()
+        self.text = f"{partial}\n\n{error}" if partial else error
+        await self.finish()
+
 class TelegramChatbot:
     def __init__(self, token: str):
         self.token = token
-        self.application = Application.builder().token(token).build()
+        # Updates are handled concurrently; ordering per user comes from the coalescer
+        self.application = Application.builder().token(token).concurrent_updates(True).build()
+        
+        # Backend calls run on a bounded pool so a slow reply never blocks polling
+        self.executor = ThreadPoolExecutor(max_workers=TELEGRAM_MAX_CONCURRENT_TURNS,
+                                           thread_name_prefix="telegram-backend")
+        
+        # Messages a user sends in quick succession are answered as one turn, and
+        # each user's turns run one after another in the order they were sent
+        self.coalescer = MessageCoalescer(self.answer_messages)
+        self.streaming = TELEGRAM_STREAMING
         
         # Register handlers
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -54,6 +177,10 @@ class TelegramChatbot:
         
         logger.info("Telegram bot initialized")
     
+    async def run_backend(self, func: Callable, *args):
+        """Run a synchronous backend call on the worker pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
     async def start_command(self, update: Update, context: CallbackContext) -> None:
         """Handle /start command"""
         user_id = update.effective_user.id
@@ -68,7 +195,7 @@ class TelegramChatbot:
 You have access to various tools and can help with calculations, provide current time, and search conversation history.
 Be conversational, concise (suitable for Telegram), and helpful. Use tools when appropriate."""
         
-        chatbot_backend.initialize_session(session_id, system_prompt)
+        await self.run_backend(get_backend().initialize_session, session_id, system_prompt)
         
         welcome_message = f"""🤖 **Welcome to AI Chatbot!**
 
@@ -135,7 +262,7 @@ Need help with something specific? Just ask!"""
 You have access to various tools and can help with calculations, provide current time, and search conversation history.
 Be conversational, concise (suitable for Telegram), and helpful. Use tools when appropriate."""
         
-        chatbot_backend.initialize_session(session_id, system_prompt)
+        await self.run_backend(get_backend().initialize_session, session_id, system_prompt)
         
         await update.message.reply_text(
             f"🔄 **New session started!**\n\nSession ID: `{session_id}`\n\nHow can I help you?",
@@ -153,7 +280,7 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
         session_id = user_sessions[user_id]
         
         try:
-            history = chatbot_backend.get_chat_history(session_id)
+            history = await self.run_backend(get_backend().get_chat_history, session_id)
             
             if not history:
                 await update.message.reply_text("📝 No chat history yet. Start a conversation!")
@@ -184,7 +311,7 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
         session_id = user_sessions[user_id]
         
         try:
-            info = chatbot_backend.get_session_info(session_id)
+            info = await self.run_backend(get_backend().get_session_info, session_id)
             
             info_text = f"""📊 **Session Information:**
 
@@ -204,7 +331,6 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
     async def handle_message(self, update: Update, context: CallbackContext) -> None:
         """Handle regular text messages"""
         user_id = update.effective_user.id
-        user_message = update.message.text
         
         # Check if user has a session
         if user_id not in user_sessions:
@@ -213,12 +339,35 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
         
         session_id = user_sessions[user_id]
         
+        # Queue before the first await, so concurrent handlers keep the user's order.
+        # Follow-up messages sent within the window are merged into the same turn
+        self.coalescer.submit(user_id, (session_id, update))
+        
         # Send typing action
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    
+    async def answer_messages(self, user_id: int, items: List[tuple]) -> None:
+        """Answer a user's queued messages, one turn per session they were sent to"""
+        # A /new in the middle of a burst splits it between the two sessions
+        for session_id, group in groupby(items, key=lambda item: item[0]):
+            await self.answer_turn(session_id, [update for _, update in group])
+    
+    async def answer_turn(self, session_id: str, updates: List[Update]) -> None:
+        """Send a burst of messages to the backend as one turn and reply to the last of them"""
+        update = updates[-1]
+        user_message = "\n".join(u.message.text for u in updates)
+        if len(updates) > 1:
+            logger.info(f"Coalesced {len(updates)} messages for session {session_id}")
         
+        reply: Optional[StreamingReply] = None
         try:
+            if self.streaming:
+                reply = StreamingReply(update)
+                await self.stream_reply(session_id, user_message, reply)
+                return
+            
             # Get response from backend
-            response = chatbot_backend.send_message(session_id, user_message)
+            response = await self.run_backend(get_backend().send_message, session_id, user_message)
             
             # Send response (split if too long for Telegram)
             if len(response) > 4096:
@@ -230,8 +379,47 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
             
         except Exception as e:
             error_message = f"❌ I encountered an error: {str(e)}"
-            await update.message.reply_text(error_message)
-            logger.error(f"Error handling message for user {user_id}: {e}")
+            if reply is not None:
+                await reply.fail(error_message)
+            else:
+                await update.message.reply_text(error_message)
+            logger.error(f"Error handling message for session {session_id}: {e}")
+    
+    async def stream_reply(self, session_id: str, user_message: str, reply: StreamingReply) -> None:
+        """Answer with a placeholder message and edit the reply into it as it is generated"""
+        await reply.start()
+        
+        # The backend generator runs on the worker pool and hands chunks to this loop
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        
+        def produce():
+            try:
+                for chunk in get_backend().stream_message(session_id, user_message):
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+        
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.get(), timeout=reply.next_edit_in())
+                except asyncio.TimeoutError:
+                    await reply.update_if_due()
+                    continue
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                reply.append(chunk)
+                await reply.update_if_due()
+        finally:
+            await producer
+        await reply.finish()
+        logger.info(f"Streamed reply for session {session_id} with {reply.edits} edits")
     
     async def error_handler(self, update: Update, context: CallbackContext) -> None:
         """Handle errors"""
@@ -260,6 +448,9 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
         
         # Set up commands
         await self.setup_commands()
+
+        # Open the backend before the first message arrives
+        await self.run_backend(get_backend)
         
         # Start the bot
         await self.application.initialize()
@@ -291,8 +482,10 @@ Be conversational, concise (suitable for Telegram), and helpful. Use tools when
             logger.info("Bot stopping...")
         finally:
             await self.application.updater.stop()
+            await self.coalescer.flush()
             await self.application.stop()
             await self.application.shutdown()
+            self.executor.shutdown(wait=True)
 
 async def main():
     """Main function to run the Telegram bot"""
@@ -186,7 +186,7 @@ class ChatbotWebInterface {
         this.showTypingIndicator();
         
         try {
-            const response = await fetch(`${this.apiUrl}/chat`, {
+            const response = await fetch(`${this.apiUrl}/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -197,15 +197,47 @@ class ChatbotWebInterface {
                 })
             });
             
-            if (response.ok) {
-                const data = await response.json();
-                this.hideTypingIndicator();
-                this.addMessageToChat(data.response, 'bot');
-                this.updateChatHistory();
-                this.updateSessionInfo();
-            } else {
+            if (!response.ok || !response.body) {
                 throw new Error('Failed to send message');
             }
+            
+            // Render tokens as they arrive instead of waiting for the full reply
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let reply = '';
+            let botMessage = null;
+            
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                
+                buffer += decoder.decode(value, { stream: true });
+                const rawEvents = buffer.split('\n\n');
+                buffer = rawEvents.pop();
+                
+                for (const rawEvent of rawEvents) {
+                    const event = this.parseServerSentEvent(rawEvent);
+                    if (event.type === 'token') {
+                        reply += event.data.content;
+                    } else if (event.type === 'message' || event.type === 'error') {
+                        reply = event.data.content;
+                    } else {
+                        continue;
+                    }
+                    
+                    if (!botMessage) {
+                        this.hideTypingIndicator();
+                        botMessage = this.addMessageToChat(reply, 'bot');
+                    } else {
+                        this.updateMessageInChat(botMessage, reply);
+                    }
+                }
+            }
+            
+            this.hideTypingIndicator();
+            this.updateChatHistory();
+            this.updateSessionInfo();
         } catch (error) {
             this.hideTypingIndicator();
             this.addMessageToChat('Sorry, I encountered an error. Please try again.', 'bot');
@@ -213,6 +245,37 @@ class ChatbotWebInterface {
         }
     }
     
+    parseServerSentEvent(rawEvent) {
+        const event = { type: 'message', data: {} };
+        const dataLines = [];
+        
+        for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) {
+                event.type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        }
+        
+        if (dataLines.length) {
+            event.data = JSON.parse(dataLines.join('\n'));
+        }
+        return event;
+    }
+    
+    updateMessageInChat(messageDiv, content) {
+        const contentDiv = messageDiv.querySelector('.message-content');
+        const timestamp = contentDiv.querySelector('.message-timestamp');
+        
+        contentDiv.innerHTML = this.formatMessage(content);
+        if (timestamp) {
+            contentDiv.appendChild(timestamp);
+        }
+        
+        const chatMessages = document.getElementById('chatMessages');
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
+    
     addMessageToChat(content, role) {
         const chatMessages = document.getElementById('chatMessages');
         const messageDiv = document.createElement('div');
@@ -237,6 +300,7 @@ class ChatbotWebInterface {
         
         chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageDiv;
     }
     
     formatMessage(content) {
@@ -1,16 +1,19 @@
-from langchain_openai import ChatOpenAI
 from langchain_ollama import OllamaEmbeddings
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import StrOutputParser, HumanMessage, AIMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, List
-from logger_config import setup_logger
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from llm_client import get_chat_model
+from logger_config import setup_logger
 
 logger = setup_logger("graph_processor")
 
 # --- Initialize LLM and Embeddings ---
-llm = ChatOpenAI(
+llm = get_chat_model(
     base_url="http://141.98.210.15:15203/v1",
     model_name="deepseek-r1",
     temperature=0.5,
@@ -5,6 +5,7 @@ Simple launcher to test and run the chatbot
 
 import sys
 import os
+import subprocess
 
 # Add the project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -55,6 +56,95 @@ def run_terminal():
     except Exception as e:
         print(f"❌ Failed to start terminal interface: {e}")
 
+# Run in a fresh interpreter by profile_startup(), so nothing is imported beforehand
+_STARTUP_SCRIPT = """
+import os, sys, time, tempfile
+start = time.perf_counter()
+from backend.core import ChatbotBackend
+imported = time.perf_counter()
+backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "profile.sqlite"))
+ready = time.perf_counter()
+backend.close()
+clients = [m for m in ("langchain_openai", "langchain_ollama", "openai", "ollama") if m in sys.modules]
+print(f"PROFILE {imported - start:.3f} {ready - start:.3f} {','.join(clients) or '-'}")
+"""
+
+def profile_startup(top: int = 15):
+    """Profile a cold start: import time of backend.core and time until a backend is ready"""
+    print("⏱️ Profiling cold start of the backend...")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _STARTUP_SCRIPT],
+        cwd=project_root, capture_output=True, text=True
+    )
+    
+    # -X importtime writes "import time: self [us] | cumulative | module" lines to stderr
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    
+    profile = [line for line in result.stdout.splitlines() if line.startswith("PROFILE ")]
+    if result.returncode != 0 or not profile:
+        print(f"❌ Startup failed:\n{result.stderr[-2000:]}")
+        return False
+    
+    _, import_seconds, ready_seconds, clients = profile[0].split()
+    print(f"\nSlowest modules by own import time (of {len(modules)} imported):")
+    for self_us, cumulative_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:8.1f} ms)  {name}")
+    
+    print(f"\n📦 import backend.core: {float(import_seconds) * 1000:.0f} ms")
+    print(f"🚀 Backend ready to serve: {float(ready_seconds) * 1000:.0f} ms")
+    if clients == "-":
+        print("✅ No LLM or embeddings client loaded before the first request")
+    else:
+        print(f"⚠️ Client libraries loaded at startup: {clients}")
+    return True
+
+def show_traces(top: int = 5):
+    """Print the slowest traced turns as span trees"""
+    sys.path.insert(0, os.path.join(project_root, "backend"))
+    from tracing import TRACE_FILE, load_traces, format_turn
+    if not os.path.exists(TRACE_FILE):
+        print(f"❌ No traces at {TRACE_FILE} (set TRACE_ENABLED=true and run some turns)")
+        return False
+    
+    def duration(turn):
+        root = next(span for span in turn["spans"] if not span.get("parentSpanId"))
+        return int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])
+    
+    turns = sorted(load_traces(TRACE_FILE), key=duration, reverse=True)
+    print(f"🐢 Slowest {min(top, len(turns))} of {len(turns)} traced turns in {TRACE_FILE}")
+    print("    start     duration   span")
+    for turn in turns[:top]:
+        print(f"\ntrace {turn['trace_id']}")
+        print(format_turn(turn["spans"]))
+    return True
+
+def convert_vacuum():
+    """Convert existing checkpoint databases to incremental auto-vacuum (a one-time full VACUUM)"""
+    sys.path.insert(0, os.path.join(project_root, "backend"))
+    from dotenv import load_dotenv
+    load_dotenv("config/.env")
+    from storage import open_storage, DATABASE_URL
+    from checkpoint_compactor import CheckpointCompactor
+    storage = open_storage(DATABASE_URL)
+    try:
+        if not storage.checkpoint_pools:
+            print(f"ℹ️ {DATABASE_URL} has no SQLite checkpoint files to convert")
+            return True
+        for pool in storage.checkpoint_pools:
+            print(f"🧹 {pool.db_path}...")
+            if CheckpointCompactor(pool).convert_to_incremental_vacuum():
+                print(f"✅ {pool.db_path} now uses incremental auto-vacuum")
+            else:
+                print(f"✅ {pool.db_path} already uses incremental auto-vacuum")
+    finally:
+        storage.close()
+    return True
+
 def main():
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
@@ -65,14 +155,27 @@ def main():
             run_api()
         elif command == "terminal":
             run_terminal()
+        elif command == "profile":
+            profile_startup()
+        elif command == "benchmark":
+            from benchmark import main as run_benchmark
+            sys.exit(run_benchmark(sys.argv[2:]))
+        elif command == "vacuum":
+            convert_vacuum()
+        elif command == "traces":
+            show_traces(int(sys.argv[2]) if len(sys.argv) > 2 else 5)
         else:
-            print("Unknown command. Use: test, api, or terminal")
+            print("Unknown command. Use: test, api, terminal, profile, benchmark, traces, or vacuum")
     else:
         print("🤖 AI Chatbot Launcher")
         print("Usage:")
         print("  python launcher.py test     # Test backend")
         print("  python launcher.py api      # Run API server")
         print("  python launcher.py terminal # Run terminal interface")
+        print("  python launcher.py profile  # Profile backend cold start")
+        print("  python launcher.py benchmark [options]  # Load test with a fake LLM (see --help)")
+        print("  python launcher.py traces [N]  # Show the N slowest traced turns")
+        print("  python launcher.py vacuum   # Convert existing databases to incremental vacuum (chatbot stopped)")
 
 if __name__ == "__main__":
     main()
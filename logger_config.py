@@ -1,21 +0,0 @@
-import logging
-import sys
-from datetime import datetime
-
-def setup_logger(name: str) -> logging.Logger:
-    """Setup structured logger with consistent formatting."""
-    logger = logging.getLogger(name)
-    
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Console handler with structured format
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(
-            '%(asctime)s | %(name)s | %(levelname)s | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
-    return logger
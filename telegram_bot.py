@@ -1,8 +1,12 @@
 import asyncio
+import os
+import sys
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, MessageHandler, CommandHandler, CallbackQueryHandler, filters, ContextTypes
-from graph import app, session_manager
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
 from logger_config import setup_logger
+from graph import app, session_manager
 
 logger = setup_logger("telegram_bot")
 
@@ -0,0 +1,253 @@
+"""
+Async Backend Test - asend_message and the API routes with a fake LLM
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import backend.core as core
+
+class ScriptedChatModel(BaseChatModel):
+    """Fake chat model that replays scripted replies after a delay, streaming word by word"""
+    responses: List[AIMessage]
+    delay: float = 0.0
+    index: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next_response(self) -> AIMessage:
+        response = self.responses[self.index % len(self.responses)]
+        self.index += 1
+        # A fresh copy per call: a shared message ID would make later turns overwrite earlier ones
+        return response.model_copy(update={"id": None})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self._next_response())])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        response = self._next_response()
+        await asyncio.sleep(self.delay)
+        words = response.content.split(" ") if response.content else []
+        for i, word in enumerate(words):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if response.tool_calls or not words:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(response.tool_calls)
+            ]))
+
+def use_fake_llm(reply="Hello from the fake LLM", delay=0.2, responses=None):
+    fake = ScriptedChatModel(responses=responses or [AIMessage(content=reply)], delay=delay)
+    core.llm = fake
+    core.llm_with_tools = fake
+    core.memory_embeddings = core.HashingEmbeddings()
+    return fake
+
+def test_asend_message_persists_history():
+    print("🧪 Testing asend_message...")
+    use_fake_llm(delay=0)
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        try:
+            reply = await backend.asend_message("async_session", "Hi there", owner="tester")
+            history = await backend.aget_chat_history("async_session")
+            info = await backend.aget_session_info("async_session")
+            catalog_row = backend.catalog.get("async_session")
+        finally:
+            await backend.aclose()
+        return reply, history, info, catalog_row
+
+    reply, history, info, catalog_row = asyncio.run(run())
+    assert reply == "Hello from the fake LLM"
+    assert catalog_row["owner"] == "tester" and catalog_row["title"] == "Hi there"
+    assert catalog_row["message_count"] == 2 and catalog_row["last_preview"] == reply
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert info["exists"] and info["messages_count"] == 3
+    print(f"✅ Async reply: {reply}")
+
+def test_scripted_replies_keep_every_turn():
+    print("🧪 Testing that repeated scripted replies are separate messages...")
+    use_fake_llm(delay=0)
+    backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        for text in ("first", "second", "third"):
+            backend.send_message("repeat_session", text)
+        history = backend.get_chat_history("repeat_session")
+    finally:
+        backend.close()
+    assert [m["role"] for m in history] == ["user", "assistant"] * 3, history
+    print("✅ Three turns, three assistant replies")
+
+def test_concurrent_sessions_overlap():
+    print("🧪 Testing concurrent asend_message calls...")
+    use_fake_llm(delay=0.3)
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        try:
+            start = time.perf_counter()
+            replies = await asyncio.gather(*[
+                backend.asend_message(f"session_{i}", "Hello") for i in range(10)
+            ])
+            return replies, time.perf_counter() - start
+        finally:
+            await backend.aclose()
+
+    replies, elapsed = asyncio.run(run())
+    assert len(replies) == 10
+    # Ten sequential calls would take at least 3 seconds
+    assert elapsed < 2.0, f"calls did not overlap ({elapsed:.2f}s)"
+    print(f"✅ 10 concurrent turns finished in {elapsed:.2f}s")
+
+def test_known_session_skips_state_read():
+    print("🧪 Testing one checkpoint read per turn for known sessions...")
+    use_fake_llm(delay=0)
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        reads = []
+        original = backend.checkpointer.aget_tuple
+
+        async def counting_aget_tuple(config):
+            reads.append(config)
+            return await original(config)
+
+        backend.checkpointer.aget_tuple = counting_aget_tuple
+        try:
+            await backend.asend_message("known_session", "First turn")
+            reads.clear()
+            await backend.asend_message("known_session", "Second turn")
+            reads_per_turn = len(reads)
+
+            await backend.adelete_session("known_session")
+            assert "known_session" not in backend.known_sessions
+            created = await backend.ainitialize_session("known_session")
+        finally:
+            await backend.aclose()
+        return reads_per_turn, created
+
+    reads_per_turn, created = asyncio.run(run())
+    assert reads_per_turn == 1, f"expected one checkpoint read, got {reads_per_turn}"
+    assert created, "deleted session should be initialized again"
+    print("✅ Known session turn loaded its checkpoint once")
+
+def test_concurrent_initialize_creates_once():
+    print("🧪 Testing concurrent ainitialize_session calls...")
+    use_fake_llm(delay=0)
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        try:
+            created = await asyncio.gather(*[backend.ainitialize_session("race", owner="tester") for _ in range(3)])
+            info = await backend.aget_session_info("race")
+        finally:
+            await backend.aclose()
+        return created, info
+
+    created, info = asyncio.run(run())
+    assert sorted(created) == [False, False, True], created
+    assert info["messages_count"] == 1
+    print("✅ Exactly one of three concurrent calls created the session")
+
+def test_astream_message_events():
+    print("🧪 Testing astream_message...")
+    use_fake_llm(delay=0, responses=[
+        AIMessage(content="", tool_calls=[{"name": "calculate", "args": {"expression": "15*23"}, "id": "call_1"}]),
+        AIMessage(content="15 times 23 is 345"),
+    ])
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        try:
+            return [event async for event in backend.astream_message("stream_session", "What is 15*23?")]
+        finally:
+            await backend.aclose()
+
+    events = asyncio.run(run())
+    types = [event["type"] for event in events]
+    assert types[:2] == ["tool_start", "tool_end"]
+    assert events[1]["output"] == "Result: 345"
+    assert "".join(e["content"] for e in events if e["type"] == "token") == "15 times 23 is 345"
+    assert events[-1] == {"type": "message", "content": "15 times 23 is 345"}
+    print(f"✅ Streamed events: {types}")
+
+def test_api_chat_stream():
+    print("🧪 Testing POST /chat/stream...")
+    import httpx
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from backend.api import api
+    use_fake_llm(reply="Streaming works fine", delay=0)
+    api.chatbot_backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/chat/stream", json={"message": "Hi", "session_id": "sse_test"})
+        await api.chatbot_backend.aclose()
+        return response
+
+    response = asyncio.run(run())
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    assert names[0] == "session" and names[-1] == "message"
+    assert names.count("token") == 3
+    assert json.loads(events[-1][1].removeprefix("data: "))["content"] == "Streaming works fine"
+    print(f"✅ SSE events: {names}")
+
+def test_api_health_not_blocked_by_chat():
+    print("🧪 Testing /health while /chat is in flight...")
+    import httpx
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from backend.api import api
+    use_fake_llm(delay=1.0)
+    api.chatbot_backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat = asyncio.create_task(client.post("/chat", json={"message": "Hi", "session_id": "api_test"}))
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            health = await client.get("/health")
+            health_latency = time.perf_counter() - start
+            chat_response = await chat
+        await api.chatbot_backend.aclose()
+        return health, health_latency, chat_response
+
+    health, health_latency, chat_response = asyncio.run(run())
+    assert health.status_code == 200
+    assert health_latency < 0.5, f"/health waited {health_latency:.2f}s behind /chat"
+    assert chat_response.json()["response"] == "Hello from the fake LLM"
+    print(f"✅ /health answered in {health_latency * 1000:.0f}ms during a slow /chat")
+
+if __name__ == "__main__":
+    test_asend_message_persists_history()
+    test_scripted_replies_keep_every_turn()
+    test_concurrent_sessions_overlap()
+    test_known_session_skips_state_read()
+    test_concurrent_initialize_creates_once()
+    test_astream_message_events()
+    test_api_chat_stream()
+    test_api_health_not_blocked_by_chat()
@@ -0,0 +1,91 @@
+"""
+Background Summary Test - summarization runs after the reply and merges with later turns
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import backend.core as core
+
+class GatedSummaryModel(BaseChatModel):
+    """Fake LLM: replies immediately, but a summary request waits until the test releases it"""
+    entered: threading.Event
+    release: threading.Event
+
+    @property
+    def _llm_type(self) -> str:
+        return "gated-summary"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        if "summary" in prompt.lower() and isinstance(messages[-1], HumanMessage) and len(messages) == 1:
+            self.entered.set()
+            self.release.wait(5)
+            content = "The user greeted the assistant several times."
+        else:
+            content = f"Reply to: {prompt}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+def test_summary_is_deferred_and_merged_with_new_turns():
+    print("🧪 Testing deferred background summarization...")
+    model = GatedSummaryModel(entered=threading.Event(), release=threading.Event())
+    core.llm = model
+    core.llm_with_tools = model
+    core.memory_embeddings = core.HashingEmbeddings()
+    threshold = core.NEW_MESSAGES_THRESHOLD_FOR_SUMMARY
+    core.NEW_MESSAGES_THRESHOLD_FOR_SUMMARY = 4
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        try:
+            for i in range(3):
+                await backend.asend_message("summary_session", f"Hello {i}")
+
+            # The fourth reply crosses the threshold but must not wait for the summary
+            start = time.perf_counter()
+            await backend.asend_message("summary_session", "Hello 3")
+            latency = time.perf_counter() - start
+            assert await asyncio.to_thread(model.entered.wait, 5), "summary was not started"
+
+            # Turns that arrive while the summary is being generated
+            await backend.asend_message("summary_session", "Hello 4")
+            await backend.asend_message("summary_session", "Hello 5")
+            model.release.set()
+            assert await backend.aflush_summaries(timeout=5)
+            info = await backend.aget_session_info("summary_session")
+            history = await backend.aget_chat_history("summary_session")
+            return latency, info, history
+        finally:
+            await backend.aclose()
+
+    try:
+        latency, info, history = asyncio.run(run())
+    finally:
+        core.NEW_MESSAGES_THRESHOLD_FOR_SUMMARY = threshold
+
+    assert latency < 1.0, f"turn waited {latency:.2f}s for summarization"
+    assert info["summary"] == "The user greeted the assistant several times."
+    # The last two summarized messages are kept, both later turns are intact
+    assert [m["content"] for m in history] == [
+        "Hello 3", "Reply to: Hello 3",
+        "Hello 4", "Reply to: Hello 4",
+        "Hello 5", "Reply to: Hello 5",
+    ]
+    assert info["messages_since_last_summary"] == core.MESSAGES_TO_KEEP_AFTER_SUMMARY + 2
+    print(f"✅ Reply returned in {latency * 1000:.0f}ms, summary merged with 2 later turns")
+
+if __name__ == "__main__":
+    test_summary_is_deferred_and_merged_with_new_turns()
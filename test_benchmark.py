@@ -0,0 +1,61 @@
+"""
+Benchmark Test - the fake LLM, percentile math and a small load test on every target
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+import benchmark
+from fake_llm import FakeChatModel
+
+def test_percentiles():
+    print("🧪 Testing nearest-rank percentiles...")
+    values = [i / 100 for i in range(1, 101)]
+    assert benchmark.percentile(values, 50) == 0.50
+    assert benchmark.percentile(values, 95) == 0.95
+    assert benchmark.percentile(values, 99) == 0.99
+    assert benchmark.percentile([0.3], 99) == 0.3
+    assert benchmark.percentile([], 50) == 0.0
+    print("✅ p50/p95/p99 picked by nearest rank")
+
+def test_fake_model_calls_tools_then_answers():
+    print("🧪 Testing the fake chat model...")
+    model = FakeChatModel(latency=0, tool_call_rate=1.0, reply_words=8, seed=1)
+    first = model.invoke([HumanMessage(content="what is 6 times 7?")])
+    assert first.content == "" and first.tool_calls[0]["name"] == "calculate"
+
+    tool_result = ToolMessage(content="Result: 42", tool_call_id=first.tool_calls[0]["id"])
+    second = model.invoke([HumanMessage(content="what is 6 times 7?"), first, tool_result])
+    assert second.content.startswith("The tool says Result: 42.") and len(second.content.split()) == 8
+    assert "".join(chunk.content for chunk in model.stream([HumanMessage(content="hi")])) == ""
+    assert (model.calls, model.tool_calls) == (3, 2)
+    print("✅ Tool call on the question, text answer on the tool result")
+
+def test_every_target_reports():
+    print("🧪 Testing a small load test on every target...")
+    for target in benchmark.TARGETS:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite')}"
+        report = benchmark.run_benchmark(target=target, users=3, turns=2, latency=0.01,
+                                         tool_call_rate=0.5, database_url=url)
+        json.dumps(report)
+        assert report["turns"] == 6 and report["errors"] == 0, report["error_samples"]
+        assert report["llm_calls"] == 6 + report["tool_calls"]
+        latency = report["latency_ms"]
+        assert 10 <= latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+        assert report["turns_per_second"] > 0
+        assert report["checkpoint_db"]["growth_bytes"] > 0
+        assert report["peak_rss_mb"] is None or report["peak_rss_mb"] > 0
+        print(f"  ✓ {target}: {report['turns_per_second']} turns/s, p99 {latency['p99']} ms")
+    print("✅ Every target produced a complete JSON report")
+
+if __name__ == "__main__":
+    test_percentiles()
+    test_fake_model_calls_tools_then_answers()
+    test_every_target_reports()
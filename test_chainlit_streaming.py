@@ -0,0 +1,119 @@
+"""
+Chainlit Streaming Test - replies stream token by token, tool calls show as child steps,
+and concurrent users do not wait for each other
+"""
+
+import os
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "chainlit"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import app
+
+class FakeMessage:
+    sent = []
+
+    def __init__(self, content="", **kwargs):
+        self.content = content
+        self.tokens = []
+
+    async def stream_token(self, token):
+        self.tokens.append(token)
+        self.content += token
+
+    async def send(self):
+        FakeMessage.sent.append(self)
+        return self
+
+class FakeStep:
+    steps = []
+
+    def __init__(self, name, type, parent_id=None):
+        self.name, self.type, self.parent_id = name, type, parent_id
+        self.input = self.output = None
+        self.updates = 0
+
+    async def send(self):
+        FakeStep.steps.append(self)
+
+    async def update(self):
+        self.updates += 1
+
+class StreamingBackend:
+    """Async stand-in for ChatbotBackend.astream_message"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def astream_message(self, session_id, message, owner=None):
+        yield {"type": "tool_start", "id": "run-1", "name": "calculate", "input": {"expression": "6*7"}}
+        await asyncio.sleep(self.delay)
+        yield {"type": "tool_end", "id": "run-1", "name": "calculate", "output": "42"}
+        for word in ["The ", "answer ", "is ", "42."]:
+            await asyncio.sleep(self.delay)
+            yield {"type": "token", "content": word}
+        yield {"type": "message", "content": "The answer is 42."}
+
+def run_turns(backend, users: int):
+    original_cl, original_backend = app.cl, app.chatbot_backend
+    FakeMessage.sent, FakeStep.steps = [], []
+    app.chatbot_backend = backend
+    app.cl = SimpleNamespace(
+        Message=FakeMessage, Step=FakeStep,
+        context=SimpleNamespace(current_step=SimpleNamespace(id="turn")),
+        user_session=SimpleNamespace(get=lambda key: "chainlit_test"),
+    )
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*[app.on_message(SimpleNamespace(content="what is 6*7?")) for _ in range(users)])
+        return time.perf_counter() - start
+
+    try:
+        return asyncio.run(run())
+    finally:
+        app.cl, app.chatbot_backend = original_cl, original_backend
+
+def test_tokens_stream_and_tools_render_as_steps():
+    print("🧪 Testing token streaming and tool steps...")
+    run_turns(StreamingBackend(delay=0.01), users=1)
+
+    assert len(FakeMessage.sent) == 1
+    reply = FakeMessage.sent[0]
+    assert reply.tokens == ["The ", "answer ", "is ", "42."]
+    assert reply.content == "The answer is 42."
+
+    assert len(FakeStep.steps) == 1
+    step = FakeStep.steps[0]
+    assert (step.name, step.type, step.parent_id) == ("calculate", "tool", "turn")
+    assert step.input == {"expression": "6*7"} and step.output == "42" and step.updates == 1
+    print("✅ 4 tokens streamed, calculate shown as a child step with its result")
+
+def test_concurrent_users_share_the_event_loop():
+    print("🧪 Testing concurrent Chainlit users...")
+    elapsed = run_turns(StreamingBackend(delay=0.1), users=10)
+
+    # Each turn takes ~0.5s; ten of them run side by side instead of one after another
+    assert len(FakeMessage.sent) == 10
+    assert elapsed < 1.5, f"turns were serialized ({elapsed:.2f}s)"
+    print(f"✅ 10 streamed turns in {elapsed:.2f}s")
+
+def test_reply_without_tokens_uses_final_message():
+    print("🧪 Testing replies that arrive without tokens...")
+
+    class CachedBackend:
+        async def astream_message(self, session_id, message, owner=None):
+            yield {"type": "message", "content": "cached reply"}
+
+    run_turns(CachedBackend(), users=1)
+    assert FakeMessage.sent[0].content == "cached reply"
+    print("✅ Final reply shown when nothing was streamed")
+
+if __name__ == "__main__":
+    test_tokens_stream_and_tools_render_as_steps()
+    test_concurrent_users_share_the_event_loop()
+    test_reply_without_tokens_uses_final_message()
@@ -0,0 +1,199 @@
+"""
+Checkpoint Store Test - pooled SQLite saver under concurrent sessions
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import HumanMessage
+
+from backend.core import ChatbotBackend, ensure_message_has_id
+from checkpoint_compactor import CheckpointCompactor, checkpoint_timestamp
+from checkpoint_store import SqliteConnectionPool
+
+def write_turns(backend: ChatbotBackend, session_id: str, turns: int):
+    config = backend.get_config(session_id)
+    backend.initialize_session(session_id)
+    for i in range(turns):
+        backend.app.update_state(config, {"messages": [ensure_message_has_id(HumanMessage(content=f"{session_id} turn {i}"))]})
+        backend.get_chat_history(session_id)
+
+def test_concurrent_sessions_never_lock():
+    print("🧪 Testing concurrent writes across sessions...")
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(write_turns, backend, f"session_{i}", 15) for i in range(8)]
+            for future in futures:
+                future.result()
+
+        for i in range(8):
+            history = backend.get_chat_history(f"session_{i}")
+            assert [m["content"] for m in history] == [f"session_{i} turn {t}" for t in range(15)]
+    finally:
+        backend.close()
+    print("✅ 8 threads x 15 turns completed without 'database is locked'")
+
+def test_reads_do_not_wait_for_writer():
+    print("🧪 Testing reads while the writer is busy...")
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        backend.initialize_session("reader_session")
+        release = threading.Event()
+
+        def hold_writer():
+            with backend.pool.write():
+                release.wait(2)
+
+        holder = threading.Thread(target=hold_writer)
+        holder.start()
+        time.sleep(0.05)
+
+        start = time.perf_counter()
+        info = backend.get_session_info("reader_session")
+        elapsed = time.perf_counter() - start
+        release.set()
+        holder.join()
+
+        assert info["exists"]
+        assert elapsed < 0.5, f"read waited {elapsed:.2f}s for the writer"
+    finally:
+        backend.close()
+    print(f"✅ Read served in {elapsed * 1000:.1f}ms while the writer was held")
+
+def test_two_pools_share_one_file():
+    print("🧪 Testing two backends writing to the same file...")
+    db_path = os.path.join(tempfile.mkdtemp(), "chat.sqlite")
+    first, second = ChatbotBackend(db_path), ChatbotBackend(db_path)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(write_turns, backend, f"{name}_{i}", 10)
+                       for name, backend in (("first", first), ("second", second)) for i in range(2)]
+            for future in futures:
+                future.result()
+        assert len(second.get_chat_history("first_0")) == 10
+        assert len(first.get_chat_history("second_1")) == 10
+    finally:
+        first.close()
+        second.close()
+    print("✅ Busy timeout absorbed cross-connection write contention")
+
+def test_async_saver_methods():
+    print("🧪 Testing async checkpoint access...")
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+
+    async def run():
+        await asyncio.gather(*[backend.ainitialize_session(f"async_{i}") for i in range(20)])
+        return await asyncio.gather(*[backend.aget_session_info(f"async_{i}") for i in range(20)])
+
+    try:
+        infos = asyncio.run(run())
+        assert all(info["exists"] for info in infos)
+        assert backend.delete_session("async_0")
+        assert not backend.get_session_info("async_0")["exists"]
+    finally:
+        backend.close()
+    print("✅ 20 sessions created and read through the async saver")
+
+def count_checkpoints(backend: ChatbotBackend, session_id: str) -> int:
+    with backend.pool.read() as conn:
+        return conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (session_id,)).fetchone()[0]
+
+def test_compaction_keeps_last_checkpoints_and_reclaims_space():
+    print("🧪 Testing checkpoint retention and incremental vacuum...")
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        config = backend.get_config("long_session")
+        backend.initialize_session("long_session")
+        for i in range(30):
+            backend.app.update_state(config, {"messages": [ensure_message_has_id(HumanMessage(content=f"{i} " + "x" * 2000))]})
+        assert count_checkpoints(backend, "long_session") == 31
+
+        report = CheckpointCompactor(backend.pool, keep_last=3, max_age_days=0).compact()
+
+        assert report["checkpoints_deleted"] == 28
+        assert count_checkpoints(backend, "long_session") == 3
+        assert report["reclaimed_bytes"] > 0
+        assert len(backend.get_chat_history("long_session")) == 30
+    finally:
+        backend.close()
+    print(f"✅ Reclaimed {report['reclaimed_bytes']} bytes, live state intact")
+
+def test_age_retention_keeps_recent_and_latest():
+    print("🧪 Testing age-based retention...")
+    assert abs(checkpoint_timestamp(str(__import__("langgraph.checkpoint.base.id", fromlist=["uuid6"]).uuid6())) - time.time()) < 5
+
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        write_turns(backend, "aged_session", 5)
+        recent = CheckpointCompactor(backend.pool, keep_last=0, max_age_days=1).compact()
+        assert recent["checkpoints_deleted"] == 0
+
+        time.sleep(0.05)
+        expired = CheckpointCompactor(backend.pool, keep_last=0, max_age_days=0.01 / 86400).compact()
+        assert expired["checkpoints_deleted"] == 5
+        assert count_checkpoints(backend, "aged_session") == 1
+        assert len(backend.get_chat_history("aged_session")) == 5
+    finally:
+        backend.close()
+    print("✅ Recent checkpoints kept, old ones removed, latest always kept")
+
+def test_only_new_databases_are_incremental_without_conversion():
+    print("🧪 Testing incremental auto-vacuum of new and existing databases...")
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        compactor = CheckpointCompactor(backend.pool, keep_last=0, max_age_days=0)
+        assert compactor.incremental_vacuum_enabled()
+        assert not compactor.convert_to_incremental_vacuum()
+    finally:
+        backend.close()
+
+    # A database created before auto-vacuum was set up
+    legacy_path = os.path.join(tempfile.mkdtemp(), "legacy.sqlite")
+    conn = sqlite3.connect(legacy_path)
+    conn.execute("CREATE TABLE legacy (x)")
+    conn.commit()
+    conn.close()
+
+    backend = ChatbotBackend(legacy_path)
+    try:
+        compactor = CheckpointCompactor(backend.pool, keep_last=0, max_age_days=0)
+        write_turns(backend, "legacy_session", 3)
+        # The background pass never rewrites the file
+        compactor.compact()
+        assert not compactor.incremental_vacuum_enabled()
+    finally:
+        backend.close()
+
+    # Converted offline, as python launcher.py vacuum does
+    pool = SqliteConnectionPool(legacy_path)
+    try:
+        assert CheckpointCompactor(pool).convert_to_incremental_vacuum()
+    finally:
+        pool.close()
+
+    backend = ChatbotBackend(legacy_path)
+    try:
+        assert CheckpointCompactor(backend.pool).incremental_vacuum_enabled()
+        assert len(backend.get_chat_history("legacy_session")) == 3
+    finally:
+        backend.close()
+    print("✅ New databases start incremental, existing ones only convert on request")
+
+if __name__ == "__main__":
+    test_concurrent_sessions_never_lock()
+    test_reads_do_not_wait_for_writer()
+    test_two_pools_share_one_file()
+    test_async_saver_methods()
+    test_compaction_keeps_last_checkpoints_and_reclaims_space()
+    test_age_retention_keeps_recent_and_latest()
+    test_only_new_databases_are_incremental_without_conversion()
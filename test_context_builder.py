@@ -0,0 +1,97 @@
+"""
+Context Builder Test - token-budgeted prompt assembly with cached token counts
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+import backend.core as core
+from context_builder import ContextBuilder, MESSAGE_OVERHEAD_TOKENS
+
+def word_counter(calls):
+    def count(text):
+        calls.append(text)
+        return len(text.split())
+    return count
+
+def make_history(turns):
+    history = [SystemMessage(content="session prompt", id="sys")]
+    for i in range(turns):
+        history.append(HumanMessage(content=f"question {i} " + "word " * 20, id=f"h{i}"))
+        history.append(AIMessage(content=f"answer {i} " + "word " * 20, id=f"a{i}"))
+    return history
+
+def test_newest_messages_fit_the_budget():
+    print("🧪 Testing the token budget...")
+    builder = ContextBuilder(max_tokens=200, reserve_tokens=50, counter=word_counter([]))
+    messages, used = builder.build([SystemMessage(content="pinned summary")], make_history(10))
+
+    assert used <= builder.budget
+    assert [m.content for m in messages[:2]] == ["pinned summary", "session prompt"]
+    assert [m.id for m in messages[2:]] == ["a7", "h8", "a8", "h9", "a9"]
+    print(f"✅ Kept the 5 newest of 20 messages in {used}/{builder.budget} tokens")
+
+def test_tool_calls_stay_with_their_results():
+    print("🧪 Testing tool call grouping...")
+    history = make_history(2) + [
+        HumanMessage(content="what time is it", id="h2"),
+        AIMessage(content="", id="call", tool_calls=[{"name": "get_current_time", "args": {}, "id": "t1"}]),
+        ToolMessage(content="2026-01-01 " + "x " * 60, tool_call_id="t1", id="result"),
+    ]
+    builder = ContextBuilder(max_tokens=80, reserve_tokens=0, counter=word_counter([]))
+    messages, _ = builder.build([], history)
+    assert [m.id for m in messages] == ["sys", "call", "result"]
+
+    # The newest block is sent even when it alone is over budget
+    tiny = ContextBuilder(max_tokens=10, reserve_tokens=0, counter=word_counter([]))
+    assert [m.id for m in tiny.build([], history)[0]] == ["sys", "call", "result"]
+    print("✅ Tool call and result kept together")
+
+def test_token_counts_are_cached_by_message_id():
+    print("🧪 Testing the token count cache...")
+    calls = []
+    builder = ContextBuilder(max_tokens=100000, reserve_tokens=0, counter=word_counter(calls))
+    history = make_history(50)
+    builder.build([SystemMessage(content="prompt")], history)
+    assert len(calls) == 102
+
+    calls.clear()
+    history += [HumanMessage(content="one more", id="new_h"), AIMessage(content="sure", id="new_a")]
+    builder.build([SystemMessage(content="prompt")], history)
+    # Only the new messages and the ID-less prompt are counted again
+    assert calls == ["prompt", "sure", "one more"]
+    assert builder.count_message(history[-1]) == 1 + MESSAGE_OVERHEAD_TOKENS
+    print(f"✅ Second turn counted 3 texts instead of {len(history) + 1}")
+
+def test_llm_prompt_respects_budget():
+    print("🧪 Testing _build_llm_messages with a long paste...")
+    original = core.context_builder
+    core.context_builder = ContextBuilder(max_tokens=2000, reserve_tokens=500)
+    try:
+        state = {
+            "messages": [
+                SystemMessage(content="session prompt", id="sys"),
+                HumanMessage(content="please read this " + "lorem ipsum " * 2000, id="paste"),
+                AIMessage(content="That is a long text.", id="a0"),
+                HumanMessage(content="What did I ask before?", id="h1"),
+            ],
+            "summary": "The user pasted a document.",
+        }
+        messages = core._build_llm_messages(state)
+    finally:
+        core.context_builder = original
+
+    assert "The user pasted a document." in messages[0].content and messages[0].id
+    assert [m.id for m in messages[1:]] == ["sys", "a0", "h1"]
+    print("✅ Long paste left out, summary and latest question kept")
+
+if __name__ == "__main__":
+    test_newest_messages_fit_the_budget()
+    test_tool_calls_stay_with_their_results()
+    test_token_counts_are_cached_by_message_id()
+    test_llm_prompt_respects_budget()
@@ -0,0 +1,81 @@
+"""
+Embedding Cache Test - content-addressed memory and SQLite tiers
+"""
+
+import os
+import sys
+import tempfile
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from checkpoint_store import SqliteConnectionPool
+from embedding_cache import CachedEmbeddings
+from memory_index import HashingEmbeddings
+
+class CountingEmbeddings(HashingEmbeddings):
+    """Local embeddings that record every text sent to the "model\""""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+def test_repeated_texts_hit_memory_then_disk():
+    print("🧪 Testing memory and disk cache tiers...")
+    db_path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+    pool = SqliteConnectionPool(db_path)
+    try:
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, pool)
+        first = cache.embed_documents(["Hello!", "How are you?", "Hello!"])
+        assert model.calls == [["Hello!", "How are you?"]]
+        assert first[0] == first[2] == model.embed_query("Hello!")
+
+        # Whitespace differences normalize to the same entry
+        assert cache.embed_query("  Hello!\n") == first[0]
+        assert len(model.calls) == 1
+
+        cache.clear_memory()
+        assert cache.embed_documents(["How are you?"]) == [first[1]]
+        assert len(model.calls) == 1
+
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (2, 1, 2)
+        assert stats["model_calls"] == 1
+        assert stats["hit_rate"] == 3 / 5
+    finally:
+        pool.close()
+    print(f"✅ 5 lookups, 1 model call, hit rate {stats['hit_rate']:.0%}")
+
+def test_prefetch_and_model_isolation():
+    print("🧪 Testing bulk prefetch...")
+    pool = SqliteConnectionPool(os.path.join(tempfile.mkdtemp(), "cache.sqlite"))
+    try:
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, pool)
+        texts = [f"message {i}" for i in range(1200)]
+        assert cache.prefetch(texts) == 1200
+        assert cache.prefetch(texts) == 0
+        assert len(model.calls) == 1
+
+        # A restarted process reads the vectors back from SQLite
+        restarted = CachedEmbeddings(CountingEmbeddings(), pool)
+        assert restarted.prefetch(texts) == 0
+        assert restarted.stats()["disk_hits"] == 1200
+
+        # Another model never sees these vectors
+        other = CountingEmbeddings()
+        other.model = "other-model"
+        assert CachedEmbeddings(other, pool).prefetch(texts[:10]) == 10
+    finally:
+        pool.close()
+    print("✅ 1200 texts prefetched in one call and reused after restart")
+
+if __name__ == "__main__":
+    test_repeated_texts_hit_memory_then_disk()
+    test_prefetch_and_model_isolation()
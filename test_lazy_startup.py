@@ -0,0 +1,56 @@
+"""
+Lazy Startup Test - importing the backend and creating it loads no LLM or embeddings client
+"""
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPT = """
+import os, sys, tempfile
+from backend.core import ChatbotBackend
+backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "lazy.sqlite"))
+backend.initialize_session("lazy")
+assert backend.get_session_info("lazy")["messages_count"] == 1
+backend.close()
+print(sorted(m for m in ("langchain_openai", "langchain_ollama", "openai", "ollama") if m in sys.modules))
+
+import backend.core as core
+model = core.llm
+print(type(model).__name__, "langchain_openai" in sys.modules)
+"""
+
+def test_clients_load_on_first_use():
+    print("🧪 Testing lazy client initialization...")
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, "MEMORY_EMBEDDINGS": "ollama"})
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.strip().splitlines()
+    assert lines[-2] == "[]", f"client libraries loaded at startup: {lines[-2]}"
+    assert lines[-1] == "ChatOpenAI True"
+    print("✅ Backend created without loading a client; core.llm built on first access")
+
+def test_compiled_graph_is_shared():
+    print("🧪 Testing the compiled graph cache...")
+    import tempfile
+    sys.path.insert(0, ROOT)
+    from backend.core import ChatbotBackend, get_compiled_workflow
+
+    first = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "a.sqlite"))
+    second = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "b.sqlite"))
+    try:
+        assert first.app.checkpointer is first.checkpointer
+        assert second.app.checkpointer is second.checkpointer
+        assert first.app.nodes["llm_caller"] is get_compiled_workflow().nodes["llm_caller"] is second.app.nodes["llm_caller"]
+        first.initialize_session("only_in_first")
+        assert second.get_session_info("only_in_first")["exists"] is False
+    finally:
+        first.close()
+        second.close()
+    print("✅ Backends share one compiled graph with separate checkpointers")
+
+if __name__ == "__main__":
+    test_clients_load_on_first_use()
+    test_compiled_graph_is_shared()
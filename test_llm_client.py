@@ -0,0 +1,130 @@
+"""
+LLM Client Test - shared connection pool and global concurrency limit
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+import llm_client
+from llm_client import ConcurrencyLimiter, LimitedTransport, AsyncLimitedTransport, get_chat_model
+
+class FakeCompletionsServer(ThreadingHTTPServer):
+    """OpenAI-compatible endpoint that answers after a delay and records peak concurrency"""
+    daemon_threads = True
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.active = self.peak = self.requests = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _CompletionsHandler)
+
+class _CompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.active += 1
+            server.requests += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        body = json.dumps({
+            "id": "cmpl", "object": "chat.completion", "created": 0, "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "pong"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_server(delay: float) -> FakeCompletionsServer:
+    server = FakeCompletionsServer(delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_limit_applies_across_threads_and_event_loops():
+    print("🧪 Testing the shared concurrency limit...")
+    server = start_server(delay=0.1)
+    limiter = ConcurrencyLimiter(2)
+    limits = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+    model = ChatOpenAI(
+        base_url=f"http://127.0.0.1:{server.server_port}/v1", model_name="fake", api_key="test", max_retries=0,
+        http_client=httpx.Client(transport=LimitedTransport(limiter, limits)),
+        http_async_client=httpx.AsyncClient(transport=AsyncLimitedTransport(limiter, limits)),
+    )
+
+    async def burst():
+        return await asyncio.gather(*[model.ainvoke("ping") for _ in range(3)])
+
+    try:
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            sync_calls = [executor.submit(model.invoke, "ping") for _ in range(3)]
+            # Two event loops in two threads share the same limiter
+            loops = [executor.submit(asyncio.run, burst()) for _ in range(2)]
+            replies = [f.result().content for f in sync_calls] + [r.content for f in loops for r in f.result()]
+
+        # The same async client keeps working from a new event loop
+        assert asyncio.run(model.ainvoke("ping")).content == "pong"
+    finally:
+        server.shutdown()
+
+    stats = limiter.stats()
+    assert replies == ["pong"] * 9
+    assert server.requests == 10
+    assert server.peak <= 2, f"{server.peak} requests reached the server at once"
+    assert stats["requests"] == 10 and stats["queued_requests"] > 0
+    assert stats["max_wait_seconds"] >= 0.05 and stats["in_flight"] == 0
+    print(f"✅ Peak upstream concurrency {server.peak}, mean queue wait {stats['mean_wait_seconds'] * 1000:.0f}ms")
+
+def test_cancelled_waiter_passes_its_permit_on():
+    print("🧪 Testing cancellation while queued...")
+    limiter = ConcurrencyLimiter(1)
+
+    async def run():
+        await limiter.aacquire()
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        limiter.release()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.wait_for(limiter.aacquire(), timeout=1)
+        limiter.release()
+
+    asyncio.run(run())
+    assert limiter.stats()["in_flight"] == 0
+    print("✅ No permit leaked")
+
+def test_factory_shares_models_and_client():
+    print("🧪 Testing the model factory...")
+    chat = get_chat_model()
+    assert get_chat_model() is chat
+    other = get_chat_model(temperature=0.0)
+    assert other is not chat
+    assert chat.http_client is other.http_client is llm_client.http_client
+    assert isinstance(llm_client.http_client._transport, LimitedTransport)
+    print("✅ One pooled client behind every model")
+
+if __name__ == "__main__":
+    test_limit_applies_across_threads_and_event_loops()
+    test_cancelled_waiter_passes_its_permit_on()
+    test_factory_shares_models_and_client()
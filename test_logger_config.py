@@ -0,0 +1,128 @@
+"""
+Logger Config Test - JSON records, per-module levels, a queue that never blocks the caller,
+and a quiet request path at the default level
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import tempfile
+import contextlib
+from logging.handlers import QueueListener
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import logger_config
+from logger_config import JsonFormatter, flush_logs, level_for, parse_levels, setup_logger
+from test_async_backend import use_fake_llm
+
+class SlowHandler(logging.Handler):
+    """A sink that takes 50 ms per record, like a congested pipe or a remote collector"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        time.sleep(0.05)
+        self.records.append(self.format(record))
+
+def test_json_records():
+    print("🧪 Testing JSON log records...")
+    formatter = JsonFormatter()
+    record = logging.LogRecord("core", logging.INFO, __file__, 1, "Turn for %s", ("s1",), None)
+    record.session_id = "s1"
+    entry = json.loads(formatter.format(record))
+    assert (entry["level"], entry["logger"], entry["message"], entry["session_id"]) == ("INFO", "core", "Turn for s1", "s1")
+    assert entry["time"].endswith("+00:00")
+
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = logging.LogRecord("core", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    entry = json.loads(formatter.format(record))
+    assert "RuntimeError: boom" in entry["exception"]
+    print("✅ One JSON object per record, with extra fields and tracebacks")
+
+def test_per_module_levels():
+    print("🧪 Testing per-module levels...")
+    overrides = parse_levels("core=DEBUG, checkpoint_compactor=warning")
+    assert overrides == {"core": logging.DEBUG, "checkpoint_compactor": logging.WARNING}
+    assert level_for("core", "INFO", overrides) == logging.DEBUG
+    assert level_for("core.nodes", "INFO", overrides) == logging.DEBUG
+    assert level_for("checkpoint_compactor", "INFO", overrides) == logging.WARNING
+    assert level_for("simple_core", "ERROR", overrides) == logging.ERROR
+    try:
+        parse_levels("core=LOUD")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown level accepted")
+    print("✅ Most specific override wins, the default applies elsewhere")
+
+def test_emitting_never_waits_for_the_sink():
+    print("🧪 Testing the queue in front of a slow sink...")
+    records = queue.SimpleQueue()
+    sink = SlowHandler()
+    listener = QueueListener(records, sink)
+    logger = logging.getLogger("test_logger_config.slow")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logger_config._NonBlockingQueueHandler(records))
+    listener.start()
+    try:
+        start = time.perf_counter()
+        for i in range(20):
+            logger.info("record %d", i)
+        elapsed = time.perf_counter() - start
+    finally:
+        listener.stop()
+    # Written synchronously, 20 records would take a second
+    assert elapsed < 0.1, f"logging blocked for {elapsed:.2f}s"
+    assert sink.records == [f"record {i}" for i in range(20)]
+    print(f"✅ 20 records logged in {elapsed * 1000:.1f} ms, all written after")
+
+def test_turn_is_quiet_at_info():
+    print("🧪 Testing that a turn writes nothing at the default level...")
+    import backend.core as core
+    assert not core.logger.isEnabledFor(logging.DEBUG)
+    use_fake_llm(reply="Quiet reply", delay=0)
+    backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "quiet.sqlite"))
+    flush_logs()
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            backend.send_message("quiet", "hello")
+            backend.send_message("quiet", "again")
+            flush_logs()
+    finally:
+        backend.close()
+    assert output.getvalue() == "", output.getvalue()
+    print("✅ No per-turn output unless debug logging is enabled")
+
+def test_setup_logger_shares_one_listener():
+    print("🧪 Testing setup_logger...")
+    first, second = setup_logger("test_module_a"), setup_logger("test_module_b")
+    assert first.handlers == second.handlers and len(first.handlers) == 1
+    assert not first.propagate
+    assert setup_logger("test_module_a") is first and len(first.handlers) == 1
+
+    flush_logs()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        first.warning("disk %s almost full", "/data")
+        flush_logs()
+    assert "| test_module_a | WARNING | disk /data almost full" in output.getvalue()
+    print("✅ Loggers share the queue handler and write through the listener")
+
+if __name__ == "__main__":
+    test_json_records()
+    test_per_module_levels()
+    test_emitting_never_waits_for_the_sink()
+    test_turn_is_quiet_at_info()
+    test_setup_logger_shares_one_listener()
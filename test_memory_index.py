@@ -0,0 +1,113 @@
+"""
+Memory Index Test - vector-backed search_memory over a session's messages
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import backend.core as core
+from checkpoint_store import SqliteConnectionPool
+from memory_index import MemoryIndex, HashingEmbeddings
+from test_async_backend import use_fake_llm
+
+def test_hashing_embeddings_are_deterministic():
+    print("🧪 Testing the local embedding stand-in...")
+    first, second = HashingEmbeddings(), HashingEmbeddings()
+    assert first.embed_query("my dog is called Biscuit") == second.embed_query("my dog is called Biscuit")
+    assert first.model == "hashing-256"
+    print("✅ Same text, same vector")
+
+def test_search_memory_tool_finds_earlier_messages():
+    print("🧪 Testing search_memory through the graph...")
+    use_fake_llm(delay=0, responses=[
+        AIMessage(content="Nice to meet Biscuit!"),
+        AIMessage(content="", tool_calls=[{"name": "search_memory", "args": {"query": "what is my dog called"}, "id": "call_1"}]),
+        AIMessage(content="Your dog is called Biscuit."),
+    ])
+
+    async def run():
+        backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+        try:
+            await backend.asend_message("memory_session", "My dog is called Biscuit and loves the beach")
+            # Messages are embedded in the background after the reply
+            await backend.aflush_indexing()
+            reply = await backend.asend_message("memory_session", "Do you remember my dog?")
+            await backend.aflush_indexing()
+            state = await backend.app.aget_state(backend.get_config("memory_session"))
+            return reply, state.values["messages"], backend.memory_index.count("memory_session")
+        finally:
+            await backend.aclose()
+
+    reply, messages, indexed = asyncio.run(run())
+    tool_output = next(m.content for m in messages if isinstance(m, ToolMessage))
+    assert "1. [user" in tool_output and "Biscuit" in tool_output, tool_output
+    assert reply == "Your dog is called Biscuit."
+    assert indexed == 4
+    print(f"✅ Tool returned: {tool_output.splitlines()[1]}")
+
+class SlowEmbeddings(HashingEmbeddings):
+    """Hashing embeddings behind a 300 ms round trip, like a busy embeddings server"""
+
+    def embed_documents(self, texts):
+        time.sleep(0.3)
+        return super().embed_documents(texts)
+
+def test_reply_does_not_wait_for_embeddings():
+    print("🧪 Testing that indexing happens after the reply...")
+    use_fake_llm(reply="Noted", delay=0)
+    backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"), embedder=SlowEmbeddings())
+    try:
+        start = time.perf_counter()
+        assert backend.send_message("slow_index", "Remember that the gate code is 4411") == "Noted"
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.25, f"reply waited {elapsed:.2f}s"
+        assert backend.flush_indexing(timeout=5)
+        assert backend.memory_index.count("slow_index") == 2
+    finally:
+        backend.close()
+    print(f"✅ Reply in {elapsed * 1000:.0f} ms, both messages indexed afterwards")
+
+def test_index_is_incremental_persistent_and_fast():
+    print("🧪 Testing a session with thousands of messages...")
+    pool = SqliteConnectionPool(os.path.join(tempfile.mkdtemp(), "memory.sqlite"))
+    try:
+        index = MemoryIndex(pool, HashingEmbeddings())
+        messages = [core.ensure_message_has_id(HumanMessage(content=f"note {i} about topic {i % 97}"))
+                    for i in range(3000)]
+        messages.append(core.ensure_message_has_id(AIMessage(content="The launch code is purple giraffe")))
+        assert index.add_messages("big_session", messages) == 3001
+        assert index.add_messages("big_session", messages) == 0
+
+        # A fresh index over the same database loads the stored vectors
+        reloaded = MemoryIndex(pool, HashingEmbeddings())
+        assert reloaded.count("big_session") == 3001
+
+        start = time.perf_counter()
+        hits = reloaded.search("big_session", "purple giraffe launch code", k=3)
+        elapsed = time.perf_counter() - start
+        assert hits[0]["content"] == "The launch code is purple giraffe"
+        assert hits[0]["role"] == "assistant"
+        assert elapsed < 0.05, f"search took {elapsed * 1000:.1f}ms"
+
+        assert reloaded.search("other_session", "purple giraffe") == []
+        reloaded.delete("big_session")
+        assert MemoryIndex(pool, HashingEmbeddings()).count("big_session") == 0
+        # No per-session lock outlives its use
+        assert not index._locks._locks and not reloaded._locks._locks
+    finally:
+        pool.close()
+    print(f"✅ Top hit over 3001 messages in {elapsed * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    test_hashing_embeddings_are_deterministic()
+    test_search_memory_tool_finds_earlier_messages()
+    test_reply_does_not_wait_for_embeddings()
+    test_index_is_incremental_persistent_and_fast()
@@ -0,0 +1,82 @@
+"""
+Message Coalescer Test - burst messages merged into one turn, strictly in order
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from message_coalescer import MessageCoalescer
+
+def test_burst_is_merged_into_one_batch():
+    print("🧪 Testing a burst of messages...")
+    batches = []
+
+    async def process(key, items):
+        batches.append((key, items))
+
+    async def run():
+        coalescer = MessageCoalescer(process, window_ms=50, max_delay_ms=1000)
+        for text in ["hi", "are you there?", "I need help"]:
+            coalescer.submit("alice", text)
+            await asyncio.sleep(0.01)
+        coalescer.submit("bob", "hello")
+        await coalescer.flush()
+        return coalescer.stats
+
+    stats = asyncio.run(run())
+    assert sorted(batches) == [("alice", ["hi", "are you there?", "I need help"]), ("bob", ["hello"])]
+    assert stats == {"items": 4, "batches": 2}
+    print(f"✅ 4 messages became {stats['batches']} turns")
+
+def test_messages_during_a_turn_queue_in_order():
+    print("🧪 Testing messages that arrive while a turn is running...")
+    events = []
+
+    async def process(key, items):
+        events.append(("start", items))
+        await asyncio.sleep(0.1)
+        events.append(("end", items))
+
+    async def run():
+        coalescer = MessageCoalescer(process, window_ms=20)
+        coalescer.submit("alice", "first")
+        await asyncio.sleep(0.05)
+        coalescer.submit("alice", "second")
+        coalescer.submit("alice", "third")
+        await coalescer.flush()
+
+    asyncio.run(run())
+    # The second turn starts only after the first one finished
+    assert events == [("start", ["first"]), ("end", ["first"]),
+                      ("start", ["second", "third"]), ("end", ["second", "third"])]
+    print("✅ Turns for one session never overlap")
+
+def test_steady_sender_is_answered_within_max_delay():
+    print("🧪 Testing the maximum delay...")
+    started = []
+
+    async def process(key, items):
+        started.append((time.perf_counter(), len(items)))
+
+    async def run():
+        coalescer = MessageCoalescer(process, window_ms=50, max_delay_ms=150, max_batch=100)
+        begin = time.perf_counter()
+        for i in range(12):
+            coalescer.submit("chatty", f"message {i}")
+            await asyncio.sleep(0.03)
+        await coalescer.flush()
+        return begin
+
+    begin = asyncio.run(run())
+    assert started[0][0] - begin < 0.3, "first batch waited for the sender to stop"
+    assert sum(count for _, count in started) == 12 and len(started) >= 2
+    print(f"✅ Continuous sender answered in {len(started)} batches")
+
+if __name__ == "__main__":
+    test_burst_is_merged_into_one_batch()
+    test_messages_during_a_turn_queue_in_order()
+    test_steady_sender_is_answered_within_max_delay()
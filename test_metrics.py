@@ -0,0 +1,122 @@
+"""
+Metrics Test - Prometheus text rendering, callback timings of nodes, tools and the LLM,
+checkpoint I/O and the API's /metrics endpoint
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage
+
+import backend.core as core
+import metrics
+from metrics import Counter, Gauge, Histogram, MetricsRegistry
+from test_async_backend import use_fake_llm
+
+def test_text_format():
+    print("🧪 Testing the Prometheus text format...")
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("demo_seconds", "Demo latency", ["node"], buckets=(0.1, 1.0)))
+    errors = registry.register(Counter("demo_errors_total", "Demo errors", ["tool"]))
+    queued = registry.register(Gauge("demo_queued", "Demo queue length"))
+    latency.observe(0.05, node="llm")
+    latency.observe(0.5, node="llm")
+    latency.observe(3, node="llm")
+    errors.inc(tool='say "hi"\n')
+    queued.inc(3)
+    queued.dec()
+
+    text = registry.render()
+    for line in [
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{node="llm",le="0.1"} 1',
+        'demo_seconds_bucket{node="llm",le="1"} 2',
+        'demo_seconds_bucket{node="llm",le="+Inf"} 3',
+        'demo_seconds_sum{node="llm"} 3.55',
+        'demo_seconds_count{node="llm"} 3',
+        'demo_errors_total{tool="say \\"hi\\"\\n"} 1',
+        "demo_queued 2",
+    ]:
+        assert line in text.splitlines(), f"missing {line!r} in:\n{text}"
+
+    try:
+        errors.inc(node="wrong")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("wrong label names were accepted")
+    print("✅ Cumulative buckets, escaped labels and gauges rendered")
+
+def test_turn_feeds_node_tool_and_llm_metrics():
+    print("🧪 Testing metrics collected from a tool-using turn...")
+    use_fake_llm(delay=0.02, responses=[
+        AIMessage(content="", tool_calls=[{"name": "calculate", "args": {"expression": "6*7"}, "id": "call_m"}]),
+        AIMessage(content="6 times 7 is 42"),
+    ])
+    before = {
+        "llm_node": metrics.NODE_SECONDS.count(node="llm_caller"),
+        "tools_node": metrics.NODE_SECONDS.count(node="tools"),
+        "tool": metrics.TOOL_SECONDS.count(tool="calculate"),
+        "llm": metrics.LLM_SECONDS.count(),
+        "ttft": metrics.LLM_FIRST_TOKEN_SECONDS.count(),
+        "put": metrics.CHECKPOINT_SECONDS.count(operation="put"),
+        "written": metrics.CHECKPOINT_BYTES.value(direction="write"),
+    }
+
+    backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "metrics.sqlite"))
+    try:
+        assert backend.send_message("metrics_session", "what is 6*7?") == "6 times 7 is 42"
+    finally:
+        backend.close()
+
+    assert metrics.NODE_SECONDS.count(node="llm_caller") - before["llm_node"] == 2
+    assert metrics.NODE_SECONDS.count(node="tools") - before["tools_node"] == 1
+    assert metrics.TOOL_SECONDS.count(tool="calculate") - before["tool"] == 1
+    assert metrics.LLM_SECONDS.count() - before["llm"] == 2
+    assert metrics.LLM_FIRST_TOKEN_SECONDS.count() - before["ttft"] == 2
+    assert metrics.CHECKPOINT_SECONDS.count(operation="put") > before["put"]
+    assert metrics.CHECKPOINT_BYTES.value(direction="write") > before["written"]
+    assert metrics.NODE_SECONDS.sum(node="llm_caller") >= 0.04
+    assert metrics.GRAPH_RUNS_IN_FLIGHT.value() == 0
+    print("✅ 2 llm_caller runs, 1 tools run, 1 calculate call and checkpoint writes recorded")
+
+def test_metrics_endpoint():
+    print("🧪 Testing GET /metrics...")
+    import httpx
+    from backend.api import api
+    use_fake_llm(reply="Measured reply", delay=0)
+    api.chatbot_backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "metrics.sqlite"))
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/chat", json={"message": "Hi", "session_id": "scraped"})
+            await client.get("/session/scraped")
+            response = await client.get("/metrics")
+        await api.chatbot_backend.aclose()
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert any(line.startswith('chatbot_http_request_duration_seconds_count{method="POST",route="/chat",status="200"}')
+               for line in lines)
+    # Routes are labelled by template, never by session ID
+    assert any('route="/session/{session_id}"' in line for line in lines)
+    assert not any("scraped" in line for line in lines)
+    # Only the scrape itself is in flight
+    assert "chatbot_http_requests_in_flight 1" in lines
+    active = next(line for line in lines if line.startswith("chatbot_active_sessions "))
+    assert int(active.split()[1]) >= 1
+    print("✅ /metrics served node, HTTP and session metrics")
+
+if __name__ == "__main__":
+    test_text_format()
+    test_turn_feeds_node_tool_and_llm_metrics()
+    test_metrics_endpoint()
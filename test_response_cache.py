@@ -0,0 +1,88 @@
+"""
+Response Cache Test - exact and semantic reuse of LLM replies
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage
+
+import backend.core as core
+from response_cache import ResponseCache
+from memory_index import HashingEmbeddings
+from test_async_backend import use_fake_llm
+
+def make_backend(cache: ResponseCache) -> core.ChatbotBackend:
+    core.response_cache = cache
+    return core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+
+def test_exact_tier_and_opt_out():
+    print("🧪 Testing the exact response cache...")
+    fake = use_fake_llm(reply="Hi! How can I help?", delay=0)
+    original = core.response_cache
+    backend = make_backend(ResponseCache(enabled=True))
+    try:
+        assert backend.send_message("first", "Hello") == "Hi! How can I help?"
+        assert backend.send_message("second", "  hello ") == "Hi! How can I help?"
+        assert fake.index == 1
+
+        # A session that opted out always reaches the LLM
+        backend.set_user_preferences("third", {"response_cache": False})
+        backend.send_message("third", "Hello")
+        assert fake.index == 2
+
+        stats = backend.get_response_cache_stats()
+        assert (stats["exact_hits"], stats["misses"], stats["bypassed"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+    finally:
+        backend.close()
+        core.response_cache = original
+    print(f"✅ Exact hit served without an LLM call, stats: {stats}")
+
+def test_semantic_tier_only_for_first_turns():
+    print("🧪 Testing the semantic response cache...")
+    fake = use_fake_llm(reply="I can tell the time and do maths.", delay=0)
+    original = core.response_cache
+    backend = make_backend(ResponseCache(enabled=True, embeddings=HashingEmbeddings(), similarity=0.75))
+    try:
+        backend.send_message("first", "What can you do?")
+        assert backend.send_message("second", "what can you do for me?") == "I can tell the time and do maths."
+        assert fake.index == 1
+
+        # With conversation context, only the exact tier applies
+        backend.send_message("second", "What can you do?")
+        assert fake.index == 2
+
+        backend.send_message("third", "What is the capital of France?")
+        assert fake.index == 3
+        assert backend.get_response_cache_stats()["semantic_hits"] == 1
+    finally:
+        backend.close()
+        core.response_cache = original
+    print("✅ Paraphrased first question served from the semantic tier")
+
+def test_ttl_and_uncacheable_replies():
+    print("🧪 Testing expiry and tool-call replies...")
+    cache = ResponseCache(enabled=True, ttl_seconds=0.05)
+    prompt = [core.SystemMessage(content="system"), core.HumanMessage(content="What time is it?")]
+    model = core.llm
+
+    tool_call = AIMessage(content="", tool_calls=[{"name": "get_current_time", "args": {}, "id": "t1"}])
+    cache.store(prompt, model, tool_call)
+    assert cache.lookup(prompt, model) is None
+
+    cache.store(prompt, model, AIMessage(content="It is noon."))
+    assert cache.lookup(prompt, model).content == "It is noon."
+    time.sleep(0.1)
+    assert cache.lookup(prompt, model) is None
+    print("✅ Tool calls never cached, entries expire after the TTL")
+
+if __name__ == "__main__":
+    test_exact_tier_and_opt_out()
+    test_semantic_tier_only_for_first_turns()
+    test_ttl_and_uncacheable_replies()
@@ -0,0 +1,116 @@
+"""
+Session Catalog Test - indexed session listing and cursor pagination
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+from backend.core import ChatbotBackend, ensure_message_has_id
+from checkpoint_store import SqliteConnectionPool
+from session_catalog import SessionCatalog
+
+def make_catalog() -> SessionCatalog:
+    return SessionCatalog(SqliteConnectionPool(os.path.join(tempfile.mkdtemp(), "catalog.sqlite")))
+
+def test_cursor_pagination_walks_every_session_once():
+    print("🧪 Testing cursor pagination...")
+    catalog = make_catalog()
+    for i in range(120):
+        owner = "alice" if i % 3 == 0 else "bob"
+        catalog.record_turn(f"session_{i:03d}", i, title=f"Question {i}", preview=f"Answer {i}",
+                            owner=owner, last_activity=f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}.000000+00:00")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = catalog.list_page(after=cursor, limit=50)
+        seen.extend(row["session_id"] for row in page)
+        if not cursor:
+            break
+    assert seen == [f"session_{i:03d}" for i in reversed(range(120))]
+
+    alice, _ = catalog.list_page(owner="alice", limit=200)
+    assert len(alice) == 40 and all(row["owner"] == "alice" for row in alice)
+    print("✅ 120 sessions listed newest first across 3 pages")
+
+def test_listing_uses_an_index():
+    print("🧪 Testing the listing query plan...")
+    catalog = make_catalog()
+    with catalog.pool.read() as conn:
+        plan = " ".join(str(row) for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE owner = ? AND (last_activity, session_id) < (?, ?) "
+            "ORDER BY last_activity DESC, session_id DESC LIMIT 51", ("alice", "z", "z")))
+    assert "sessions_by_owner" in plan and "TEMP B-TREE" not in plan, plan
+    print(f"✅ Query plan: {plan}")
+
+def test_title_is_kept_and_preview_updates():
+    print("🧪 Testing incremental catalog updates...")
+    catalog = make_catalog()
+    catalog.record_created("chat", owner="carol")
+    catalog.record_turn("chat", 2, title="How do I bake bread?", preview="Start with flour")
+    catalog.record_turn("chat", 4, title="What about rye?", preview="Rye needs a sourdough starter")
+
+    row = catalog.get("chat")
+    assert row["title"] == "How do I bake bread?"
+    assert row["last_preview"] == "Rye needs a sourdough starter"
+    assert row["message_count"] == 4 and row["owner"] == "carol"
+    catalog.delete("chat")
+    assert catalog.get("chat") is None
+    print("✅ Title kept from the first question, preview follows the last message")
+
+def test_backfill_indexes_existing_checkpoints():
+    print("🧪 Testing catalog backfill for existing databases...")
+    db_path = os.path.join(tempfile.mkdtemp(), "chat.sqlite")
+    backend = ChatbotBackend(db_path)
+    backend.initialize_session("legacy")
+    backend.app.update_state(backend.get_config("legacy"), {"messages": [
+        ensure_message_has_id(HumanMessage(content="Old question")),
+        ensure_message_has_id(AIMessage(content="Old answer")),
+    ]})
+    backend.close()
+
+    # Simulate a database written before the catalog existed
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE sessions")
+    conn.commit()
+    conn.close()
+
+    backend = ChatbotBackend(db_path)
+    try:
+        sessions = backend.list_all_sessions()
+        assert [(s["session_id"], s["title"], s["message_count"]) for s in sessions] == [("legacy", "Old question", 2)]
+    finally:
+        backend.close()
+    print("✅ Existing session indexed on startup")
+
+def test_user_sessions_only_lists_the_owners_sessions():
+    print("🧪 Testing per-user session listing...")
+    backend = ChatbotBackend(os.path.join(tempfile.mkdtemp(), "chat.sqlite"))
+    try:
+        backend.initialize_session("alice_new", owner="alice")
+        for i in range(300):
+            backend.catalog.record_turn(f"other_{i}", 2, title="Hi", preview="Hello", owner=f"user_{i % 7}")
+        backend.catalog.record_turn("alice_old", 4, title="Bread?", preview="Use flour", owner="alice",
+                                    last_activity="2026-01-01T00:00:00.000000+00:00")
+
+        sessions = backend.list_user_sessions("alice")
+        assert [s["session_id"] for s in sessions] == ["alice_new", "alice_old"]
+        assert sessions[1]["title"] == "Bread?" and sessions[1]["last_preview"] == "Use flour"
+        assert len(backend.list_user_sessions("alice", limit=1)) == 1
+        assert backend.list_user_sessions("nobody") == []
+    finally:
+        backend.close()
+    print("✅ 2 of 302 sessions listed for alice, newest first")
+
+if __name__ == "__main__":
+    test_cursor_pagination_walks_every_session_once()
+    test_listing_uses_an_index()
+    test_title_is_kept_and_preview_updates()
+    test_backfill_indexes_existing_checkpoints()
+    test_user_sessions_only_lists_the_owners_sessions()
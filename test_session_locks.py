@@ -0,0 +1,126 @@
+"""
+Session Locks Test - arrival-order handoff between threads and coroutines, cancelled
+waiters and locks dropped once nobody uses them
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from session_locks import SessionLocks
+
+def test_waiters_get_the_lock_in_arrival_order():
+    print("🧪 Testing first-come, first-served handoff...")
+    locks = SessionLocks()
+    order = []
+
+    async def run():
+        async def waiter(name):
+            async with locks.ahold("s"):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        def thread_waiter(name):
+            with locks.hold("s"):
+                order.append(name)
+
+        async with locks.ahold("s"):
+            tasks = []
+            for i in range(3):
+                tasks.append(asyncio.create_task(waiter(f"async-{i}")))
+                await asyncio.sleep(0.01)
+            thread = threading.Thread(target=thread_waiter, args=("thread",))
+            thread.start()
+            await asyncio.sleep(0.05)
+            tasks.append(asyncio.create_task(waiter("late")))
+            await asyncio.sleep(0.01)
+            assert order == [] and locks.is_locked("s")
+        await asyncio.gather(*tasks)
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(run())
+    assert order == ["async-0", "async-1", "async-2", "thread", "late"], order
+    assert not locks._locks
+    print(f"✅ Handed over in order: {order}")
+
+def test_cancelled_waiter_passes_the_lock_on():
+    print("🧪 Testing cancelled waiters...")
+    locks = SessionLocks()
+
+    async def run():
+        got = []
+
+        async def waiter(session_id, name):
+            async with locks.ahold(session_id):
+                got.append(name)
+
+        async with locks.ahold("s"):
+            cancelled = asyncio.create_task(waiter("s", "cancelled"))
+            kept = asyncio.create_task(waiter("s", "kept"))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            await asyncio.sleep(0.01)
+        await kept
+        assert cancelled.cancelled()
+        # Cancelled after the lock was handed to it: the lock must not stay held
+        async with locks.ahold("t"):
+            late = asyncio.create_task(waiter("t", "t-late"))
+            await asyncio.sleep(0.01)
+        late.cancel()
+        await asyncio.gather(late, return_exceptions=True)
+        async with locks.ahold("t"):
+            pass
+        return got
+
+    got = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert got == ["kept"], got
+    assert not locks._locks
+    print("✅ Cancelled waiters leave the queue and never keep the lock")
+
+def test_threads_and_coroutines_exclude_each_other():
+    print("🧪 Testing mutual exclusion across threads and coroutines...")
+    locks = SessionLocks()
+    inside = []
+    overlaps = []
+
+    def critical(name):
+        inside.append(name)
+        if len(inside) > 1:
+            overlaps.append(tuple(inside))
+        time.sleep(0.001)
+        inside.remove(name)
+
+    def thread_worker(i):
+        for _ in range(20):
+            with locks.hold("shared"):
+                critical(f"thread-{i}")
+
+    async def run():
+        async def coroutine_worker(i):
+            for _ in range(20):
+                async with locks.ahold("shared"):
+                    critical(f"task-{i}")
+                await asyncio.sleep(0)
+
+        threads = [threading.Thread(target=thread_worker, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        await asyncio.gather(*(coroutine_worker(i) for i in range(3)))
+        for thread in threads:
+            await asyncio.to_thread(thread.join)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    assert overlaps == [], overlaps[:3]
+    assert not locks._locks
+    print(f"✅ 120 critical sections without overlap in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    test_waiters_get_the_lock_in_arrival_order()
+    test_cancelled_waiter_passes_the_lock_on()
+    test_threads_and_coroutines_exclude_each_other()
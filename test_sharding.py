@@ -0,0 +1,129 @@
+"""
+Sharding Test - consistent hashing, independent shard writers and cross-shard listing
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage
+
+import backend.core as core
+from backend.core import ChatbotBackend
+from sharding import ConsistentHashRing
+from storage import open_storage
+from test_async_backend import use_fake_llm
+
+def sharded_url(shards: int = 3) -> str:
+    return f"sqlite+sharded:///{os.path.join(tempfile.mkdtemp(), 'shards')}?shards={shards}"
+
+def test_ring_spreads_and_keeps_keys():
+    print("🧪 Testing the consistent hash ring...")
+    keys = [f"session_{i}" for i in range(4000)]
+    ring = ConsistentHashRing(4)
+    counts = Counter(ring.shard_for(key) for key in keys)
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert min(counts.values()) > 0.15 * len(keys), counts
+
+    # A fifth shard takes about a fifth of the keys and moves nothing else
+    grown = ConsistentHashRing(5)
+    moved = [key for key in keys if grown.shard_for(key) != ring.shard_for(key)]
+    assert all(grown.shard_for(key) == 4 for key in moved)
+    assert 0.1 * len(keys) < len(moved) < 0.3 * len(keys), len(moved)
+    print(f"✅ Shard sizes {sorted(counts.values())}; adding a shard moved {len(moved)}/{len(keys)} keys")
+
+def test_shards_write_independently():
+    print("🧪 Testing that a busy shard does not block the others...")
+    use_fake_llm(delay=0, responses=[AIMessage(content="Sharded reply") for _ in range(2)])
+    backend = ChatbotBackend(database_url=sharded_url(), embedder=core.HashingEmbeddings())
+    try:
+        ring = backend.storage.ring
+        blocked = next(f"user_{i}" for i in range(100) if ring.shard_for(f"user_{i}") == 0)
+        free = next(f"user_{i}" for i in range(100) if ring.shard_for(f"user_{i}") == 1)
+
+        busy_pool = backend.storage.checkpoint_pools[0]
+        busy_pool.write_lock.acquire()
+        blocked_turn = threading.Thread(target=backend.send_message, args=(blocked, "waiting"))
+        try:
+            blocked_turn.start()
+            start = time.perf_counter()
+            assert backend.send_message(free, "not waiting") == "Sharded reply"
+            elapsed = time.perf_counter() - start
+            assert blocked_turn.is_alive(), "turn on the locked shard finished while its writer was held"
+        finally:
+            busy_pool.write_lock.release()
+            blocked_turn.join()
+
+        assert elapsed < 1.0, f"turn on a free shard waited {elapsed:.2f}s"
+        assert backend.get_session_info(blocked)["exists"] and backend.get_session_info(free)["exists"]
+    finally:
+        backend.close()
+    print(f"✅ Turn on shard 1 finished in {elapsed:.3f}s while shard 0's writer was held")
+
+def test_listing_pages_across_shards():
+    print("🧪 Testing session pagination across shards...")
+    use_fake_llm(delay=0, responses=[AIMessage(content="Listed") for _ in range(12)])
+    backend = ChatbotBackend(database_url=sharded_url(), embedder=core.HashingEmbeddings())
+    try:
+        session_ids = [f"paged_{i:02d}" for i in range(12)]
+        for session_id in session_ids:
+            backend.send_message(session_id, f"hello from {session_id}", owner="pat")
+            time.sleep(0.002)
+        assert len({backend.storage.ring.shard_for(s) for s in session_ids}) == 3
+
+        seen, cursor = [], None
+        while True:
+            page = backend.list_sessions_page(after=cursor, limit=5)
+            seen.extend(s["session_id"] for s in page["sessions"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert seen == list(reversed(session_ids)), seen
+        assert [s["session_id"] for s in backend.list_user_sessions("pat", limit=3)] == seen[:3]
+    finally:
+        backend.close()
+    print("✅ 12 sessions on 3 shards listed newest first in pages of 5")
+
+def test_delete_reaches_every_shard():
+    print("🧪 Testing fan-out deletion...")
+    storage = open_storage(sharded_url())
+    try:
+        config = {"configurable": {"thread_id": "stray", "checkpoint_ns": ""}}
+        # Rows left on a shard the ring no longer points at, e.g. after resharding
+        for saver in storage.checkpointer.savers:
+            with saver.pool.write() as cur:
+                cur.execute("INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, type, checkpoint, metadata) "
+                            "VALUES ('stray', '', '1', 'json', x'', x'')")
+        assert storage.thread_ids() == ["stray"]
+        storage.checkpointer.delete_thread("stray")
+        assert storage.thread_ids() == []
+        assert storage.checkpointer.get_tuple(config) is None
+    finally:
+        storage.close()
+    print("✅ delete_thread() cleared the thread from all 3 shards")
+
+def test_shard_count_is_fixed():
+    print("🧪 Testing reopening with another shard count...")
+    url = sharded_url(shards=3)
+    open_storage(url).close()
+    try:
+        open_storage(url.replace("shards=3", "shards=4"))
+    except ValueError as e:
+        assert "3 shards" in str(e)
+    else:
+        raise AssertionError("reopened 3-shard storage with 4 shards")
+    open_storage(url).close()
+    print("✅ A different shard count is refused instead of losing sessions")
+
+if __name__ == "__main__":
+    test_ring_spreads_and_keeps_keys()
+    test_shards_write_independently()
+    test_listing_pages_across_shards()
+    test_delete_reaches_every_shard()
+    test_shard_count_is_fixed()
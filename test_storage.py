@@ -0,0 +1,153 @@
+"""
+Storage Conformance Test - every DATABASE_URL backend behaves the same behind ChatbotBackend
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import backend.core as core
+from backend.core import ChatbotBackend, ensure_message_has_id
+from storage import open_storage, parse_database_url
+from test_async_backend import use_fake_llm
+
+def storage_urls():
+    """(name, URL) of every storage backend, each pointing at a fresh location"""
+    directory = tempfile.mkdtemp()
+    return [
+        ("memory", "memory://"),
+        ("sqlite", f"sqlite:///{os.path.join(directory, 'chat.sqlite')}"),
+        ("sharded", f"sqlite+sharded:///{os.path.join(directory, 'shards')}?shards=3"),
+    ]
+
+def for_each_storage(check):
+    for name, url in storage_urls():
+        backend = ChatbotBackend(database_url=url, embedder=core.HashingEmbeddings())
+        try:
+            check(name, backend)
+        except AssertionError as e:
+            raise AssertionError(f"[{name}] {e}") from e
+        finally:
+            backend.close()
+
+def test_database_url_parsing():
+    print("🧪 Testing DATABASE_URL parsing...")
+    assert parse_database_url("memory://") == ("memory", "", {})
+    assert parse_database_url("sqlite:///./data/chat.sqlite") == ("sqlite", "./data/chat.sqlite", {})
+    assert parse_database_url("sqlite:////var/lib/chat.sqlite?readers=8") == ("sqlite", "/var/lib/chat.sqlite", {"readers": "8"})
+    assert parse_database_url("sqlite+sharded:///./data/shards?shards=8") == ("sqlite+sharded", "./data/shards", {"shards": "8"})
+    for bad in ("chat.sqlite", "postgres://db/chat", "sqlite:///", "sqlite+sharded:///", "sqlite+sharded:///x?shards=0"):
+        try:
+            open_storage(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} was accepted")
+    print("✅ Schemes, paths and options parsed; unsupported URLs rejected")
+
+def test_turns_history_and_listing():
+    print("🧪 Testing turns, history and session listing on every storage...")
+
+    def check(name, backend):
+        # Distinct reply objects, since a reply keeps the message ID it is given
+        use_fake_llm(delay=0, responses=[AIMessage(content="Stored reply") for _ in range(2)])
+        assert backend.send_message("conformance", "first", owner="dana") == "Stored reply"
+        backend.send_message("conformance", "second", owner="dana")
+        history = backend.get_chat_history("conformance")
+        assert [m["content"] for m in history] == ["first", "Stored reply", "second", "Stored reply"]
+        assert backend.get_session_info("conformance")["messages_count"] == 5
+        sessions = backend.list_user_sessions("dana")
+        assert [(s["session_id"], s["title"], s["message_count"]) for s in sessions] == [("conformance", "first", 4)]
+        assert backend.storage.thread_ids() == ["conformance"]
+        print(f"  ✓ {name}")
+
+    for_each_storage(check)
+    print("✅ Same history and listing on every storage")
+
+def test_delete_session():
+    print("🧪 Testing session deletion on every storage...")
+
+    def check(name, backend):
+        use_fake_llm(delay=0, responses=[AIMessage(content="Soon deleted") for _ in range(2)])
+        backend.send_message("doomed", "remember the number 7", owner="erin")
+        backend.send_message("kept", "hello", owner="erin")
+        assert backend.delete_session("doomed")
+        assert backend.get_session_info("doomed")["exists"] is False
+        assert [s["session_id"] for s in backend.list_user_sessions("erin")] == ["kept"]
+        assert backend.memory_index.count("doomed") == 0
+        assert backend.storage.thread_ids() == ["kept"]
+        print(f"  ✓ {name}")
+
+    for_each_storage(check)
+    print("✅ Deletion removes checkpoints, catalog rows and memory vectors everywhere")
+
+def test_concurrent_async_sessions():
+    print("🧪 Testing concurrent async sessions on every storage...")
+
+    def check(name, backend):
+        use_fake_llm(delay=0.01, responses=[AIMessage(content="Async reply") for _ in range(8)])
+
+        async def run():
+            await asyncio.gather(*[backend.asend_message(f"async_{i}", f"question {i}") for i in range(8)])
+            return [await backend.aget_chat_history(f"async_{i}") for i in range(8)]
+
+        for i, history in enumerate(asyncio.run(run())):
+            assert [m["content"] for m in history] == [f"question {i}", "Async reply"]
+        print(f"  ✓ {name}")
+
+    for_each_storage(check)
+    print("✅ 8 concurrent sessions kept apart on every storage")
+
+def test_checkpoint_history_contract():
+    print("🧪 Testing the checkpointer contract on every storage...")
+
+    def check(name, backend):
+        backend.initialize_session("contract")
+        config = backend.get_config("contract")
+        for i in range(3):
+            backend.app.update_state(config, {"messages": [ensure_message_has_id(HumanMessage(content=f"m{i}"))]})
+
+        checkpoints = list(backend.checkpointer.list({"configurable": {"thread_id": "contract"}}))
+        ids = [c.config["configurable"]["checkpoint_id"] for c in checkpoints]
+        assert len(ids) == 4 and ids == sorted(ids, reverse=True), ids
+        latest = backend.checkpointer.get_tuple({"configurable": {"thread_id": "contract", "checkpoint_ns": ""}})
+        assert latest.config["configurable"]["checkpoint_id"] == ids[0]
+
+        backend.checkpointer.delete_thread("contract")
+        assert backend.checkpointer.get_tuple({"configurable": {"thread_id": "contract", "checkpoint_ns": ""}}) is None
+        print(f"  ✓ {name}")
+
+    for_each_storage(check)
+    print("✅ list() newest first, get_tuple() latest, delete_thread() removes all")
+
+def test_durability_matches_the_url():
+    print("🧪 Testing persistence across restarts...")
+    use_fake_llm(reply="Durable reply", delay=0)
+    for name, url in storage_urls():
+        backend = ChatbotBackend(database_url=url)
+        backend.send_message("restart", "before restart")
+        durable = backend.storage.durable
+        backend.close()
+
+        backend = ChatbotBackend(database_url=url)
+        try:
+            exists = backend.get_session_info("restart")["exists"]
+            listed = [s["session_id"] for s in backend.list_all_sessions()]
+        finally:
+            backend.close()
+        assert exists is durable and (listed == ["restart"]) is durable, name
+        print(f"  ✓ {name} ({'durable' if durable else 'in memory'})")
+    print("✅ Durable storages keep sessions across restarts, memory:// starts empty")
+
+if __name__ == "__main__":
+    test_database_url_parsing()
+    test_turns_history_and_listing()
+    test_delete_session()
+    test_concurrent_async_sessions()
+    test_checkpoint_history_contract()
+    test_durability_matches_the_url()
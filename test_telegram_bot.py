@@ -0,0 +1,128 @@
+"""
+Telegram Bot Test - backend turns off the event loop, ordered per user, bounded overall
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "telegram"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import bot
+from message_coalescer import MessageCoalescer
+
+class SlowBackend:
+    """Synchronous stand-in for SimpleChatbotBackend that takes a while to answer"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+        self.turns = []
+
+    def send_message(self, session_id: str, message: str) -> str:
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.turns.append((session_id, message))
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return f"echo: {message}"
+
+def make_update(user_id: int, text: str, replies: list):
+    async def reply_text(response, **kwargs):
+        replies.append((user_id, response))
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id, username=f"user{user_id}"),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=SimpleNamespace(text=text, reply_text=reply_text),
+    )
+
+async def no_chat_action(**kwargs):
+    pass
+
+def make_bot(backend: SlowBackend, workers: int) -> bot.TelegramChatbot:
+    bot.chatbot_backend = backend
+    telegram_bot = bot.TelegramChatbot("123456:TEST")
+    telegram_bot.executor = ThreadPoolExecutor(max_workers=workers)
+    telegram_bot.coalescer = MessageCoalescer(telegram_bot.answer_messages, window_ms=20)
+    telegram_bot.streaming = False
+    return telegram_bot
+
+def test_users_are_served_concurrently_and_in_order():
+    print("🧪 Testing concurrent users with a slow backend...")
+    original = bot.chatbot_backend
+    backend = SlowBackend(delay=0.3)
+    telegram_bot = make_bot(backend, workers=4)
+    context = SimpleNamespace(bot=SimpleNamespace(send_chat_action=no_chat_action))
+    replies = []
+
+    async def run():
+        for user_id in range(4):
+            bot.user_sessions[user_id] = f"telegram_{user_id}"
+
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticking = asyncio.create_task(ticker())
+
+        start = time.perf_counter()
+        for user_id in range(4):
+            await telegram_bot.handle_message(make_update(user_id, "first", replies), context)
+        await asyncio.sleep(0.05)
+        # A second message from user 0 while its first turn is still running
+        await telegram_bot.handle_message(make_update(0, "second", replies), context)
+        await telegram_bot.coalescer.flush()
+        elapsed = time.perf_counter() - start
+        ticking.cancel()
+        return elapsed, ticks
+
+    try:
+        elapsed, ticks = asyncio.run(run())
+    finally:
+        bot.chatbot_backend = original
+        telegram_bot.executor.shutdown()
+
+    assert backend.peak == 4, f"expected 4 turns at once, saw {backend.peak}"
+    # Four users in parallel, then user 0's second turn: two rounds, not five
+    assert elapsed < 1.0, f"turns ran one at a time ({elapsed:.2f}s)"
+    assert ticks > 30, "event loop was blocked while the backend worked"
+    assert [text for user, text in replies if user == 0] == ["echo: first", "echo: second"]
+    assert backend.turns.index(("telegram_0", "second")) == 4
+    print(f"✅ 5 turns for 4 users in {elapsed:.2f}s, event loop ticked {ticks} times")
+
+def test_worker_pool_bounds_concurrency():
+    print("🧪 Testing the global turn limit...")
+    original = bot.chatbot_backend
+    backend = SlowBackend(delay=0.1)
+    telegram_bot = make_bot(backend, workers=2)
+    context = SimpleNamespace(bot=SimpleNamespace(send_chat_action=no_chat_action))
+    replies = []
+
+    async def run():
+        for user_id in range(10, 16):
+            bot.user_sessions[user_id] = f"telegram_{user_id}"
+            await telegram_bot.handle_message(make_update(user_id, "hello", replies), context)
+        await telegram_bot.coalescer.flush()
+
+    try:
+        asyncio.run(run())
+    finally:
+        bot.chatbot_backend = original
+        telegram_bot.executor.shutdown()
+
+    assert len(replies) == 6 and backend.peak == 2
+    print("✅ 6 users served with at most 2 turns in flight")
+
+if __name__ == "__main__":
+    test_users_are_served_concurrently_and_in_order()
+    test_worker_pool_bounds_concurrency()
@@ -0,0 +1,136 @@
+"""
+Telegram Streaming Test - replies appear as a placeholder that is edited while the LLM generates
+"""
+
+import os
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "telegram"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import bot
+
+class StreamingBackend:
+    """Yields a reply chunk by chunk, like the LLM does"""
+
+    def __init__(self, chunks, delay: float):
+        self.chunks = chunks
+        self.delay = delay
+
+    def stream_message(self, session_id: str, message: str):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+class FakeChat:
+    """Records the messages the bot posts and every edit made to them"""
+
+    def __init__(self):
+        self.messages = []  # [text history of each message]
+        self.started = time.perf_counter()
+        self.first_post = None
+
+    async def reply_text(self, text, **kwargs):
+        if self.first_post is None:
+            self.first_post = time.perf_counter() - self.started
+        history = [text]
+        self.messages.append(history)
+
+        async def edit_text(new_text, **kwargs):
+            assert len(new_text) <= bot.TELEGRAM_MESSAGE_LIMIT
+            history.append(new_text)
+        return SimpleNamespace(edit_text=edit_text)
+
+    def final_texts(self):
+        return [history[-1] for history in self.messages]
+
+class FailingBackend(StreamingBackend):
+    """Streams its chunks, then fails like a dropped LLM connection"""
+
+    def stream_message(self, session_id: str, message: str):
+        yield from super().stream_message(session_id, message)
+        raise ConnectionError("LLM connection lost")
+
+def stream(backend, interval: float, min_chars: int) -> FakeChat:
+    original = bot.chatbot_backend
+    bot.chatbot_backend = backend
+    telegram_bot = bot.TelegramChatbot("123456:TEST")
+    telegram_bot.executor = ThreadPoolExecutor(max_workers=2)
+    chat = FakeChat()
+    update = SimpleNamespace(message=SimpleNamespace(text="hi", reply_text=chat.reply_text))
+
+    async def run():
+        reply = bot.StreamingReply(update, interval=interval, min_chars=min_chars)
+        original_class = bot.StreamingReply
+        bot.StreamingReply = lambda update: reply
+        try:
+            await telegram_bot.answer_turn("telegram_stream", [update])
+        finally:
+            bot.StreamingReply = original_class
+
+    try:
+        asyncio.run(run())
+    finally:
+        bot.chatbot_backend = original
+        telegram_bot.executor.shutdown()
+    return chat
+
+def test_placeholder_is_edited_at_a_bounded_rate():
+    print("🧪 Testing streamed edits...")
+    words = [f"word{i} " for i in range(40)]
+    # 40 chunks over ~0.8s with a 0.2s edit interval
+    chat = stream(StreamingBackend(words, delay=0.02), interval=0.2, min_chars=0)
+
+    assert chat.first_post < 0.1, f"placeholder took {chat.first_post:.2f}s"
+    assert len(chat.messages) == 1
+    history = chat.messages[0]
+    assert history[0] == bot.STREAMING_PLACEHOLDER
+    assert history[-1] == "".join(words)
+    edits = len(history) - 1
+    assert 2 <= edits <= 7, f"expected a few throttled edits, got {edits}"
+    # Each edit shows more of the reply than the last
+    assert all(history[-1].startswith(text) for text in history[1:])
+    print(f"✅ Placeholder after {chat.first_post * 1000:.0f}ms, {edits} edits for 40 chunks")
+
+def test_character_threshold_triggers_edits():
+    print("🧪 Testing edits every N characters...")
+    chunks = ["x" * 100] * 10
+    chat = stream(StreamingBackend(chunks, delay=0.01), interval=60, min_chars=300)
+
+    history = chat.messages[0]
+    assert history[-1] == "x" * 1000
+    assert [len(text) for text in history[1:]] == [300, 600, 900, 1000]
+    print("✅ Edited at 300, 600 and 900 characters, then the full reply")
+
+def test_long_reply_rolls_over_to_new_messages():
+    print("🧪 Testing the 4096-character rollover...")
+    paragraph = ("lorem ipsum dolor sit amet " * 20).strip() + "\n"
+    chunks = [paragraph] * 30  # about 16k characters
+    chat = stream(StreamingBackend(chunks, delay=0.001), interval=0.05, min_chars=0)
+
+    texts = chat.final_texts()
+    assert len(texts) >= 4
+    assert all(len(text) <= bot.TELEGRAM_MESSAGE_LIMIT for text in texts)
+    # Split at line breaks, so no paragraph is cut in half
+    assert all(text.endswith("amet") or text.endswith("amet\n") for text in texts)
+    assert "".join(t.rstrip("\n") + "\n" for t in texts).split() == "".join(chunks).split()
+    print(f"✅ {sum(len(t) for t in texts)} characters delivered in {len(texts)} messages")
+
+def test_error_replaces_the_placeholder():
+    print("🧪 Testing a turn that fails while streaming...")
+    chat = stream(FailingBackend([], delay=0), interval=60, min_chars=0)
+    assert chat.final_texts() == ["❌ I encountered an error: LLM connection lost"]
+
+    chat = stream(FailingBackend(["Half of ", "the reply"], delay=0.01), interval=60, min_chars=5)
+    assert chat.final_texts() == ["Half of the reply\n\n❌ I encountered an error: LLM connection lost"]
+    print("✅ The error is edited into the placeholder instead of a second message")
+
+if __name__ == "__main__":
+    test_placeholder_is_edited_at_a_bounded_rate()
+    test_character_threshold_triggers_edits()
+    test_long_reply_rolls_over_to_new_messages()
+    test_error_replaces_the_placeholder()
@@ -0,0 +1,150 @@
+"""
+Tool Executor Test - concurrent tool calls, per-tool timeouts, the per-turn tool budget
+and the round trip cap that ends a turn with a reply
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+import backend.core as core
+import tool_executor
+from tool_executor import BudgetedToolNode, parse_timeouts, turn_tool_usage
+from test_async_backend import use_fake_llm
+
+@tool
+def nap(seconds: float) -> str:
+    """Sleep for a while, then report it."""
+    time.sleep(seconds)
+    return f"Slept {seconds}s"
+
+def tool_step(*calls, history=()):
+    """Graph state whose last message asks for the given (name, args) tool calls"""
+    tool_calls = [{"name": name, "args": args, "id": f"call_{i}"} for i, (name, args) in enumerate(calls)]
+    return {"messages": [HumanMessage(content="go"), *history, AIMessage(content="", tool_calls=tool_calls)]}
+
+def test_calls_in_a_step_run_concurrently():
+    print("🧪 Testing concurrent tool calls...")
+    node = BudgetedToolNode([nap], timeout=5)
+    state = tool_step(("nap", {"seconds": 0.2}), ("nap", {"seconds": 0.2}), ("nap", {"seconds": 0.2}))
+
+    start = time.perf_counter()
+    messages = node.run(state, {})["messages"]
+    sync_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    amessages = asyncio.run(node.arun(state, {}))["messages"]
+    async_elapsed = time.perf_counter() - start
+
+    for result in (messages, amessages):
+        assert [m.tool_call_id for m in result] == ["call_0", "call_1", "call_2"]
+        assert all(m.content == "Slept 0.2s" and m.status == "success" for m in result)
+        assert all(m.response_metadata["duration_seconds"] >= 0.2 for m in result)
+    # One after another the three calls would take 0.6s
+    assert sync_elapsed < 0.45 and async_elapsed < 0.45, (sync_elapsed, async_elapsed)
+    print(f"✅ 3 x 200 ms calls took {sync_elapsed * 1000:.0f} ms (sync), {async_elapsed * 1000:.0f} ms (async)")
+
+def test_per_tool_timeout():
+    print("🧪 Testing per-tool timeouts...")
+    assert parse_timeouts("nap=0.1, search_memory=5") == {"nap": 0.1, "search_memory": 5.0}
+    node = BudgetedToolNode([nap, core.calculate], timeout=5, timeouts={"nap": 0.1})
+    state = tool_step(("nap", {"seconds": 0.5}), ("calculate", {"expression": "6*7"}), ("missing", {}))
+    before = tool_executor.TOOL_LIMITS.value(reason="timeout")
+
+    async def timed_arun():
+        # Timed inside the loop: closing it waits for the abandoned call's thread
+        start = time.perf_counter()
+        return await node.arun(state, {}), time.perf_counter() - start
+
+    def timed_run():
+        start = time.perf_counter()
+        return node.run(state, {}), time.perf_counter() - start
+
+    for run in (timed_run, lambda: asyncio.run(timed_arun())):
+        update, elapsed = run()
+        late, answered, unknown = update["messages"]
+        assert elapsed < 0.4, elapsed
+        assert late.status == "error" and "timed out after 0.1s" in late.content
+        assert answered.status == "success" and answered.content == "Result: 42"
+        assert unknown.status == "error" and "not a valid tool" in unknown.content
+    assert tool_executor.TOOL_LIMITS.value(reason="timeout") - before == 2
+    print("✅ The slow call timed out while the others answered")
+
+def test_queued_calls_are_cancelled_not_timed_out():
+    print("🧪 Testing calls still queued at their deadline...")
+    ran = []
+
+    @tool
+    def record_nap(seconds: float) -> str:
+        """Sleep for a while and remember that it ran."""
+        ran.append(seconds)
+        time.sleep(seconds)
+        return f"Slept {seconds}s"
+
+    node = BudgetedToolNode([record_nap], timeout=0.3, workers=1)
+    state = tool_step(("record_nap", {"seconds": 1}), ("record_nap", {"seconds": 1.5}))
+    running, queued = node.run(state, {})["messages"]
+
+    assert running.status == "error" and "timed out after 0.3s" in running.content
+    assert queued.status == "error" and queued.content == "Not run: no worker was free within 0.3s."
+    node.executor.shutdown(wait=True)
+    # The first call keeps running after the turn moved on; the queued one never starts
+    assert ran == [1], ran
+    print("✅ The running call timed out, the queued one was cancelled and never ran")
+
+def test_turn_budget():
+    print("🧪 Testing the per-turn tool budget...")
+    previous_step = [
+        AIMessage(content="", tool_calls=[{"name": "nap", "args": {"seconds": 0.3}, "id": "old_0"}]),
+        ToolMessage(content="Slept 0.3s", tool_call_id="old_0", response_metadata={"duration_seconds": 0.3}),
+    ]
+    state = tool_step(("nap", {"seconds": 0.5}), history=previous_step)
+    assert turn_tool_usage(state["messages"]) == (2, 0.3)
+
+    # 0.3s of a 0.4s budget is spent, so the next call gets 0.1s
+    node = BudgetedToolNode([nap], timeout=5, turn_budget=0.4)
+    start = time.perf_counter()
+    (late,) = node.run(state, {})["messages"]
+    assert time.perf_counter() - start < 0.3
+    assert late.status == "error" and "budget for this turn ran out" in late.content
+
+    spent = BudgetedToolNode([nap], timeout=5, turn_budget=0.3)
+    (skipped,) = spent.run(state, {})["messages"]
+    assert skipped.status == "error" and skipped.content.startswith("Not run")
+    print("✅ Calls are cut to the time left in the turn, and skipped once it is gone")
+
+def test_round_trip_cap_ends_the_turn():
+    print("🧪 Testing the round trip cap...")
+    limit = tool_executor.MAX_TOOL_ROUND_TRIPS
+    use_fake_llm(delay=0, responses=[
+        AIMessage(content="", tool_calls=[{"name": "calculate", "args": {"expression": f"{i}+1"}, "id": f"loop_{i}"}])
+        for i in range(limit + 1)
+    ])
+    backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "tools.sqlite"))
+    try:
+        reply = backend.send_message("looping", "keep calculating")
+        messages = backend.app.get_state(backend.get_config("looping")).values["messages"]
+    finally:
+        backend.close()
+
+    assert reply == tool_executor.ROUND_TRIP_LIMIT_REPLY.format(round_trips=limit)
+    tool_messages = [m for m in messages if isinstance(m, ToolMessage)]
+    assert len(tool_messages) == limit + 1
+    # Every tool call is answered, so the history stays valid for the next turn
+    assert tool_messages[-1].status == "error" and tool_messages[-1].tool_call_id == f"loop_{limit}"
+    assert turn_tool_usage(messages)[0] == limit + 1
+    print(f"✅ Turn ended after {limit} round trips with: {reply[:50]}...")
+
+if __name__ == "__main__":
+    test_calls_in_a_step_run_concurrently()
+    test_per_tool_timeout()
+    test_queued_calls_are_cancelled_not_timed_out()
+    test_turn_budget()
+    test_round_trip_cap_ends_the_turn()
@@ -0,0 +1,142 @@
+"""
+Tracing Test - the span tree of a tool-using turn, OTLP JSON shape, head and tail
+sampling and size-based rotation of the trace file
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage
+
+import backend.core as core
+import tracing
+from tracing import FileSpanExporter, Tracer, TurnTrace, load_traces
+from test_async_backend import use_fake_llm
+
+def traced_backend(**tracer_options):
+    """A backend whose turns are traced to a fresh file; restore core.tracer after use"""
+    path = os.path.join(tempfile.mkdtemp(), "traces", "turns.otlp.jsonl")
+    test_tracer = Tracer(enabled=True, path=path, **tracer_options)
+    core.tracer = test_tracer
+    backend = core.ChatbotBackend(os.path.join(tempfile.mkdtemp(), "tracing.sqlite"))
+    return backend, test_tracer, path
+
+def children(spans, parent):
+    return [span["name"] for span in spans if span.get("parentSpanId") == parent["spanId"]]
+
+def test_tool_turn_span_tree():
+    print("🧪 Testing the span tree of a tool-using turn...")
+    use_fake_llm(delay=0.02, responses=[
+        AIMessage(content="", tool_calls=[{"name": "calculate", "args": {"expression": "6*7"}, "id": "call_t"}]),
+        AIMessage(content="6 times 7 is 42"),
+    ])
+    original = core.tracer
+    backend, test_tracer, path = traced_backend()
+    try:
+        assert backend.send_message("traced", "what is 6*7?") == "6 times 7 is 42"
+    finally:
+        backend.close()
+        core.tracer = original
+    test_tracer.flush()
+
+    turns = load_traces(path)
+    assert len(turns) == 1
+    spans = turns[0]["spans"]
+    root = next(span for span in spans if "parentSpanId" not in span)
+    assert root["name"] == "send_message" and root["kind"] == tracing.SPAN_KIND_SERVER
+    assert {"key": "session_id", "value": {"stringValue": "traced"}} in root["attributes"]
+    assert {span["traceId"] for span in spans} == {turns[0]["trace_id"]} and len(turns[0]["trace_id"]) == 32
+
+    top = children(spans, root)
+    assert top.count("node llm_caller") == 2 and top.count("node tools") == 1
+    assert "checkpoint.load" in top and "checkpoint.save" in top and "record_turn" in top
+    llm_nodes = [span for span in spans if span["name"] == "node llm_caller"]
+    assert all(children(spans, node) == ["llm"] for node in llm_nodes)
+    tools_node = next(span for span in spans if span["name"] == "node tools")
+    assert children(spans, tools_node) == ["tool calculate"]
+
+    llm = next(span for span in spans if span["name"] == "llm")
+    keys = {attribute["key"] for attribute in llm["attributes"]}
+    assert {"gen_ai.usage.input_tokens", "gen_ai.usage.output_tokens"} <= keys
+    assert int(llm["endTimeUnixNano"]) - int(llm["startTimeUnixNano"]) >= 20_000_000
+    assert all(span["status"]["code"] == tracing.STATUS_OK for span in spans)
+    print(f"✅ {len(spans)} spans: nodes, LLM and tool calls and checkpoint I/O under one root")
+
+def test_streamed_turn_is_traced():
+    print("🧪 Testing a streamed turn...")
+    use_fake_llm(reply="Streamed and traced", delay=0)
+    original = core.tracer
+    backend, test_tracer, path = traced_backend()
+
+    async def run():
+        try:
+            return [event async for event in backend.astream_message("streamed", "hello")]
+        finally:
+            await backend.aclose()
+
+    try:
+        events = asyncio.run(run())
+    finally:
+        core.tracer = original
+    test_tracer.flush()
+    assert events[-1] == {"type": "message", "content": "Streamed and traced"}
+    spans = load_traces(path)[0]["spans"]
+    assert spans[0]["name"] == "astream_message"
+    assert any(span["name"] == "node llm_caller" for span in spans)
+    print("✅ astream_message recorded as one trace")
+
+def test_sampling():
+    print("🧪 Testing head and tail sampling...")
+    path = os.path.join(tempfile.mkdtemp(), "sampled.jsonl")
+    unsampled = Tracer(enabled=True, sample_rate=0.0, path=path)
+    with unsampled.turn("skipped") as trace:
+        assert trace is None and tracing.current_trace() is None
+
+    tail = Tracer(enabled=True, sample_rate=0.0, slow_turn_seconds=0.05, path=path)
+    with tail.turn("fast") as trace:
+        assert tracing.current_trace() is trace and not trace.sampled
+    with tail.turn("slow") as trace:
+        with trace.span("work"):
+            time.sleep(0.06)
+    try:
+        with tail.turn("failed"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert tracing.current_trace() is None
+    tail.flush()
+
+    kept = {turn["spans"][0]["name"]: turn["spans"][0] for turn in load_traces(path)}
+    assert set(kept) == {"slow", "failed"}, set(kept)
+    assert kept["failed"]["status"] == {"code": tracing.STATUS_ERROR, "message": "RuntimeError: boom"}
+    print("✅ Unsampled fast turns dropped, slow and failed turns kept")
+
+def test_file_rotation():
+    print("🧪 Testing trace file rotation...")
+    path = os.path.join(tempfile.mkdtemp(), "rotating.jsonl")
+    exporter = FileSpanExporter(path, max_bytes=2000, backups=2)
+    for i in range(30):
+        trace = TurnTrace("turn", {"i": i})
+        trace.root.end()
+        exporter.export(trace)
+    exporter.shutdown()
+    files = sorted(name for name in os.listdir(os.path.dirname(path)))
+    assert files == ["rotating.jsonl", "rotating.jsonl.1", "rotating.jsonl.2"], files
+    assert all(os.path.getsize(os.path.join(os.path.dirname(path), name)) <= 2000 for name in files)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            json.loads(line)
+    print("✅ Trace file rotated by size, keeping 2 backups of whole lines")
+
+if __name__ == "__main__":
+    test_tool_turn_span_tree()
+    test_streamed_turn_is_traced()
+    test_sampling()
+    test_file_rotation()